@@ -1,7 +1,10 @@
 from flask import Flask, request, jsonify, send_from_directory
 from dapr.clients import DaprClient
+from common.dapr_client import get_sidecar_client
+from common.messages import DigestRequest
+from common.wire import MessageError, encode
 import logging
-import json
+import threading
 from flask_cors import CORS
 from config import Config
 
@@ -9,7 +12,9 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__, static_folder="frontend/build", static_url_path="/")
+# bindings go through the SDK, service invocations through the pooled client
 dapr_client = DaprClient()
+sidecar_client = get_sidecar_client()
 CORS(app)
 
 
@@ -26,35 +31,35 @@ def manage_users():
         if request.method == "POST":
             logger.info("Creating a new user")
             data = request.json
-            response = dapr_client.invoke_method(
+            response = sidecar_client.invoke_method(
                 app_id=Config.USERS_MANAGER_APP_ID,
                 method_name="CreateUser",
                 content_type="application/json",
-                data=json.dumps(data).encode("utf-8"),
+                data=encode(data),
             )
         elif request.method == "GET":
             logger.info("Getting user preferences")
-            response = dapr_client.invoke_method(
+            response = sidecar_client.invoke_method(
                 app_id=Config.USERS_MANAGER_APP_ID,
                 method_name="GetUserPreferencesByEmailAddress",
                 content_type="application/json",
-                data=json.dumps(request.json).encode("utf-8"),
+                data=encode(request.json),
             )
         elif request.method == "PUT":
             logger.info("Updating a user")
-            response = dapr_client.invoke_method(
+            response = sidecar_client.invoke_method(
                 app_id=Config.USERS_MANAGER_APP_ID,
                 method_name="UpdateUserByEmail",
                 content_type="application/json",
-                data=json.dumps(request.json).encode("utf-8"),
+                data=encode(request.json),
             )
         elif request.method == "DELETE":
             logger.info("Deleting a user")
-            response = dapr_client.invoke_method(
+            response = sidecar_client.invoke_method(
                 app_id=Config.USERS_MANAGER_APP_ID,
                 method_name="DeleteUserByEmail",
                 content_type="application/json",
-                data=json.dumps(request.json).encode("utf-8"),
+                data=encode(request.json),
             )
         else:
             return jsonify({"error": "Unsupported HTTP method"}), 405
@@ -72,11 +77,15 @@ def get_news():
     """Handles requests to fetch news."""
     try:
         logger.info("Fetching news")
+        digest_request = DigestRequest.from_dict(request.json)
         response = dapr_client.invoke_binding(
-            binding_name="newsqueue", operation="create", data=json.dumps(request.json)
+            binding_name="newsqueue", operation="create", data=encode(digest_request)
         )
         logger.info("Request sent to the queue")
         return {"message": "Request to fetch news sent successfully to the queue"}
+    except MessageError as e:
+        logger.error(f"Invalid news request: {e}")
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching news: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
@@ -84,4 +93,6 @@ def get_news():
 
 if __name__ == "__main__":
     logger.info("Starting BFF...")
+    # open the sidecar connection pool without delaying the app's startup
+    threading.Thread(target=sidecar_client.warm_up_sync, daemon=True).start()
     app.run(host="0.0.0.0", port=5003)
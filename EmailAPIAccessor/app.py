@@ -1,7 +1,7 @@
 from dapr.ext.grpc import App, InvokeMethodResponse
 from email_formatter import format_email_content
 from email_sender import send_email
-import json
+from common.wire import decode, encode
 import logging
 import dotenv
 import os
@@ -14,15 +14,13 @@ app = App()
 def send_email_route(request):
     try:
         logger.info("Received request to send email...")
-        request_data = json.loads(request.data.decode("utf-8"))
+        request_data = decode(request.data)
         email = request_data.get("email", "")
         articles = request_data.get("news", [])
 
         if not email or not articles:
             return InvokeMethodResponse(
-                data=json.dumps(
-                    {"status": "error", "message": "Invalid request"}
-                ).encode("utf-8"),
+                data=encode({"status": "error", "message": "Invalid request"}),
                 headers=(("internal-status", "400"),),
             )
 
@@ -35,22 +33,20 @@ def send_email_route(request):
         if success:
             logger.info("Email sent successfully.")
             return InvokeMethodResponse(
-                data=json.dumps({"status": "success"}).encode("utf-8"),
+                data=encode({"status": "success"}),
                 headers=(("internal-status", "200"),),
             )
         else:
             logger.info("Failed to send email.")
             return InvokeMethodResponse(
-                data=json.dumps(
-                    {"status": "error", "message": "Failed to send email"}
-                ).encode("utf-8"),
+                data=encode({"status": "error", "message": "Failed to send email"}),
                 headers=(("internal-status", "500"),),
             )
 
     except Exception as e:
         logger.error(f"Error sending email: {e}")
         return InvokeMethodResponse(
-            data=json.dumps({"status": "error", "message": str(e)}).encode("utf-8"),
+            data=encode({"status": "error", "message": str(e)}),
             headers=(("internal-status", "500"), ("internal-error", str(e))),
         )
 
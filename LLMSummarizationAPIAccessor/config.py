@@ -0,0 +1,16 @@
+import os
+
+
+class Config:
+    # Summaries of articles already summarized, reused instead of asking Gemini
+    SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE_ENABLED", "true").lower() == "true"
+    SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "10000"))
+    SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "86400"))
+    # Articles are packed into Gemini requests of at most this many estimated
+    # prompt tokens and articles, bodies longer than the limit are cut
+    LLM_INPUT_TOKEN_BUDGET = int(os.getenv("LLM_INPUT_TOKEN_BUDGET", "24000"))
+    LLM_MAX_ARTICLE_TOKENS = int(os.getenv("LLM_MAX_ARTICLE_TOKENS", "1000"))
+    LLM_MAX_ARTICLES_PER_REQUEST = int(os.getenv("LLM_MAX_ARTICLES_PER_REQUEST", "30"))
+    # Prometheus metrics, served on their own port as the app port speaks gRPC
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9090"))
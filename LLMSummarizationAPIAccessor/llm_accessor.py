@@ -1,13 +1,40 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 import google.generativeai as genai
 
 import json
+import threading
 import time
 from collections import deque
 import typing_extensions
+from prometheus_client import Counter, Histogram
 import logging
 
+from common.deadline import DeadlineExceeded, check_deadline, remaining
+from token_budget import estimate_tokens, pack, truncate_to_tokens
+
+MODEL_NAME = "gemini-1.5-flash-latest"
+# Bump whenever the prompt or the response schema changes, summaries cached
+# for the previous prompt are then no longer used
+PROMPT_VERSION = "1"
+# "Article <n>:" and the blank line before it
+ARTICLE_OVERHEAD_TOKENS = 5
+
+INPUT_TOKENS = Histogram(
+    "llm_request_input_tokens",
+    "Estimated prompt tokens of each summarization request to Gemini",
+    buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+REQUEST_ARTICLES = Histogram(
+    "llm_request_articles",
+    "Articles summarized by each request to Gemini",
+    buckets=(1, 2, 5, 10, 20, 30, 50),
+)
+TRUNCATED_ARTICLES = Counter(
+    "llm_truncated_articles_total",
+    "Article bodies cut to the per-article token limit before summarization",
+)
+
 
 class Article(typing_extensions.TypedDict):
     title: str
@@ -20,34 +47,39 @@ class RateLimiter:
         self.max_requests_per_day = max_requests_per_day
         self.minute_requests = deque()  # Tracks requests within the last minute
         self.day_requests = deque()  # Tracks requests within the last 24 hours
+        # requests of several categories are summarized on concurrent gRPC
+        # threads, checking and recording one must not interleave with another
+        self._lock = threading.Lock()
 
     def can_make_request(self) -> bool:
-        current_time = time.time()
+        with self._lock:
+            current_time = time.time()
 
-        # Remove expired requests (older than 1 minute for minute tracking)
-        while self.minute_requests and current_time - self.minute_requests[0] > 60:
-            self.minute_requests.popleft()
+            # Remove expired requests (older than 1 minute for minute tracking)
+            while self.minute_requests and current_time - self.minute_requests[0] > 60:
+                self.minute_requests.popleft()
 
-        # Remove expired requests (older than 24 hours for daily tracking)
-        while self.day_requests and current_time - self.day_requests[0] > 86400:
-            self.day_requests.popleft()
+            # Remove expired requests (older than 24 hours for daily tracking)
+            while self.day_requests and current_time - self.day_requests[0] > 86400:
+                self.day_requests.popleft()
 
-        if (
-            len(self.minute_requests) < self.max_requests_per_minute
-            and len(self.day_requests) < self.max_requests_per_day
-        ):
-            self.minute_requests.append(current_time)
-            self.day_requests.append(current_time)
-            return True
+            if (
+                len(self.minute_requests) < self.max_requests_per_minute
+                and len(self.day_requests) < self.max_requests_per_day
+            ):
+                self.minute_requests.append(current_time)
+                self.day_requests.append(current_time)
+                return True
 
-        return False
+            return False
 
     def remaining_requests(self) -> Dict[str, int]:
-        return {
-            "minute_remaining": self.max_requests_per_minute
-            - len(self.minute_requests),
-            "daily_remaining": self.max_requests_per_day - len(self.day_requests),
-        }
+        with self._lock:
+            return {
+                "minute_remaining": self.max_requests_per_minute
+                - len(self.minute_requests),
+                "daily_remaining": self.max_requests_per_day - len(self.day_requests),
+            }
 
 
 class LLMApiAccessor:
@@ -56,33 +88,108 @@ class LLMApiAccessor:
         api_key: str,
         max_requests_per_minute: int = 14,
         max_requests_per_day: int = 1400,
+        input_token_budget: int = 24000,
+        max_article_tokens: int = 1000,
+        max_articles_per_request: int = 30,
     ):
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-1.5-flash-latest")
+        self.model = genai.GenerativeModel(MODEL_NAME)
         self.rate_limiter = RateLimiter(max_requests_per_minute, max_requests_per_day)
         self.logger = logging.getLogger(__name__)
+        self.prompt_tokens = estimate_tokens(self._create_batch_prompt([]))
+        # what the articles of one request may take, a single article always fits
+        self.articles_token_budget = input_token_budget - self.prompt_tokens
+        self.max_article_tokens = min(
+            max_article_tokens, self.articles_token_budget - ARTICLE_OVERHEAD_TOKENS
+        )
+        self.max_articles_per_request = max_articles_per_request
+
+    def summarize_articles(self, articles: List[Dict]) -> List[Optional[Dict]]:
+        """
+        Summarize articles, packed into as few Gemini requests as fit the input
+        token budget, and cut to max_article_tokens first if longer.
+
+        Returns:
+            The summary of each article in order. It is None for the articles
+            of a request whose answer did not have one summary per article, and
+            for the articles left when the rate limit is reached or the
+            deadline passes after the first request.
+        """
+        articles = [self._fit_article(article) for article in articles]
+        sizes = [
+            estimate_tokens(article["body"]) + ARTICLE_OVERHEAD_TOKENS
+            for article in articles
+        ]
+        batches = pack(sizes, self.articles_token_budget, self.max_articles_per_request)
+        self.logger.info(
+            f"Summarizing {len(articles)} articles in {len(batches)} requests."
+        )
 
-    def summarize_articles(self, articles: List[Dict]) -> List[Dict]:
+        summaries: List[Optional[Dict]] = [None] * len(articles)
+        for number, batch in enumerate(batches):
+            tokens = self.prompt_tokens + sum(sizes[i] for i in batch)
+            try:
+                batch_summaries = self._summarize_batch(
+                    [articles[i] for i in batch], tokens
+                )
+            except (RuntimeError, DeadlineExceeded) as e:
+                if number == 0:
+                    raise
+                # keep what was summarized, so it is returned and cached, the
+                # rest is summarized next time
+                self.logger.warning(f"Stopped after {number} requests: {e}")
+                break
+            for i, summary in zip(batch, batch_summaries):
+                summaries[i] = summary
+        return summaries
+
+    def _fit_article(self, article: Dict) -> Dict:
+        if estimate_tokens(article["body"]) <= self.max_article_tokens:
+            return article
+        TRUNCATED_ARTICLES.inc()
+        body = truncate_to_tokens(article["body"], self.max_article_tokens)
+        return {**article, "body": body}
+
+    def _summarize_batch(
+        self, articles: List[Dict], tokens: int
+    ) -> List[Optional[Dict]]:
+        check_deadline()
         if not self.rate_limiter.can_make_request():
             self.logger.error("Rate limit exceeded. Please try again later.")
             raise RuntimeError("Rate limit exceeded. Please try again later.")
         batched_prompt = self._create_batch_prompt(articles)
-        self.logger.info(f"Summarizing {len(articles)} articles in one request.")
+        self.logger.info(
+            f"Summarizing {len(articles)} articles in one request of about {tokens} tokens."
+        )
+        INPUT_TOKENS.observe(tokens)
+        REQUEST_ARTICLES.observe(len(articles))
 
+        timeout = remaining()
         result = self.model.generate_content(
             batched_prompt,
             generation_config=genai.GenerationConfig(
                 response_mime_type="application/json", response_schema=list[Article]
             ),
+            request_options={"timeout": timeout} if timeout else None,
         )
-        self.logger.info(f"Received response.")
+        usage = getattr(result, "usage_metadata", None)
+        if usage is not None:
+            self.logger.info(
+                f"Received response. Prompt tokens: {usage.prompt_token_count}, "
+                f"estimated: {tokens}"
+            )
         summaries = self._split_summaries(result.text)
         self.logger.info(f"Number of summaries: {len(summaries)}")
-        self.logger.info(f"type of summaries: {type(summaries)}")
         remaining_requests = self.rate_limiter.remaining_requests()
         self.logger.info(
             f"Remaining requests: per minute: {remaining_requests['minute_remaining']}, per day: {remaining_requests['daily_remaining']}"
         )
+        if len(summaries) != len(articles):
+            # cannot tell which article a summary belongs to
+            self.logger.error(
+                f"Got {len(summaries)} summaries for {len(articles)} articles"
+            )
+            return [None] * len(articles)
 
         return summaries
 
@@ -1,11 +1,21 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dapr.ext.grpc import App, InvokeMethodResponse
 import logging
 import os
-import json
 from dotenv import load_dotenv
-from llm_accessor import LLMApiAccessor
-from news_article import NewsArticle
+from prometheus_client import start_http_server
+from config import Config
+from llm_accessor import MODEL_NAME, PROMPT_VERSION, LLMApiAccessor
+from summary_cache import SummaryCache
+from common.compression import compress_response
+from common.deadline import (
+    DeadlineExceeded,
+    check_deadline,
+    deadline_from_headers,
+    deadline_scope,
+)
+from common.news_article import NewsArticle, decode_by_category
+from common.wire import MessageError, encode
 
 load_dotenv()
 
@@ -14,6 +24,19 @@ llm_api_accessor = LLMApiAccessor(
     api_key=os.getenv("GENERATIVE_API_KEY"),
     max_requests_per_minute=14,
     max_requests_per_day=1400,
+    input_token_budget=Config.LLM_INPUT_TOKEN_BUDGET,
+    max_article_tokens=Config.LLM_MAX_ARTICLE_TOKENS,
+    max_articles_per_request=Config.LLM_MAX_ARTICLES_PER_REQUEST,
+)
+summary_cache = (
+    SummaryCache(
+        model=MODEL_NAME,
+        prompt_version=PROMPT_VERSION,
+        max_entries=Config.SUMMARY_CACHE_MAX_ENTRIES,
+        ttl_seconds=Config.SUMMARY_CACHE_TTL_SECONDS,
+    )
+    if Config.SUMMARY_CACHE_ENABLED
+    else None
 )
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -27,18 +50,25 @@ def summarize(request) -> InvokeMethodResponse:
         logger.info("Received request to summarize articles...")
         request_data = parse_request_data(request)
 
-        summarized_articles = process_articles(request_data)
+        with deadline_scope(deadline_from_headers(request.metadata)):
+            summarized_articles = process_articles(request_data)
 
-        response = create_success_response(summarized_articles)
+        response = create_success_response(summarized_articles, request.metadata)
         logger.info("Summarized articles successfully.")
         return response
 
-    except json.JSONDecodeError as e:
+    except MessageError as e:
         return handle_error(
-            f"JSON Decode Error: {e}",
-            {"status": "error", "message": "Invalid JSON format."},
+            f"Invalid request: {e}",
+            {"status": "error", "message": f"Invalid request: {e}"},
             400,
         )
+    except DeadlineExceeded as e:
+        return handle_error(
+            f"Deadline exceeded: {e}",
+            {"status": "error", "message": "Deadline exceeded."},
+            504,
+        )
     except RuntimeError as e:
         return handle_error(
             f"Rate limit exceeded: {e}",
@@ -56,51 +86,85 @@ def summarize(request) -> InvokeMethodResponse:
         )
 
 
-def parse_request_data(request) -> Dict[str, List[dict]]:
-    """Parse and decode the incoming request data."""
-    request_data = request.data.decode("utf-8")
-    return json.loads(request_data)
-
+def parse_request_data(request) -> Dict[str, List[NewsArticle]]:
+    """Parse the incoming request data into articles by category."""
+    return decode_by_category(request.data)
+
+
+def process_articles(
+    request_data: Dict[str, List[NewsArticle]],
+) -> Dict[str, List[NewsArticle]]:
+    """
+    Summarize articles by category. The articles of all categories are
+    summarized together, so small categories share Gemini requests.
+    """
+    check_deadline()
+    logger.info(f"Summarizing articles for categories: {list(request_data)}")
+    articles_to_summarize = [
+        article.to_dict_for_llm()
+        for articles in request_data.values()
+        for article in articles
+    ]
+    summarized_data = summarize_with_cache(articles_to_summarize)
 
-def process_articles(request_data: Dict[str, List[dict]]) -> Dict[str, List[dict]]:
-    """Process and summarize articles by category."""
     summarized_articles = {}
-
+    start = 0
     for category, articles in request_data.items():
-        logger.info(f"Summarizing articles for category: {category}")
-
-        articles_to_summarize = [
-            NewsArticle.from_dict(article).to_dict_for_llm() for article in articles
-        ]
-        summarized_data = llm_api_accessor.summarize_articles(articles_to_summarize)
-
         summarized_articles[category] = update_articles_with_summary(
-            articles, summarized_data
+            articles, summarized_data[start : start + len(articles)]
         )
+        start += len(articles)
 
     return summarized_articles
 
 
+def summarize_with_cache(articles: List[dict]) -> List[Optional[dict]]:
+    """
+    Summarize articles in order, taking the summaries of the articles seen
+    before from the cache and sending only the others to Gemini.
+    """
+    if summary_cache is None:
+        return llm_api_accessor.summarize_articles(articles)
+
+    bodies = [article["body"] for article in articles]
+    summaries = summary_cache.get_many(bodies)
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    logger.info(f"{len(articles) - len(missing)} of {len(articles)} summaries cached")
+    if not missing:
+        return summaries
+
+    new_summaries = llm_api_accessor.summarize_articles([articles[i] for i in missing])
+    summary_cache.put_many(
+        [
+            bodies[i]
+            for i, summary in zip(missing, new_summaries)
+            if summary is not None
+        ],
+        [summary for summary in new_summaries if summary is not None],
+    )
+    for i, summary in zip(missing, new_summaries):
+        summaries[i] = summary
+    return summaries
+
+
 def update_articles_with_summary(original_articles, summarized_data):
-    """Combine original articles with summaries."""
+    """Combine original articles with summaries, dropping the unsummarized ones."""
     return [
-        NewsArticle(
-            title=summary["title"],
-            body=summary["body"],
-            image=original_article["image"],
-            url=original_article["url"],
-            dateTimePub=original_article["dateTimePub"],
-            category=original_article["category"],
-        ).to_dict()
+        original_article.with_summary(summary["title"], summary["body"])
         for original_article, summary in zip(original_articles, summarized_data)
+        if summary is not None
     ]
 
 
-def create_success_response(data: Dict) -> InvokeMethodResponse:
-    """Create a success response."""
+def create_success_response(data: Dict, request_metadata) -> InvokeMethodResponse:
+    """Create a success response, gzipped if the caller accepts it."""
     logger.info("Creating success response...")
-    response = json.dumps({"status": "success", "data": data}).encode("utf-8")
-    return InvokeMethodResponse(data=response, content_type="application/json")
+    response, headers = compress_response(
+        encode({"status": "success", "data": data}), request_metadata
+    )
+    return InvokeMethodResponse(
+        data=response, content_type="application/json", headers=headers
+    )
 
 
 def handle_error(
@@ -108,7 +172,7 @@ def handle_error(
 ) -> InvokeMethodResponse:
     """Log an error and return an error response."""
     logger.error(log_message)
-    error_response = json.dumps(response_data).encode("utf-8")
+    error_response = encode(response_data)
     return InvokeMethodResponse(
         data=error_response,
         content_type="application/json",
@@ -118,6 +182,8 @@ def handle_error(
 
 if __name__ == "__main__":
     logger.info("Starting LLM summarization service...")
+    if Config.METRICS_ENABLED:
+        start_http_server(Config.METRICS_PORT)
     try:
         app.run(50054)
     except KeyboardInterrupt:
@@ -0,0 +1,84 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from prometheus_client import Counter, Gauge
+
+LOOKUPS = Counter(
+    "llm_summary_cache_lookups_total",
+    'Articles looked up in the summary cache, by outcome "hit" or "miss"',
+    ("outcome",),
+)
+EVICTIONS = Counter(
+    "llm_summary_cache_evictions_total",
+    'Summaries dropped from the cache, as least recently used ("lru") or "expired"',
+    ("reason",),
+)
+ENTRIES = Gauge("llm_summary_cache_entries", "Summaries held in the summary cache")
+
+
+class SummaryCache:
+    """
+    LRU cache of article summaries keyed by the hash of the article body, the
+    model and the prompt version, so an article is summarized by Gemini once
+    however many requests carry it. Entries expire after ttl_seconds.
+
+    Shared by the gRPC worker threads, every method takes the lock.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        prompt_version: str,
+        max_entries: int = 10000,
+        ttl_seconds: float = 24 * 3600,
+    ):
+        self.model = model
+        self.prompt_version = prompt_version
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        ENTRIES.set_function(lambda: len(self._entries))
+
+    def key(self, body: str) -> str:
+        digest = hashlib.sha256()
+        for part in (self.model, self.prompt_version, body):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_many(self, bodies: Sequence[str]) -> List[Optional[Dict]]:
+        """The cached summary of each body, None where there is none."""
+        keys = [self.key(body) for body in bodies]
+        now = time.monotonic()
+        summaries = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] <= now:
+                    del self._entries[key]
+                    EVICTIONS.labels(reason="expired").inc()
+                    entry = None
+                if entry is None:
+                    summaries.append(None)
+                    continue
+                self._entries.move_to_end(key)
+                summaries.append(entry[1])
+        hits = sum(summary is not None for summary in summaries)
+        LOOKUPS.labels(outcome="hit").inc(hits)
+        LOOKUPS.labels(outcome="miss").inc(len(summaries) - hits)
+        return summaries
+
+    def put_many(self, bodies: Sequence[str], summaries: Sequence[Dict]):
+        keys = [self.key(body) for body in bodies]
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, summary in zip(keys, summaries):
+                self._entries[key] = (expires_at, summary)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                EVICTIONS.labels(reason="lru").inc()
@@ -0,0 +1,55 @@
+import math
+import re
+from typing import List, Sequence
+
+# Gemini averages about four bytes of UTF-8 per token, more for languages like
+# Hebrew, so counting bytes rather than characters stays on the safe side
+BYTES_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r"[.!?][\"'”)\]]*\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens text takes in a prompt, estimated without asking the model."""
+    return math.ceil(len(text.encode("utf-8")) / BYTES_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut text to about max_tokens, at the end of a sentence when one ends in the
+    second half of what fits, else at the end of a word. News put the essentials
+    first, so the start of an article is what is kept.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    head = text.encode("utf-8")[: max_tokens * BYTES_PER_TOKEN].decode(
+        "utf-8", errors="ignore"
+    )
+    sentence_ends = [match.end() for match in _SENTENCE_END.finditer(head)]
+    if sentence_ends and sentence_ends[-1] >= len(head) // 2:
+        return head[: sentence_ends[-1]].rstrip()
+    word_end = head.rfind(" ")
+    if word_end >= len(head) // 2:
+        return head[:word_end].rstrip()
+    return head
+
+
+def pack(sizes: Sequence[int], capacity: int, max_items: int) -> List[List[int]]:
+    """
+    Group items into as few bins as possible (first fit decreasing), none over
+    capacity in total size or over max_items items. Returns the indexes of the
+    items of each bin in their original order. An item larger than capacity
+    gets a bin of its own.
+    """
+    bins: List[List[int]] = []
+    free: List[int] = []
+    for index in sorted(range(len(sizes)), key=lambda i: sizes[i], reverse=True):
+        for bin_index, items in enumerate(bins):
+            if sizes[index] <= free[bin_index] and len(items) < max_items:
+                items.append(index)
+                free[bin_index] -= sizes[index]
+                break
+        else:
+            bins.append([index])
+            free.append(capacity - sizes[index])
+    return [sorted(items) for items in bins]
@@ -0,0 +1,21 @@
+import os
+
+
+class Config:
+    # Upstream queries run at the same time with the API key, newsapi.ai rejects
+    # more than 5 simultaneous requests of one key with 429
+    NEWS_API_MAX_CONCURRENT_QUERIES = int(
+        os.getenv("NEWS_API_MAX_CONCURRENT_QUERIES", "5")
+    )
+    # Fetch the categories of a request with one query over all of them, reading
+    # at most this many articles, rather than a query per category. Takes effect
+    # when NewsEngine sends them in one call (NEWS_API_BATCH_CATEGORIES)
+    NEWS_API_COMBINED_QUERY = (
+        os.getenv("NEWS_API_COMBINED_QUERY", "false").lower() == "true"
+    )
+    NEWS_API_COMBINED_MAX_ARTICLES = int(
+        os.getenv("NEWS_API_COMBINED_MAX_ARTICLES", "200")
+    )
+    # Prometheus metrics, served on their own port as the app port speaks gRPC
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9090"))
@@ -1,17 +1,74 @@
-from typing import Union, Dict, List
+from typing import Union, Dict, List, Tuple
 
 import dotenv
 
 from news_api_config import NewsApiConfig
+from common.deadline import expired, remaining
+from common.metrics import LATENCY_BUCKETS
+import contextvars
 import logging
+import threading
 import time
-from eventregistry import EventRegistry, QueryArticlesIter
+from concurrent import futures
+from prometheus_client import Counter, Histogram
+from eventregistry import (
+    ArticleInfoFlags,
+    EventRegistry,
+    QueryArticlesIter,
+    QueryItems,
+    ReturnInfo,
+)
+
+ARTICLES_PER_CATEGORY = 20
+# the combined query needs the categories newsapi.ai assigned to each article
+COMBINED_RETURN_INFO = ReturnInfo(articleInfo=ArticleInfoFlags(categories=True))
+
+QUERIES = Counter("news_api_queries_total", "Queries sent to newsapi.ai", ["kind"])
+CATEGORY_SECONDS = Histogram(
+    "news_api_category_seconds",
+    "Time to fetch the news of one category from newsapi.ai",
+    ["category"],
+    buckets=LATENCY_BUCKETS,
+)
 
 
 class NewsApiConnector:
-    def __init__(self, api_key: str):
+    """
+    Queries newsapi.ai with one API key. An EventRegistry client makes one
+    request at a time, so each thread gets a client of its own, and at most
+    max_concurrent_queries queries of the key run at once across all threads.
+
+    With combined_query, get_news_by_categories asks for all the categories in
+    one query, reading at most max_combined_articles, instead of one query per
+    category. Categories it leaves short are topped up with a query of their
+    own. NewsEngine only asks for several categories at once with
+    NEWS_API_BATCH_CATEGORIES.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        max_concurrent_queries: int = 5,
+        combined_query: bool = False,
+        max_combined_articles: int = 200,
+    ):
         self.api_key = api_key
-        self.event_registry = EventRegistry(apiKey=self.api_key)
+        self.combined_query = combined_query
+        self.max_combined_articles = max_combined_articles
+        self._local = threading.local()
+        self._query_slots = threading.BoundedSemaphore(max_concurrent_queries)
+        self._pool = futures.ThreadPoolExecutor(
+            max_workers=max_concurrent_queries, thread_name_prefix="newsapi"
+        )
+
+    @property
+    def event_registry(self) -> EventRegistry:
+        """The client of the calling thread."""
+        event_registry = getattr(self._local, "event_registry", None)
+        if event_registry is None:
+            event_registry = EventRegistry(apiKey=self.api_key)
+            self._local.event_registry = event_registry
+        return event_registry
 
     def _get_date_range(self):
         """Helper method to get date range for the last 7 days."""
@@ -45,11 +102,15 @@ class NewsApiConnector:
                 endSourceRankPercentile=30,
             )
 
-            news_list = []
-            for article in query.execQuery(
-                self.event_registry, sortBy="date", maxItems=20
-            ):
-                news_list.append(article)
+            QUERIES.labels(kind="category").inc()
+            with self._query_slots:
+                news_list = list(
+                    query.execQuery(
+                        self.event_registry,
+                        sortBy="date",
+                        maxItems=ARTICLES_PER_CATEGORY,
+                    )
+                )
 
             logging.info("Got news")
             return {"articles": news_list}
@@ -86,11 +147,11 @@ class NewsApiConnector:
                 }
             )
 
-            news_list = []
-            for article in query.execQuery(
-                self.event_registry, sortBy="date", maxItems=20
-            ):
-                news_list.append(article)
+            QUERIES.labels(kind="topic").inc()
+            with self._query_slots:
+                news_list = list(
+                    query.execQuery(self.event_registry, sortBy="date", maxItems=20)
+                )
 
             logging.info("Got news by topic")
             return {"articles": news_list}
@@ -98,34 +159,191 @@ class NewsApiConnector:
             logging.error(f"An error occurred: {str(e)}")
             return {"error": "Internal error"}
 
+    def _get_category_news(self, category: str, country: str, language: str):
+        """(articles of the category or None when it failed, seconds taken)"""
+        start = time.perf_counter()
+        if expired():
+            # the caller stopped waiting while this one was queued
+            return None, 0.0
+        articles = self.get_news(country=country, language=language, category=category)
+        seconds = time.perf_counter() - start
+        CATEGORY_SECONDS.labels(category=category).observe(seconds)
+        if "error" in articles:
+            return None, seconds
+        return articles["articles"], seconds
+
+    def _get_each_category(
+        self, categories: List[str], country: str, language: str
+    ) -> Dict[str, List[Dict]]:
+        """
+        Articles of each category from a query per category, run concurrently.
+        Categories that fail or are not done by the deadline are left out.
+        """
+        pending = {}
+        for category in categories:
+            # each task gets its own copy of the context to see the deadline
+            pending[category] = self._pool.submit(
+                contextvars.copy_context().run,
+                self._get_category_news,
+                category,
+                country,
+                language,
+            )
+        if not pending:
+            return {}
+
+        _, not_done = futures.wait(pending.values(), timeout=remaining())
+        if not_done:
+            # the caller stopped waiting, return what we have
+            logging.warning(f"Deadline exceeded, skipping {len(not_done)} categories")
+            for future in not_done:
+                future.cancel()
+
+        news = {}
+        timings = []
+        for category, future in pending.items():
+            if future in not_done:
+                timings.append(f"{category} skipped")
+                continue
+            articles, seconds = future.result()
+            timings.append(f"{category} {seconds:.2f}s")
+            if articles is not None:
+                news[category] = articles
+        logging.info(f"Category timings: {', '.join(timings)}")
+        return news
+
+    def _get_combined_news(
+        self, categories: List[str], country: str, language: str
+    ) -> Tuple[Dict[str, List[Dict]], bool]:
+        """
+        Articles of the categories from one query over all of them, newest
+        first, split by the categories newsapi.ai assigned to each article.
+        Each category takes at most ARTICLES_PER_CATEGORY, so a busy one cannot
+        crowd out the others, and an article of several categories goes to the
+        first of them that has room. Also returns whether the query stopped
+        before reading its whole result set, as it read max_combined_articles,
+        the deadline passed or it failed; empty when it failed.
+        """
+        start_date, end_date = self._get_date_range()
+        country_uri = NewsApiConfig.get_country_uri(country)
+        language_code = NewsApiConfig.get_language_code(language)
+        if not country_uri or not language_code:
+            return {}, True
+        category_uris = {
+            category: NewsApiConfig.get_category_uri(category)
+            for category in categories
+        }
+
+        query = QueryArticlesIter(
+            sourceLocationUri=country_uri,
+            categoryUri=QueryItems.OR(list(category_uris.values())),
+            dataType=["news"],
+            lang=language_code,
+            dateStart=start_date,
+            dateEnd=end_date,
+            startSourceRankPercentile=0,
+            endSourceRankPercentile=30,
+        )
+
+        news = {category: [] for category in categories}
+        open_categories = {
+            category: uri.lower() for category, uri in category_uris.items()
+        }
+        read = 0
+        stopped_early = False
+        start = time.perf_counter()
+        try:
+            QUERIES.labels(kind="combined").inc()
+            with self._query_slots:
+                for article in query.execQuery(
+                    self.event_registry,
+                    sortBy="date",
+                    returnInfo=COMBINED_RETURN_INFO,
+                    maxItems=self.max_combined_articles,
+                ):
+                    read += 1
+                    uris = [
+                        category["uri"].lower()
+                        for category in article.pop("categories", None) or ()
+                    ]
+                    for category, category_uri in open_categories.items():
+                        if any(
+                            uri == category_uri or uri.startswith(category_uri + "/")
+                            for uri in uris
+                        ):
+                            news[category].append(article)
+                            if len(news[category]) == ARTICLES_PER_CATEGORY:
+                                del open_categories[category]
+                            break
+                    # pages are fetched as they are read, stop once all are full
+                    if not open_categories:
+                        break
+                    if expired():
+                        stopped_early = True
+                        break
+                else:
+                    stopped_early = read >= self.max_combined_articles
+        except Exception as e:
+            logging.error(f"Combined query failed: {str(e)}")
+            return {}, True
+
+        logging.info(
+            f"Combined query read {read} articles in "
+            f"{time.perf_counter() - start:.2f}s ("
+            + ", ".join(f"{category} {len(news[category])}" for category in news)
+            + ")"
+            + (", stopped early" if stopped_early else "")
+        )
+        return news, stopped_early
+
     def get_news_by_categories(
         self, categories: List[str], country: str = "us", language: str = "english"
     ) -> Union[Dict, List[Dict]]:
+        """
+        News of each category, returned in the order of categories. Categories
+        that fail or are not done by the deadline are left out.
+        """
         try:
             logging.info("Getting news by categories")
-            news_by_category = []
-            for category in categories:
-                category_uri = NewsApiConfig.get_category_uri(category)
-
-                if not category_uri:
-                    continue
-
-                category_news = []
-                articles = self.get_news(
-                    country=country, language=language, category=category
+            start = time.perf_counter()
+            categories = list(
+                dict.fromkeys(
+                    category
+                    for category in categories
+                    if NewsApiConfig.get_category_uri(category)
                 )
+            )
 
-                if "error" in articles:
-                    continue
-
-                category_news.extend(articles["articles"])
-
-                news_by_category.append(
-                    {"category": category, "articles": category_news}
+            news = {}
+            stopped_early = True
+            if self.combined_query and len(categories) > 1:
+                news, stopped_early = self._get_combined_news(
+                    categories, country, language
                 )
+            # when the combined query stopped before reading everything, as
+            # busier categories used up max_combined_articles or it failed, the
+            # ones it left short of their quota get a query each; it returns
+            # their newest articles, those they have included. A short category
+            # of a query read to the end has no more articles to get.
+            short = (
+                [
+                    category
+                    for category in categories
+                    if len(news.get(category, ())) < ARTICLES_PER_CATEGORY
+                ]
+                if stopped_early
+                else []
+            )
+            news.update(self._get_each_category(short, country, language))
 
-            logging.info("Got news by categories")
-            return news_by_category
+            logging.info(
+                f"Got news by categories in {time.perf_counter() - start:.2f}s"
+            )
+            return [
+                {"category": category, "articles": news[category]}
+                for category in categories
+                if category in news
+            ]
         except Exception as e:
             logging.error(f"An error occurred: {str(e)}")
             return {"error": "Internal error"}
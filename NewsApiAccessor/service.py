@@ -2,16 +2,26 @@ from dapr.ext.grpc import App, InvokeMethodResponse, InvokeMethodRequest
 import logging
 import asyncio
 import os
-import json
 from dotenv import load_dotenv
+from prometheus_client import start_http_server
 
+from config import Config
 from news_connector import NewsApiConnector
 from news_api_config import NewsApiConfig
+from common.compression import compress_response
+from common.deadline import deadline_from_headers, deadline_scope
+from common.messages import Preferences
+from common.wire import MessageError, decode, encode
 
 load_dotenv()
 
 app = App()
-news_api_connector = NewsApiConnector(api_key=os.getenv("NEWS_API_AI_API_KEY"))
+news_api_connector = NewsApiConnector(
+    api_key=os.getenv("NEWS_API_AI_API_KEY"),
+    max_concurrent_queries=Config.NEWS_API_MAX_CONCURRENT_QUERIES,
+    combined_query=Config.NEWS_API_COMBINED_QUERY,
+    max_combined_articles=Config.NEWS_API_COMBINED_MAX_ARTICLES,
+)
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -21,8 +31,7 @@ logging.basicConfig(
 @app.method(name="get_news")
 def get_news(request):
     try:
-        request_data = request.data.decode("utf-8")
-        request_json = json.loads(request_data)
+        request_json = decode(request.data)
         language = request_json.get("language", "english")
         country = request_json.get("country", "us")
         category = request_json.get("category", "")
@@ -32,17 +41,17 @@ def get_news(request):
         news = news_api_connector.get_news(
             language=language, country=country, category=category
         )
-        response = json.dumps({"status": "success", "data": news}).encode("utf-8")
+        response, compression_headers = compress_response(
+            encode({"status": "success", "data": news}), request.metadata
+        )
         return InvokeMethodResponse(
             data=response,
             content_type="application/json",
-            headers=(("internal-status", "200"),),
+            headers=(("internal-status", "200"),) + compression_headers,
         )
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON Decode Error: {e}")
-        error_response = json.dumps(
-            {"status": "error", "message": "Invalid JSON"}
-        ).encode("utf-8")
+    except MessageError as e:
+        logging.error(f"Invalid request: {e}")
+        error_response = encode({"status": "error", "message": str(e)})
         return InvokeMethodResponse(
             data=error_response,
             content_type="application/json",
@@ -50,9 +59,7 @@ def get_news(request):
         )
     except Exception as e:
         logging.error(f"Error getting news: {e}")
-        error_response = json.dumps({"status": "error", "message": str(e)}).encode(
-            "utf-8"
-        )
+        error_response = encode({"status": "error", "message": str(e)})
         return InvokeMethodResponse(
             data=error_response,
             headers=(
@@ -65,7 +72,7 @@ def get_news(request):
 @app.method(name="get_news_by_topic")
 def get_news_by_topic(request):
     try:
-        request_json = json.loads(request.data.decode("utf-8"))
+        request_json = decode(request.data)
         topic = request_json.get("topic")
         language = request_json.get("language", "english")
         country = request_json.get("country", "us")
@@ -75,17 +82,17 @@ def get_news_by_topic(request):
         news = news_api_connector.get_news_by_topic(
             topic=topic, language=language, country=country
         )
-        response = json.dumps({"status": "success", "data": news}).encode("utf-8")
+        response, compression_headers = compress_response(
+            encode({"status": "success", "data": news}), request.metadata
+        )
         return InvokeMethodResponse(
             data=response,
-            headers=(("internal-status", "200"),),
+            headers=(("internal-status", "200"),) + compression_headers,
             content_type="application/json",
         )
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON Decode Error: {e}")
-        error_response = json.dumps(
-            {"status": "error", "message": "Invalid JSON"}
-        ).encode("utf-8")
+    except MessageError as e:
+        logging.error(f"Invalid request: {e}")
+        error_response = encode({"status": "error", "message": str(e)})
         return InvokeMethodResponse(
             data=error_response,
             content_type="application/json",
@@ -93,9 +100,7 @@ def get_news_by_topic(request):
         )
     except Exception as e:
         logging.error(f"Error getting news by topic: {e}")
-        error_response = json.dumps({"status": "error", "message": str(e)}).encode(
-            "utf-8"
-        )
+        error_response = encode({"status": "error", "message": str(e)})
         return InvokeMethodResponse(
             data=error_response,
             headers=(
@@ -109,32 +114,33 @@ def get_news_by_topic(request):
 def get_news_by_categories(request):
     try:
         logging.info("Getting news for categories")
-        request_json = json.loads(request.data.decode("utf-8"))
-        categories = request_json.get("categories", [])
-        language = request_json.get("language", "english")
-        country = request_json.get("country", "us")
+        preferences = Preferences.from_dict(decode(request.data))
+        categories = preferences.categories
+        language = preferences.language
+        country = preferences.country
         logging.info(
             f"Getting news for categories: {categories}, language: {language}, country: {country}"
         )
-        news = news_api_connector.get_news_by_categories(
-            categories=categories, language=language, country=country
+        with deadline_scope(deadline_from_headers(request.metadata)):
+            news = news_api_connector.get_news_by_categories(
+                categories=categories, language=language, country=country
+            )
+        response, compression_headers = compress_response(
+            encode({"status": "success", "data": news}), request.metadata
         )
-        response = json.dumps({"status": "success", "data": news}).encode("utf-8")
         logging.info(
             f"got {len([article for category in news for article in category['articles']])} articles"
         )
 
         return InvokeMethodResponse(
             data=response,
-            headers=(("internal-status", "200"),),
+            headers=(("internal-status", "200"),) + compression_headers,
             content_type="application/json",
         )
 
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON Decode Error: {e}")
-        error_response = json.dumps(
-            {"status": "error", "message": "Invalid JSON"}
-        ).encode("utf-8")
+    except MessageError as e:
+        logging.error(f"Invalid request: {e}")
+        error_response = encode({"status": "error", "message": str(e)})
         return InvokeMethodResponse(
             data=error_response,
             content_type="application/json",
@@ -142,9 +148,7 @@ def get_news_by_categories(request):
         )
     except Exception as e:
         logging.error(f"Error getting news by categories: {e}")
-        error_response = json.dumps({"status": "error", "message": str(e)}).encode(
-            "utf-8"
-        )
+        error_response = encode({"status": "error", "message": str(e)})
         return InvokeMethodResponse(
             data=error_response,
             headers=(
@@ -159,18 +163,16 @@ def get_available_options(request):
     try:
         logging.info("Getting available options")
         options = NewsApiConfig.get_available_options()
-        response = json.dumps({"status": "success", "data": options}).encode("utf-8")
+        response = encode({"status": "success", "data": options})
         return InvokeMethodResponse(
             data=response,
             headers=(("internal-status", "200"),),
             content_type="application/json",
         )
 
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON Decode Error: {e}")
-        error_response = json.dumps(
-            {"status": "error", "message": "Invalid JSON"}
-        ).encode("utf-8")
+    except MessageError as e:
+        logging.error(f"Invalid request: {e}")
+        error_response = encode({"status": "error", "message": str(e)})
         return InvokeMethodResponse(
             data=error_response,
             content_type="application/json",
@@ -178,9 +180,7 @@ def get_available_options(request):
         )
     except Exception as e:
         logging.error(f"Error getting available options: {e}")
-        error_response = json.dumps({"status": "error", "message": str(e)}).encode(
-            "utf-8"
-        )
+        error_response = encode({"status": "error", "message": str(e)})
         return InvokeMethodResponse(
             data=error_response,
             headers=(
@@ -193,7 +193,7 @@ def get_available_options(request):
 @app.method(name="health")
 def health():
     return InvokeMethodResponse(
-        data=json.dumps({"status": "ok"}).encode("utf-8"),
+        data=encode({"status": "ok"}),
         content_type="application/json",
         headers=(("internal-status", "200"),),
     )
@@ -202,6 +202,8 @@ def health():
 if __name__ == "__main__":
 
     logging.info("Starting NewsApiAccessor app...")
+    if Config.METRICS_ENABLED:
+        start_http_server(Config.METRICS_PORT)
     try:
         app.run(50052)
     except KeyboardInterrupt:
@@ -2,30 +2,50 @@ import redis
 import json
 from datetime import datetime
 
+from sent_articles_index import SentArticlesIndex
+
 
 class NewsDBAccessor:
+    # delete the lock only if it is still held by the caller
+    RELEASE_LOCK_SCRIPT = """
+    if redis.call("GET", KEYS[1]) == ARGV[1] then
+        return redis.call("DEL", KEYS[1])
+    end
+    return 0
+    """
+
     def __init__(self, redis_host="redis", redis_port=6379, max_articles=10):
         self.max_articles = max_articles
         self.client = redis.StrictRedis(
             host=redis_host, port=redis_port, decode_responses=True
         )
+        self._release_lock = self.client.register_script(self.RELEASE_LOCK_SCRIPT)
+        self.sent_articles = SentArticlesIndex(self.client)
 
     def _get_news_key(self, category, language, country):
         return f"news:{category}:{language}:{country}"
 
     def update_news(self, category, language, country, new_articles):
+        self.update_news_bulk(language, country, {category: new_articles})
+
+    def update_news_bulk(self, language, country, news):
+        """
+        Add the articles of several categories and trim every category to the
+        most recent max_articles, in one atomic round trip.
+        """
         try:
-            key = self._get_news_key(category, language, country)
             now = datetime.now().timestamp()
-
-            # Add new articles
-            for article in new_articles:
-                self.client.zadd(key, {json.dumps(article): now})
-
-            # Ensure we only keep the 10 most recent articles
-            excess_count = self.client.zcard(key) - self.max_articles
-            if excess_count > 0:
-                self.client.zpopmin(key, excess_count)
+            pipeline = self.client.pipeline(transaction=True)
+            for category, new_articles in news.items():
+                if not new_articles:
+                    continue
+                key = self._get_news_key(category, language, country)
+                pipeline.zadd(
+                    key, {json.dumps(article): now for article in new_articles}
+                )
+                # Ensure we only keep the 10 most recent articles
+                pipeline.zremrangebyrank(key, 0, -self.max_articles - 1)
+            pipeline.execute()
         except Exception as e:
             raise Exception(f"Error updating news: {e}")
 
@@ -42,3 +62,32 @@ class NewsDBAccessor:
             ]
         except Exception as e:
             raise Exception(f"Error fetching news: {e}")
+
+    def _get_lock_key(self, name):
+        return f"lock:{name}"
+
+    def acquire_lock(self, name, owner, ttl_seconds):
+        try:
+            key = self._get_lock_key(name)
+            return bool(self.client.set(key, owner, nx=True, ex=ttl_seconds))
+        except Exception as e:
+            raise Exception(f"Error acquiring lock: {e}")
+
+    def release_lock(self, name, owner):
+        try:
+            key = self._get_lock_key(name)
+            return bool(self._release_lock(keys=[key], args=[owner]))
+        except Exception as e:
+            raise Exception(f"Error releasing lock: {e}")
+
+    def filter_sent_articles(self, email, article_ids):
+        try:
+            return self.sent_articles.filter_sent(email, article_ids)
+        except Exception as e:
+            raise Exception(f"Error checking sent articles: {e}")
+
+    def mark_articles_sent(self, email, article_ids):
+        try:
+            self.sent_articles.mark_sent(email, article_ids)
+        except Exception as e:
+            raise Exception(f"Error marking articles as sent: {e}")
@@ -0,0 +1,84 @@
+import hashlib
+from typing import List
+
+
+class SentArticlesIndex:
+    """
+    Per-user index of the articles already sent, stored as Redis Bloom filters.
+
+    Each user has a fixed size bitmap, so memory per user is bounded and a
+    membership check costs `num_hashes` GETBITs regardless of history length.
+    Once a generation has seen `capacity` articles it is rotated out: checks
+    consult the current and the previous generation, and older history is
+    forgotten. Lookups may report false positives, never false negatives.
+    """
+
+    def __init__(
+        self,
+        client,
+        num_bits: int = 8192,
+        num_hashes: int = 4,
+        capacity: int = 500,
+        ttl_seconds: int = 7 * 24 * 3600,
+    ):
+        self.client = client
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+
+    def _keys(self, user):
+        prefix = f"sent:{user}"
+        return f"{prefix}:current", f"{prefix}:previous", f"{prefix}:count"
+
+    def _offsets(self, article_id: str) -> List[int]:
+        # double hashing: h1 + i * h2 gives num_hashes independent-enough offsets
+        digest = hashlib.blake2b(article_id.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def filter_sent(self, user: str, article_ids: List[str]) -> List[str]:
+        """Return the ids among `article_ids` that were (probably) sent to user."""
+        if not article_ids:
+            return []
+        current, previous, _ = self._keys(user)
+        pipeline = self.client.pipeline(transaction=False)
+        for article_id in article_ids:
+            for offset in self._offsets(article_id):
+                pipeline.getbit(current, offset)
+                pipeline.getbit(previous, offset)
+        bits = pipeline.execute()
+
+        sent = []
+        per_article = 2 * self.num_hashes
+        for i, article_id in enumerate(article_ids):
+            article_bits = bits[i * per_article : (i + 1) * per_article]
+            if all(article_bits[0::2]) or all(article_bits[1::2]):
+                sent.append(article_id)
+        return sent
+
+    def mark_sent(self, user: str, article_ids: List[str]):
+        if not article_ids:
+            return
+        current, previous, count = self._keys(user)
+
+        def mark(pipeline):
+            # the count check and the rotation must see the same generation, or
+            # two digests of the user could both rotate and drop the previous one
+            rotate = int(pipeline.get(count) or 0) + len(article_ids) > self.capacity
+            has_current = rotate and pipeline.exists(current)
+            pipeline.multi()
+            if rotate:
+                pipeline.delete(previous, count)
+                if has_current:
+                    pipeline.rename(current, previous)
+            for article_id in article_ids:
+                for offset in self._offsets(article_id):
+                    pipeline.setbit(current, offset, 1)
+            pipeline.incrby(count, len(article_ids))
+            for key in (current, previous, count):
+                pipeline.expire(key, self.ttl_seconds)
+
+        # WATCH both keys, and retry when another digest changed them meanwhile
+        self.client.transaction(mark, count, current)
@@ -1,8 +1,10 @@
 from dapr.ext.grpc import App, InvokeMethodResponse, InvokeMethodRequest
 
 from news_db_accessor import NewsDBAccessor
+from common.compression import compress_response
+from common.messages import Preferences
+from common.wire import decode, encode
 import logging
-import json
 
 logger = logging.getLogger(__name__)
 
@@ -14,11 +16,10 @@ news_db_accessor = NewsDBAccessor()
 @app.method(name="get_news")
 def get_news(request: InvokeMethodRequest) -> InvokeMethodResponse:
     try:
-        request_data = request.data.decode("utf-8")
-        request_json = json.loads(request_data)
-        language = request_json.get("language", "english")
-        country = request_json.get("country", "us")
-        categories = request_json.get("categories", [])
+        preferences = Preferences.from_dict(decode(request.data))
+        language = preferences.language
+        country = preferences.country
+        categories = preferences.categories
         logger.info(
             f"Fetching news for language: {language}, country: {country}, categories: {categories}"
         )
@@ -31,13 +32,12 @@ def get_news(request: InvokeMethodRequest) -> InvokeMethodResponse:
 
         response_data = {"status": "success", "data": news}
 
-        return InvokeMethodResponse(
-            json.dumps(response_data).encode("utf-8"), "application/json"
-        )
+        response, headers = compress_response(encode(response_data), request.metadata)
+        return InvokeMethodResponse(response, "application/json", headers=headers)
     except Exception as e:
         logger.error(f"Error fetching news: {e}")
         return InvokeMethodResponse(
-            json.dumps({"status": "error", "message": str(e)}).encode("utf-8"),
+            encode({"status": "error", "message": str(e)}),
             "application/json",
         )
 
@@ -59,29 +59,24 @@ def get_news_by_category(category, language, country):
 @app.method(name="update_news")
 def update_news(request: InvokeMethodRequest) -> InvokeMethodResponse:
     try:
-        request_data = request.data.decode("utf-8")
-        request_json = json.loads(request_data)
+        request_json = decode(request.data)
         language = request_json["language"]
         country = request_json["country"]
         category = request_json["category"]
         new_articles = request_json["articles"]
         update_news_by_category(category, language, country, new_articles)
         response_data = {"status": "success", "message": "News updated successfully."}
-        return InvokeMethodResponse(
-            json.dumps(response_data).encode("utf-8"), "application/json"
-        )
+        return InvokeMethodResponse(encode(response_data), "application/json")
     except KeyError as e:
         logger.error(f"Missing required field in update request: {e}")
         return InvokeMethodResponse(
-            json.dumps(
-                {"status": "error", "message": f"Missing required field: {e}"}
-            ).encode("utf-8"),
+            encode({"status": "error", "message": f"Missing required field: {e}"}),
             "application/json",
         )
     except Exception as e:
         logger.error(f"Error updating news: {e}")
         return InvokeMethodResponse(
-            json.dumps({"status": "error", "message": str(e)}).encode("utf-8"),
+            encode({"status": "error", "message": str(e)}),
             "application/json",
         )
 
@@ -101,6 +96,127 @@ def update_news_by_category(category, language, country, news):
         logger.error(f"Error updating news: {e}")
 
 
+@app.method(name="update_news_bulk")
+def update_news_bulk(request: InvokeMethodRequest) -> InvokeMethodResponse:
+    try:
+        request_json = decode(request.data)
+        language = request_json["language"]
+        country = request_json["country"]
+        news = request_json["news"]
+        logger.info(
+            f"Updating news for categories: {list(news)}, language: {language}, country: {country}"
+        )
+        news_db_accessor.update_news_bulk(language=language, country=country, news=news)
+        response_data = {"status": "success", "message": "News updated successfully."}
+        return InvokeMethodResponse(encode(response_data), "application/json")
+    except KeyError as e:
+        logger.error(f"Missing required field in bulk update request: {e}")
+        return InvokeMethodResponse(
+            encode({"status": "error", "message": f"Missing required field: {e}"}),
+            "application/json",
+        )
+    except Exception as e:
+        logger.error(f"Error updating news: {e}")
+        return InvokeMethodResponse(
+            encode({"status": "error", "message": str(e)}),
+            "application/json",
+        )
+
+
+@app.method(name="acquire_lock")
+def acquire_lock(request: InvokeMethodRequest) -> InvokeMethodResponse:
+    try:
+        request_json = decode(request.data)
+        acquired = news_db_accessor.acquire_lock(
+            name=request_json["name"],
+            owner=request_json["owner"],
+            ttl_seconds=int(request_json.get("ttl_seconds", 30)),
+        )
+        response_data = {"status": "success", "acquired": acquired}
+        return InvokeMethodResponse(encode(response_data), "application/json")
+    except KeyError as e:
+        logger.error(f"Missing required field in lock request: {e}")
+        return InvokeMethodResponse(
+            encode({"status": "error", "message": f"Missing required field: {e}"}),
+            "application/json",
+        )
+    except Exception as e:
+        logger.error(f"Error acquiring lock: {e}")
+        return InvokeMethodResponse(
+            encode({"status": "error", "message": str(e)}),
+            "application/json",
+        )
+
+
+@app.method(name="release_lock")
+def release_lock(request: InvokeMethodRequest) -> InvokeMethodResponse:
+    try:
+        request_json = decode(request.data)
+        released = news_db_accessor.release_lock(
+            name=request_json["name"], owner=request_json["owner"]
+        )
+        response_data = {"status": "success", "released": released}
+        return InvokeMethodResponse(encode(response_data), "application/json")
+    except KeyError as e:
+        logger.error(f"Missing required field in lock request: {e}")
+        return InvokeMethodResponse(
+            encode({"status": "error", "message": f"Missing required field: {e}"}),
+            "application/json",
+        )
+    except Exception as e:
+        logger.error(f"Error releasing lock: {e}")
+        return InvokeMethodResponse(
+            encode({"status": "error", "message": str(e)}),
+            "application/json",
+        )
+
+
+@app.method(name="filter_sent_articles")
+def filter_sent_articles(request: InvokeMethodRequest) -> InvokeMethodResponse:
+    try:
+        request_json = decode(request.data)
+        sent = news_db_accessor.filter_sent_articles(
+            email=request_json["email"], article_ids=request_json["article_ids"]
+        )
+        response_data = {"status": "success", "data": sent}
+        return InvokeMethodResponse(encode(response_data), "application/json")
+    except KeyError as e:
+        logger.error(f"Missing required field in sent articles request: {e}")
+        return InvokeMethodResponse(
+            encode({"status": "error", "message": f"Missing required field: {e}"}),
+            "application/json",
+        )
+    except Exception as e:
+        logger.error(f"Error checking sent articles: {e}")
+        return InvokeMethodResponse(
+            encode({"status": "error", "message": str(e)}),
+            "application/json",
+        )
+
+
+@app.method(name="mark_articles_sent")
+def mark_articles_sent(request: InvokeMethodRequest) -> InvokeMethodResponse:
+    try:
+        request_json = decode(request.data)
+        news_db_accessor.mark_articles_sent(
+            email=request_json["email"], article_ids=request_json["article_ids"]
+        )
+        response_data = {"status": "success", "message": "Articles marked as sent."}
+        return InvokeMethodResponse(encode(response_data), "application/json")
+    except KeyError as e:
+        logger.error(f"Missing required field in sent articles request: {e}")
+        return InvokeMethodResponse(
+            encode({"status": "error", "message": f"Missing required field: {e}"}),
+            "application/json",
+        )
+    except Exception as e:
+        logger.error(f"Error marking articles as sent: {e}")
+        return InvokeMethodResponse(
+            encode({"status": "error", "message": str(e)}),
+            "application/json",
+        )
+
+
 def main():
     logging.basicConfig(level=logging.INFO)
     logger.info("Starting News DB Accessor service...")
@@ -0,0 +1,214 @@
+"""
+Throughput of concurrent /get-fresh-news requests on the ASGI server, and on
+the Flask app with async views NewsEngine used before ("flask"), which runs
+every request on a new event loop in a WSGI worker thread and fetches all
+categories before summarizing any of them.
+
+A fake sidecar answers the News API Accessor and the LLM Accessor after a
+fixed latency per category, so the numbers show how well requests and their
+categories overlap while they wait on them. The sidecar, the server and the
+load generator run in separate processes, like in a deployment.
+
+Run from the NewsEngine folder:
+    python benchmarks/fresh_news_benchmark.py
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(
+    1, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+REQUESTS = 200
+CONCURRENCY = 50
+FETCH_LATENCY = 0.1
+SUMMARIZE_LATENCY = 0.2
+CATEGORIES = ["politics", "business", "technology"]
+PREFERENCES = {"language": "english", "country": "us", "categories": CATEGORIES}
+
+# the sidecar address and the server's limits are read from the environment when
+# the server is imported; the limits are set so they do not throttle the load
+SIDECAR_PORT = free_port()
+os.environ["DAPR_HTTP_ENDPOINT"] = f"http://127.0.0.1:{SIDECAR_PORT}"
+os.environ.setdefault("MAX_CONCURRENT_REQUESTS", str(CONCURRENCY))
+os.environ.setdefault("DAPR_HTTP_POOL_SIZE", str(2 * CONCURRENCY))
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+
+def article(category: str, i: int) -> dict:
+    return {
+        "title": f"{category} {i}",
+        "body": f"Body of {category} story {i} " * 20,
+        "image": "",
+        "url": f"https://news.example/{category}/{i}",
+        "dateTimePub": "2024-01-01T00:00:00Z",
+        "category": category,
+    }
+
+
+def serve_fake_sidecar():
+    # the articles of every category are encoded once so the sidecar stays cheap
+    articles = {c: json.dumps([article(c, i) for i in range(20)]) for c in CATEGORIES}
+
+    async def get_news_by_categories(request):
+        categories = json.loads(await request.read())["categories"]
+        await asyncio.sleep(FETCH_LATENCY * len(categories))
+        data = ", ".join(
+            f'{{"category": "{c}", "articles": {articles[c]}}}' for c in categories
+        )
+        return web.Response(
+            text=f'{{"status": "success", "data": [{data}]}}',
+            content_type="application/json",
+        )
+
+    async def summarize(request):
+        categories = json.loads(await request.read())
+        await asyncio.sleep(SUMMARIZE_LATENCY * len(categories))
+        data = ", ".join(f'"{c}": {articles[c]}' for c in categories)
+        return web.Response(
+            text=f'{{"status": "success", "data": {{{data}}}}}',
+            content_type="application/json",
+        )
+
+    async def healthz(request):
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_route(
+        "*",
+        "/v1.0/invoke/newsapi_accessor/method/get_news_by_categories",
+        get_news_by_categories,
+    )
+    app.router.add_route(
+        "*", "/v1.0/invoke/llm_summarization_accessor/method/summarize", summarize
+    )
+    app.router.add_get("/v1.0/healthz/outbound", healthz)
+    web.run_app(app, host="127.0.0.1", port=SIDECAR_PORT, print=None, access_log=None)
+
+
+def serve_asgi(port: int):
+    import uvicorn
+
+    import server
+
+    logging.getLogger().setLevel(logging.WARNING)
+    uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def serve_flask(port: int):
+    """The previous NewsEngine: Flask async views on a threaded WSGI server."""
+    from flask import Flask, jsonify, request
+
+    import server
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    # every request leaves a pooled sidecar session behind on its own event
+    # loop, do not report each of them
+    logging.getLogger("asyncio").setLevel(logging.CRITICAL)
+    flask_app = Flask(__name__)
+
+    @flask_app.route("/get-fresh-news", methods=["GET"])
+    async def get_fresh_news():
+        preferences = request.json
+        raw_news = await server.news_api_client.get_news_by_categories(
+            preferences["categories"], preferences["language"], preferences["country"]
+        )
+        summarized_news = await server.llm_api_client.summarize(raw_news)
+        return jsonify({"status": "success", "data": summarized_news}), 200
+
+    flask_app.run(host="127.0.0.1", port=port, threaded=True)
+
+
+def start(target, *args) -> multiprocessing.Process:
+    process = multiprocessing.Process(target=target, args=args, daemon=True)
+    process.start()
+    return process
+
+
+def wait_for_port(port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port}")
+
+
+async def run_load(port: int):
+    url = f"http://127.0.0.1:{port}/get-fresh-news"
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def call(session):
+        async with semaphore:
+            start = time.perf_counter()
+            async with session.get(url, json=PREFERENCES) as response:
+                body = await response.json()
+                assert body["status"] == "success", body
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=CONCURRENCY)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(call(session) for _ in range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return REQUESTS / elapsed, latencies
+
+
+def report(name: str, target):
+    port = free_port()
+    process = start(target, port)
+    try:
+        wait_for_port(port)
+        throughput, latencies = asyncio.run(run_load(port))
+    finally:
+        process.terminate()
+        process.join()
+    print(
+        f"{name:>6}: {throughput:7.1f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.1f} ms"
+    )
+
+
+def main():
+    sidecar = start(serve_fake_sidecar)
+    wait_for_port(SIDECAR_PORT)
+    print(
+        f"{REQUESTS} requests, {CONCURRENCY} concurrent, upstream latency "
+        f"{FETCH_LATENCY * 1000:.0f} + {SUMMARIZE_LATENCY * 1000:.0f} ms per "
+        f"category, {len(CATEGORIES)} categories"
+    )
+    try:
+        import flask  # noqa: F401
+
+        report("flask", serve_flask)
+    except ImportError:
+        print(" flask: not installed, skipped")
+    report("asgi", serve_asgi)
+    sidecar.terminate()
+
+
+if __name__ == "__main__":
+    main()
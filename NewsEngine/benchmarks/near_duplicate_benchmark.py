@@ -0,0 +1,137 @@
+"""
+Speed and accuracy of the near-duplicate filter on a few thousand synthetic
+articles: distinct stories, copies of them as other outlets republish a wire
+story (a few words changed, a sentence of their own added), and related stories
+that only share some sentences with another one and must be kept.
+
+The LSH index is compared with scanning every article kept so far.
+
+Run from the NewsEngine folder:
+    python benchmarks/near_duplicate_benchmark.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from near_duplicates import NearDuplicateFilter  # noqa: E402
+
+STORIES = 2000
+COPIES = 1000
+RELATED = 500
+THRESHOLDS = [0.7, 0.8, 0.9]
+SEED = 7
+
+rng = random.Random(SEED)
+VOCABULARY = [f"word{i}" for i in range(20000)]
+
+
+def sentence() -> str:
+    words = rng.choices(VOCABULARY, k=rng.randint(12, 25))
+    return " ".join(words) + "."
+
+
+def story() -> list:
+    return [sentence() for _ in range(rng.randint(10, 20))]
+
+
+def republish(sentences: list) -> list:
+    """The same wire story with an outlet's own edits."""
+    sentences = list(sentences)
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(sentences))
+        words = sentences[i].split()
+        words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+        sentences[i] = " ".join(words)
+    if rng.random() < 0.5:
+        sentences.insert(0, sentence())
+    else:
+        sentences.append(sentence())
+    return sentences
+
+
+def related(sentences: list) -> list:
+    """Another story on the same event, quoting some of the first one."""
+    quoted = rng.sample(sentences, k=max(1, len(sentences) // 3))
+    return quoted + story()
+
+
+def make_articles():
+    """Shuffled (story id, body) pairs, copies share the id of their story."""
+    stories = [story() for _ in range(STORIES)]
+    articles = [(i, s) for i, s in enumerate(stories)]
+    articles += [
+        (i, republish(stories[i])) for i in rng.choices(range(STORIES), k=COPIES)
+    ]
+    articles += [
+        (STORIES + j, related(stories[i]))
+        for j, i in enumerate(rng.choices(range(STORIES), k=RELATED))
+    ]
+    rng.shuffle(articles)
+    return [(story_id, " ".join(body)) for story_id, body in articles]
+
+
+def accuracy(articles, duplicates):
+    """Precision and recall of the articles reported as duplicates."""
+    seen_ids = set()
+    expected = []
+    for story_id, _ in articles:
+        expected.append(story_id in seen_ids)
+        seen_ids.add(story_id)
+    true_positives = sum(e and d for e, d in zip(expected, duplicates))
+    precision = true_positives / max(1, sum(duplicates))
+    recall = true_positives / max(1, sum(expected))
+    return precision, recall
+
+
+def linear_scan(articles, threshold):
+    """Compare every article with all the ones kept before it."""
+    near_duplicates = NearDuplicateFilter(threshold)
+    kept = []
+    duplicates = []
+    for _, body in articles:
+        signature = near_duplicates.signature(body)
+        duplicate = any(
+            near_duplicates.similarity(signature, other) >= threshold for other in kept
+        )
+        if not duplicate:
+            kept.append(signature)
+        duplicates.append(duplicate)
+    return duplicates
+
+
+def lsh(articles, threshold):
+    near_duplicates = NearDuplicateFilter(threshold)
+    return [near_duplicates.seen(body) for _, body in articles]
+
+
+def report(name, articles, filter_articles, threshold):
+    start = time.perf_counter()
+    duplicates = filter_articles(articles, threshold)
+    elapsed = time.perf_counter() - start
+    precision, recall = accuracy(articles, duplicates)
+    print(
+        f"{name:>11} @ {threshold}: {elapsed * 1000:8.1f} ms "
+        f"({elapsed / len(articles) * 1e6:6.1f} us/article)  "
+        f"dropped {sum(duplicates):5d}  precision {precision:.3f}  recall {recall:.3f}"
+    )
+
+
+def main():
+    articles = make_articles()
+    print(
+        f"{len(articles)} articles: {STORIES} stories, {COPIES} republished copies, "
+        f"{RELATED} related stories"
+    )
+    for threshold in THRESHOLDS:
+        # the first filter of a threshold also works out its LSH bands
+        NearDuplicateFilter(threshold)
+        report("lsh", articles, lsh, threshold)
+    report("linear scan", articles, linear_scan, 0.8)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+
+
+class Config:
+    APP_PORT = int(os.getenv("APP_PORT", "5001"))
+    NEWS_API_APP_ID = os.getenv("NEWS_API_APP_ID", "newsapi_accessor")
+    LLM_APP_ID = os.getenv("LLM_APP_ID", "llm_summarization_accessor")
+    # Fresh-news requests processed at once, the others wait for a slot
+    MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "32"))
+    # Requests allowed to wait for a slot, more are answered 503 right away
+    MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "256"))
+    # Articles whose body is this similar to an article already taken, in any
+    # category of the request, are left out before summarization
+    NEAR_DUPLICATE_FILTER_ENABLED = (
+        os.getenv("NEAR_DUPLICATE_FILTER_ENABLED", "true").lower() == "true"
+    )
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+    # Ask the News API accessor for all the categories of a request in one call,
+    # which it fetches concurrently or, with NEWS_API_COMBINED_QUERY, in one
+    # newsapi.ai query; each category is still summarized on its own
+    NEWS_API_BATCH_CATEGORIES = (
+        os.getenv("NEWS_API_BATCH_CATEGORIES", "false").lower() == "true"
+    )
@@ -0,0 +1,129 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+_WORD = re.compile(r"\w+")
+# shingle hashes are cut to 32 bits, a slot no shingle fell into holds _EMPTY
+_MASK = (1 << 32) - 1
+_EMPTY = 1 << 32
+
+
+@lru_cache()
+def _lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Number of bands and rows per band for which the chance of missing a pair
+    above the threshold plus the chance of comparing a pair below it is the
+    smallest, as in MinHash LSH. Missing a pair counts nine times as much, as
+    comparing one costs a signature comparison only.
+    """
+    steps = 100
+    false_positive_weight, false_negative_weight = 0.1, 0.9
+
+    def integrate(function, start, end):
+        width = (end - start) / steps
+        return sum(function(start + (i + 0.5) * width) for i in range(steps)) * width
+
+    best = None
+    for rows in range(1, num_perm + 1):
+        for bands in range(1, num_perm // rows + 1):
+
+            def candidate(similarity):
+                return 1 - (1 - similarity**rows) ** bands
+
+            compared = integrate(candidate, 0, threshold)
+            missed = integrate(lambda s: 1 - candidate(s), threshold, 1)
+            error = false_positive_weight * compared + false_negative_weight * missed
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class NearDuplicateFilter:
+    """
+    Finds articles whose body is nearly the same as the body of an article seen
+    before, like one wire story published by several outlets.
+
+    Bodies are compared by the Jaccard similarity of their word shingles,
+    estimated from a MinHash signature (one hash per shingle, binned into
+    num_perm slots, so signing costs the same whatever num_perm is). An LSH
+    index over bands of the signatures finds the candidates, so a lookup does
+    not compare against every article seen.
+    """
+
+    def __init__(
+        self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5
+    ):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _lsh_params(threshold, num_perm)
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+        self._signatures: List[List[int]] = []
+        # texts reported as near duplicates so far
+        self.duplicates = 0
+
+    def _shingles(self, text: str) -> Iterable[Tuple[str, ...]]:
+        words = _WORD.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            return [tuple(words)] if words else []
+        return zip(*(words[i:] for i in range(self.shingle_size)))
+
+    def signature(self, text: str) -> List[int]:
+        """MinHash signature of text, empty if it has no words."""
+        num_perm = self.num_perm
+        signature = [_EMPTY] * num_perm
+        for shingle in self._shingles(text):
+            # hash() differs between processes, signatures are only compared
+            # within the one that made them
+            value = hash(shingle) & _MASK
+            slot = value % num_perm
+            if value < signature[slot]:
+                signature[slot] = value
+        # a slot no shingle fell into takes the value of the next filled one, so
+        # similar texts still agree on it
+        filled = [i for i, value in enumerate(signature) if value != _EMPTY]
+        if not filled:
+            return []
+        if len(filled) < num_perm:
+            next_filled = filled[0] + num_perm
+            for i in reversed(range(num_perm)):
+                if signature[i] != _EMPTY:
+                    next_filled = i
+                else:
+                    signature[i] = signature[next_filled % num_perm] + _EMPTY * (
+                        next_filled - i
+                    )
+        return signature
+
+    def similarity(self, signature: List[int], other: List[int]) -> float:
+        """Estimated Jaccard similarity of the texts of two signatures."""
+        return sum(a == b for a, b in zip(signature, other)) / self.num_perm
+
+    def seen(self, text: str) -> bool:
+        """
+        Whether a near duplicate of text was seen before. If not, text is
+        remembered and its own near duplicates are reported from now on.
+        """
+        signature = self.signature(text)
+        if not signature:
+            return False
+        keys = [
+            (band, tuple(signature[band * self.rows : (band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+        candidates = set()
+        for key in keys:
+            candidates.update(self._buckets.get(key, ()))
+        for candidate in candidates:
+            if self.similarity(signature, self._signatures[candidate]) >= (
+                self.threshold
+            ):
+                self.duplicates += 1
+                return True
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for key in keys:
+            self._buckets[key].append(index)
+        return False
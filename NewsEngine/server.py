@@ -1,46 +1,288 @@
-from flask import Flask, request, jsonify
+import asyncio
+import contextlib
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from config import Config
+from near_duplicates import NearDuplicateFilter
 from services.news_api_accessor_client import AsyncGRPCNewsApiClient
 from services.llm_api_accessor_client import AsyncGRPCLLMApiClient
-import logging
-import asyncio
+from common.config import SidecarConfig
+from common.dapr_client import get_sidecar_client
+from common.deadline import deadline_from_headers, deadline_scope, expired
+from common.messages import Preferences
+from common.metrics import LATENCY_BUCKETS
+from common.news_article import NewsArticle
+from common.wire import MessageError, decode, encode
 
-app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Clients for News API Accessor and LLM API Accessor
-news_api_client = AsyncGRPCNewsApiClient("newsapi_accessor")
-llm_api_client = AsyncGRPCLLMApiClient("llm_summarization_accessor")
+# Clients for News API Accessor and LLM API Accessor, shared by all requests:
+# they run on the server's single event loop and so reuse its pooled connections
+news_api_client = AsyncGRPCNewsApiClient(Config.NEWS_API_APP_ID)
+llm_api_client = AsyncGRPCLLMApiClient(Config.LLM_APP_ID)
+request_slots = asyncio.Semaphore(Config.MAX_CONCURRENT_REQUESTS)
+# requests waiting for a slot, only touched from the event loop
+queued_requests = 0
+NDJSON = "application/x-ndjson"
 
+STAGE_SECONDS = Histogram(
+    "news_engine_stage_seconds",
+    "Duration of fetching raw news from newsapi.ai and summarizing it with Gemini",
+    ("stage",),
+    buckets=LATENCY_BUCKETS,
+)
+NEAR_DUPLICATES = Counter(
+    "news_engine_near_duplicates_total",
+    "Articles left out before summarization as near duplicates of another article",
+)
 
-@app.route("/get-fresh-news", methods=["GET"])
-async def get_fresh_news():
+
+class WireJSONResponse(JSONResponse):
+    """JSONResponse encoded with the codec the services share."""
+
+    def render(self, content) -> bytes:
+        return encode(content)
+
+
+async def get_fresh_news(request: Request) -> Response:
+    global queued_requests
+    if request_slots.locked() and queued_requests >= Config.MAX_QUEUED_REQUESTS:
+        return WireJSONResponse({"status": "error", "message": "Server is busy"}, 503)
     try:
         logger.info("Received request for fresh news...")
-        preferences = request.json
-        categories = preferences.get("categories", [])
-        language = preferences.get("language", "en")
-        country = preferences.get("country", "us")
-
-        # Step 1: Fetch raw news from News API Accessor
-        raw_news = await news_api_client.get_news_by_categories(
-            categories, language, country
-        )
-        if not raw_news:
-            return jsonify({"status": "error", "message": "No news found"}), 404
-
-        logger.info("Fetched raw news. Sending for summarization...")
+        preferences = Preferences.from_dict(decode(await request.body()))
+        categories = preferences.categories
+        language = preferences.language
+        country = preferences.country
+        stream = NDJSON in request.headers.get("accept", "")
 
-        # Step 2: Summarize news using LLM API Accessor
-        summarized_news = await llm_api_client.summarize(raw_news)
-        logger.info(f"len of summarized_news: {len(summarized_news)}")
-        logger.info("Summarized news successfully. Returning to News Manager.")
-        return jsonify({"status": "success", "data": summarized_news}), 200
+        # calls below forward what is left of the caller's deadline
+        with deadline_scope(deadline_from_headers(request.headers)):
+            queued_requests += 1
+            try:
+                await request_slots.acquire()
+            finally:
+                queued_requests -= 1
+            if stream:
+                return stream_fresh_news(categories, language, country)
+            try:
+                return await fetch_and_summarize(categories, language, country)
+            finally:
+                request_slots.release()
 
+    except MessageError as e:
+        logger.error(f"Invalid get_fresh_news request: {e}")
+        return WireJSONResponse({"status": "error", "message": str(e)}, 400)
     except Exception as e:
         logger.error(f"Error in get_fresh_news: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return WireJSONResponse({"status": "error", "message": str(e)}, 500)
+
+
+def start_categories(categories, language, country) -> List[asyncio.Task]:
+    """
+    Start fetching and summarizing every category on its own and all of them
+    at once, so a category is summarized as soon as it arrives and a request
+    takes as long as its slowest category rather than all of them together.
+    They share one near-duplicate filter, a story is kept in the category that
+    arrives first.
+
+    With NEWS_API_BATCH_CATEGORIES the raw news of all categories are fetched
+    in one call, and each category is summarized as soon as that call returns.
+    """
+    near_duplicates = (
+        NearDuplicateFilter(Config.NEAR_DUPLICATE_THRESHOLD)
+        if Config.NEAR_DUPLICATE_FILTER_ENABLED
+        else None
+    )
+    if Config.NEWS_API_BATCH_CATEGORIES and len(categories) > 1:
+        fetch = asyncio.ensure_future(
+            fetch_raw_news(categories, language, country, near_duplicates)
+        )
+        tasks = [
+            asyncio.ensure_future(summarize_fetched_category(category, fetch))
+            for category in categories
+        ]
+        # nobody waits for the raw news any more once every category is done
+        asyncio.gather(*tasks, return_exceptions=True).add_done_callback(
+            lambda _: fetch.cancel()
+        )
+    else:
+        tasks = [
+            asyncio.ensure_future(
+                fetch_and_summarize_category(
+                    category, language, country, near_duplicates
+                )
+            )
+            for category in categories
+        ]
+    if near_duplicates is not None:
+        asyncio.gather(*tasks, return_exceptions=True).add_done_callback(
+            lambda _: NEAR_DUPLICATES.inc(near_duplicates.duplicates)
+        )
+    return tasks
+
+
+async def fetch_and_summarize(categories, language, country) -> WireJSONResponse:
+    if expired():
+        return WireJSONResponse(
+            {"status": "error", "message": "Deadline exceeded"}, 504
+        )
+
+    results = await asyncio.gather(*start_categories(categories, language, country))
+    fetched = [result for result in results if result is not None]
+    if not fetched:
+        if expired():
+            return WireJSONResponse(
+                {"status": "error", "message": "Deadline exceeded"}, 504
+            )
+        return WireJSONResponse({"status": "error", "message": "No news found"}, 404)
+
+    summarized_news = {}
+    for summary in fetched:
+        summarized_news.update(summary)
+    logger.info(f"len of summarized_news: {len(summarized_news)}")
+    logger.info("Summarized news successfully. Returning to News Manager.")
+    return WireJSONResponse({"status": "success", "data": summarized_news}, 200)
+
+
+def stream_fresh_news(categories, language, country) -> Response:
+    """
+    Answer with one NDJSON record per category as soon as it is summarized,
+    {"category": ..., "articles": [...]}, then a {"status": ...} record.
+
+    Takes over the request slot, which is released once every category is done.
+    """
+    if expired():
+        request_slots.release()
+        return WireJSONResponse(
+            {"status": "error", "message": "Deadline exceeded"}, 504
+        )
+    tasks = start_categories(categories, language, country)
+    asyncio.gather(*tasks, return_exceptions=True).add_done_callback(
+        lambda _: request_slots.release()
+    )
+    return StreamingResponse(category_records(tasks), media_type=NDJSON)
+
+
+async def category_records(tasks: List[asyncio.Task]) -> AsyncIterator[bytes]:
+    fetched = False
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            summary = await next_done
+            if summary is None:
+                continue
+            fetched = True
+            for category, articles in summary.items():
+                yield encode({"category": category, "articles": articles}) + b"\n"
+        if fetched:
+            logger.info("Streamed summarized news to News Manager.")
+            yield encode({"status": "success"}) + b"\n"
+        else:
+            yield encode({"status": "error", "message": "No news found"}) + b"\n"
+    finally:
+        # the caller went away, stop working for it
+        for task in tasks:
+            task.cancel()
+
+
+async def fetch_raw_news(
+    categories: List[str],
+    language: str,
+    country: str,
+    near_duplicates: Optional[NearDuplicateFilter] = None,
+) -> Dict[str, List[NewsArticle]]:
+    """Raw news of the categories from the News API Accessor, keyed by category."""
+    with STAGE_SECONDS.labels(stage="fetch").time():
+        return await news_api_client.get_news_by_categories(
+            categories, language, country, near_duplicates
+        )
+
+
+async def summarize_category(
+    category: str, raw_news: Dict[str, List[NewsArticle]]
+) -> Optional[Dict[str, List[Dict]]]:
+    """
+    Summarizes the raw news of one category.
+
+    Returns:
+        The summarized articles of the category keyed by category (empty if the
+        summarization failed), or None if no news were fetched in time.
+    """
+    if category not in raw_news or expired():
+        return None
+
+    logger.info(f"Fetched raw news for {category}. Sending for summarization...")
+
+    with STAGE_SECONDS.labels(stage="summarize").time():
+        return await llm_api_client.summarize({category: raw_news[category]})
+
+
+async def fetch_and_summarize_category(
+    category: str,
+    language: str,
+    country: str,
+    near_duplicates: Optional[NearDuplicateFilter] = None,
+) -> Optional[Dict[str, List[Dict]]]:
+    """Fetches the news of one category and summarizes them."""
+    raw_news = await fetch_raw_news([category], language, country, near_duplicates)
+    return await summarize_category(category, raw_news)
+
+
+async def summarize_fetched_category(
+    category: str, fetch: "asyncio.Future[Dict[str, List[NewsArticle]]]"
+) -> Optional[Dict[str, List[Dict]]]:
+    """Summarizes one category of the raw news of a fetch shared by several."""
+    # shielded, cancelling one category must not cancel the fetch of the others
+    return await summarize_category(category, await asyncio.shield(fetch))
+
+
+async def metrics(request: Request) -> Response:
+    return Response(generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    # open the sidecar connection pool in the background, the sidecar itself
+    # only starts once this app listens
+    warm_up = asyncio.ensure_future(get_sidecar_client().warm_up())
+    yield
+    warm_up.cancel()
+    await get_sidecar_client().close()
+
+
+app = Starlette(
+    routes=[
+        Route("/get-fresh-news", get_fresh_news, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ],
+    # gzip large answers to callers that accept it, compressed requests are
+    # read by common.wire
+    middleware=(
+        [
+            Middleware(
+                GZipMiddleware,
+                minimum_size=SidecarConfig.PAYLOAD_COMPRESSION_MIN_BYTES,
+                compresslevel=SidecarConfig.PAYLOAD_COMPRESSION_LEVEL,
+            )
+        ]
+        if SidecarConfig.PAYLOAD_COMPRESSION
+        else []
+    ),
+    lifespan=lifespan,
+)
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5001, debug=True)
+    # one process and one event loop, requests overlap on it
+    uvicorn.run(app, host="0.0.0.0", port=Config.APP_PORT)
@@ -1,10 +1,9 @@
-from services.news_article import NewsArticle
+from common.news_article import NewsArticle
 import logging
 from typing import List, Dict
 
-from dapr.clients import DaprClient
-
-import json
+from common.dapr_client import get_sidecar_client
+from common.wire import MessageError, decode, encode
 
 
 class AsyncGRPCLLMApiClient:
@@ -12,7 +11,7 @@ class AsyncGRPCLLMApiClient:
     def __init__(self, app_id: str):
         self.app_id = app_id
         self.logger = logging.getLogger(__name__)
-        self.dapr_client = DaprClient()
+        self.dapr_client = get_sidecar_client()
 
     async def summarize(
         self, articles: Dict[str, List[NewsArticle]]
@@ -27,35 +26,27 @@ class AsyncGRPCLLMApiClient:
             A dictionary of summarized articles grouped by category, or an empty dict on failure.
         """
         try:
-            # Convert NewsArticle objects to dictionaries
-            articles_dict = {
-                category: [article.to_dict() for article in articles_list]
-                for category, articles_list in articles.items()
-            }
-
-            # Send the request
-            return await self._summarize(articles_dict)
+            # NewsArticle objects are encoded straight to the request body
+            return await self._summarize(encode(articles))
         except Exception as e:
             self.logger.error(f"Unexpected error preparing summarization request: {e}")
             return {}
 
-    async def _summarize(
-        self, articles_dict: Dict[str, List[Dict]]
-    ) -> Dict[str, List[Dict]]:
+    async def _summarize(self, data: bytes) -> Dict[str, List[Dict]]:
         try:
             self.logger.info("Sending request to summarize articles...")
             response = await self.dapr_client.invoke_method_async(
                 app_id=self.app_id,
                 method_name="summarize",
                 content_type="application/json",  # Adjusted to match service.py
-                data=json.dumps(articles_dict).encode("utf-8"),
+                data=data,
             )
 
             # Log status and decode response
             self.logger.info(
                 f"Received response with status code: {response.status_code}"
             )
-            response_data = json.loads(response.data.decode("utf-8"))
+            response_data = decode(response.data)
 
             if response_data["status"] == "success":
                 self.logger.info("Summarization successful.")
@@ -69,7 +60,7 @@ class AsyncGRPCLLMApiClient:
                 self.logger.error(f"Unexpected response format: {response_data}")
                 return {}
 
-        except json.JSONDecodeError as e:
+        except MessageError as e:
             self.logger.error(f"Error decoding response JSON: {e}")
             return {}
 
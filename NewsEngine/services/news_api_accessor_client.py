@@ -1,10 +1,12 @@
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-from dapr.clients import DaprClient
-import json
+from common.dapr_client import get_sidecar_client
+from common.messages import Preferences
+from common.wire import decode, encode
 
-from services.news_article import NewsArticle
+from near_duplicates import NearDuplicateFilter
+from common.news_article import NewsArticle
 
 logger = logging.getLogger(__name__)
 
@@ -12,11 +14,15 @@ logger = logging.getLogger(__name__)
 class AsyncGRPCNewsApiClient:
     def __init__(self, app_id):
         self.app_id = app_id
-        self.dapr_client = DaprClient()
+        self.dapr_client = get_sidecar_client()
         self.logger = logging.getLogger(__name__)
 
     async def get_news_by_categories(
-        self, categories, language, country
+        self,
+        categories,
+        language,
+        country,
+        near_duplicates: Optional[NearDuplicateFilter] = None,
     ) -> Dict[str, List[NewsArticle]]:
         try:
             self.logger.info(
@@ -26,16 +32,16 @@ class AsyncGRPCNewsApiClient:
                 app_id=self.app_id,
                 method_name="get_news_by_categories",
                 content_type="application/grpc",
-                data=json.dumps(
-                    {"categories": categories, "language": language, "country": country}
-                ).encode("utf-8"),
+                data=encode(Preferences(language, country, categories)),
             )
             self.logger.info(f"GOT RESPONSE: {response.status_code}")
 
-            data = json.loads(response.data.decode("utf-8"))
+            data = decode(response.data)
 
             if data["status"] == "success":
-                news_articles = await self._extract_articles_by_category(data)
+                news_articles = await self._extract_articles_by_category(
+                    data, near_duplicates
+                )
                 return news_articles
             elif data["status"] == "error":
                 self.logger.error(f"Error getting news: {data['message']}")
@@ -49,13 +55,15 @@ class AsyncGRPCNewsApiClient:
             return {}
 
     async def _extract_articles_by_category(
-        self, parsed_data
+        self, parsed_data, near_duplicates: Optional[NearDuplicateFilter] = None
     ) -> Dict[str, List[NewsArticle]]:
         """
         Extracts articles grouped by category, each containing the body, title, image URL, and URL.
 
         Args:
             data (bytes): The raw data object containing article information in JSON format.
+            near_duplicates: If given, articles it has seen a near duplicate of, in
+                this or an earlier call, are left out.
 
         Returns:
             dict: A dictionary where each key is a category, and the value is a list of articles.
@@ -70,16 +78,16 @@ class AsyncGRPCNewsApiClient:
 
                 for article in category_data.get("articles", []):
                     # Extract required fields
-                    article_info = {
-                        "title": article.get("title", "No Title"),
-                        "body": article.get("body", ""),
-                        "image": article.get("image", ""),
-                        "url": article.get("url", ""),
-                        "dateTimePub": article.get("dateTimePub", ""),
-                        "category": category,
-                    }
-                    article = NewsArticle.from_dict(article_info)
-                    articles.append(article)
+                    articles.append(
+                        NewsArticle(
+                            title=article.get("title", "No Title"),
+                            body=article.get("body", ""),
+                            image=article.get("image", ""),
+                            url=article.get("url", ""),
+                            dateTimePub=article.get("dateTimePub", ""),
+                            category=category,
+                        )
+                    )
                 # Filter articles with non-empty body
                 articles = [article for article in articles if article.body]
 
@@ -90,8 +98,17 @@ class AsyncGRPCNewsApiClient:
                     reverse=True,
                 )
 
-                # Take the first 10 articles
-                articles = articles[:10]
+                # Take the first 10 articles that are not near duplicates
+                if near_duplicates is None:
+                    articles = articles[:10]
+                else:
+                    kept = []
+                    for article in articles:
+                        if len(kept) == 10:
+                            break
+                        if not near_duplicates.seen(article.body):
+                            kept.append(article)
+                    articles = kept
 
                 # Store articles in the appropriate category list
                 if category not in categorized_articles:
@@ -99,6 +116,6 @@ class AsyncGRPCNewsApiClient:
                 categorized_articles[category].extend(articles)
 
             return categorized_articles
-        except (json.JSONDecodeError, AttributeError, TypeError) as e:
+        except (AttributeError, TypeError) as e:
             logger.error(f"Error extracting articles by category: {e}")
             return {}
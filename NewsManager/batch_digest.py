@@ -0,0 +1,110 @@
+import asyncio
+import contextvars
+import logging
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class SegmentStats:
+    segment: str
+    members: int
+    delivered: int = 0
+    failed: int = 0
+    digest_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    @property
+    def digests_per_second(self) -> float:
+        if not self.total_seconds:
+            return 0.0
+        return self.delivered / self.total_seconds
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), "digests_per_second": self.digests_per_second}
+
+    def summary(self) -> str:
+        return (
+            f"{self.segment} members={self.members} delivered={self.delivered} "
+            f"failed={self.failed} digest={self.digest_seconds:.3f}s "
+            f"total={self.total_seconds:.3f}s "
+            f"throughput={self.digests_per_second:.1f} digests/s"
+        )
+
+
+class DigestBatcher:
+    """
+    Collects get-news requests for a short window and hands them to the
+    NewsService as one batch, so users sharing a preference segment are served
+    from a single digest.
+
+    Every submitted request waits until the whole batch it belongs to has been
+    processed and then returns that user's result. `add` queues a request
+    without waiting, for callers that must not block until the batch is done.
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        handle_batch: Callable[[List[Dict[str, str]]], Awaitable[Dict]],
+        window_seconds: float = 2.0,
+        max_size: int = 500,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.handle_batch = handle_batch
+        self.window_seconds = window_seconds
+        self.max_size = max_size
+        self._pending: List[Tuple[Dict[str, str], asyncio.Future]] = []
+        self._batch_context: Optional[contextvars.Context] = None
+        self._timer = None
+
+    def add(self, email: str, password: str) -> asyncio.Future:
+        """
+        Add a request to the pending batch. The returned future gets the user's
+        result once the batch has been processed.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            # the batch runs under its oldest request's context and deadline
+            self._batch_context = contextvars.copy_context()
+        self._pending.append(({"email": email, "password": password}, future))
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self.flush)
+        return future
+
+    async def submit(self, email: str, password: str) -> Dict:
+        return await self.add(email, password)
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(
+                self._process(batch), context=self._batch_context
+            )
+
+    async def _process(self, batch: List[Tuple[Dict[str, str], asyncio.Future]]):
+        self.logger.info(f"Processing batch of {len(batch)} get-news requests")
+        try:
+            response = await self.handle_batch([request for request, _ in batch])
+            results = response.get("results", {})
+            for request, future in batch:
+                if not future.done():
+                    future.set_result(
+                        results.get(
+                            request["email"],
+                            {"status": "error", "message": "Missing batch result"},
+                        )
+                    )
+        except Exception as e:
+            self.logger.error(f"Error processing batch: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(
+                        {"status": "error", "message": "Internal service error"}
+                    )
@@ -0,0 +1,503 @@
+"""
+End-to-end load test of NewsManager that needs none of its real dependencies.
+
+NewsService runs unmodified, with its real clients, SidecarClient, queue
+consumer or digest batcher (as configured through the usual environment
+variables, e.g. BATCH_MODE=true). Its service invocations go to a fake Dapr
+sidecar on a background thread, which answers them from in-process stand-ins:
+
+- users_manager: an in-memory user store
+- news_db_accessor: the real NewsDBAccessor on top of fakeredis
+- news_engine: one query per category to a fake EventRegistry and one
+  summarization per category by a fake Gemini model, all categories at once,
+  like the News Engine does with the News API and LLM accessors, streamed as
+  NDJSON when NEWS_ENGINE_STREAMING=true
+- email_api_accessor: a fake SendGrid
+
+Synthetic newsqueue messages arrive at a fixed rate and are handled like
+server.newsqueue does, on a pool of binding threads of the same size, or
+of BINDING_PREFETCH_COUNT, the deliveries the broker has out at a time. The
+report has the throughput, the latency percentiles from arrival to completion
+and the number of upstream calls.
+
+Run from the NewsManager folder:
+    python benchmarks/load_test.py --rate 20 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, ROOT)
+sys.path.append(os.path.join(ROOT, "NewsDBAccessor"))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# the sidecar address is read from the environment when the clients are imported
+PORT = free_port()
+os.environ["DAPR_HTTP_ENDPOINT"] = f"http://127.0.0.1:{PORT}"
+
+import fakeredis  # noqa: E402
+import news_db_accessor  # noqa: E402
+from aiohttp import web  # noqa: E402
+from prometheus_client import REGISTRY  # noqa: E402
+
+from batch_digest import DigestBatcher  # noqa: E402
+from config import Config  # noqa: E402
+from news_service import NewsService  # noqa: E402
+from queue_consumer import QueueConsumer  # noqa: E402
+from common.compression import compress_response  # noqa: E402
+from common.dapr_client import get_sidecar_client  # noqa: E402
+from common.deadline import deadline_scope  # noqa: E402
+from common.wire import decode, encode  # noqa: E402
+from services.news_engine_client import NDJSON  # noqa: E402
+
+LANGUAGES = ["english", "hebrew", "french"]
+COUNTRIES = ["us", "israel", "uk", "france"]
+CATEGORIES = ["politics", "business", "technology", "health", "sports", "environment"]
+
+Handler = Callable[[dict], Awaitable[dict]]
+
+
+class FakeEventRegistry:
+    """newsapi.ai stand-in: every query returns a page of new articles."""
+
+    def __init__(self, latency: float, page_size: int):
+        self.latency = latency
+        self.page_size = page_size
+        self.queries = 0
+
+    async def query_articles(self, category: str, language: str, country: str):
+        self.queries += 1
+        page = self.queries
+        await asyncio.sleep(self.latency)
+        published = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        base_url = f"https://news.example/{country}/{language}/{category}"
+        return [
+            {
+                "title": f"{category} story {page}-{i}",
+                "body": f"Full text of {category} story {page}-{i} " * 20,
+                "url": f"{base_url}/{page}-{i}",
+                "image": f"{base_url}/{page}-{i}.jpg" if i % 2 else "",
+                "dateTimePub": published,
+            }
+            for i in range(self.page_size)
+        ]
+
+
+class FakeGemini:
+    """Gemini stand-in: a fixed latency per request plus one per article."""
+
+    def __init__(self, latency: float, latency_per_article: float):
+        self.latency = latency
+        self.latency_per_article = latency_per_article
+        self.requests = 0
+        self.articles = 0
+
+    async def generate_content(self, articles: List[dict]) -> List[dict]:
+        self.requests += 1
+        self.articles += len(articles)
+        await asyncio.sleep(self.latency + self.latency_per_article * len(articles))
+        return [
+            {"title": f"Summary: {article['title']}", "body": article["body"][:120]}
+            for article in articles
+        ]
+
+
+class FakeSendGrid:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.emails = 0
+
+    async def send(self, email: str, articles: List[dict]) -> bool:
+        self.emails += 1
+        await asyncio.sleep(self.latency)
+        return True
+
+
+class StandIns:
+    """The services NewsManager calls, answering in their wire format."""
+
+    def __init__(self, args, users: Dict[str, dict]):
+        self.users = users
+        self.users_latency = args.users_latency
+        self.event_registry = FakeEventRegistry(
+            args.newsapi_latency, args.articles_per_query
+        )
+        self.gemini = FakeGemini(args.gemini_latency, args.gemini_latency_per_article)
+        self.sendgrid = FakeSendGrid(args.sendgrid_latency)
+        with mock.patch.object(
+            news_db_accessor.redis, "StrictRedis", fakeredis.FakeStrictRedis
+        ):
+            self.news_db = news_db_accessor.NewsDBAccessor()
+        self.calls: Counter = Counter()
+
+    def handlers(self) -> Dict[Tuple[str, str], Handler]:
+        users = Config.USERS_MANAGER_SERVICE_APP_ID
+        news_db = Config.NEWS_DB_ACCESSOR_SERVICE_APP_ID
+        return {
+            (users, "GetUserPreferencesByEmailAddress"): self.get_user_preferences,
+            (news_db, "get_news"): self.get_news,
+            (news_db, "update_news_bulk"): self.update_news_bulk,
+            (news_db, "filter_sent_articles"): self.filter_sent_articles,
+            (news_db, "mark_articles_sent"): self.mark_articles_sent,
+            (news_db, "acquire_lock"): self.acquire_lock,
+            (news_db, "release_lock"): self.release_lock,
+            ("news_engine", "get-fresh-news"): self.get_fresh_news,
+            ("email_api_accessor", "send-email"): self.send_email,
+        }
+
+    async def get_user_preferences(self, request: dict) -> dict:
+        await asyncio.sleep(self.users_latency)
+        user = self.users.get(request.get("email"))
+        if user is None:
+            return {"error": "User not found"}
+        if user["password"] != request.get("password"):
+            return {"error": "Invalid password"}
+        return {"success": True, "preferences": user["preferences"]}
+
+    async def get_news(self, request: dict) -> dict:
+        return {
+            "status": "success",
+            "data": {
+                category: self.news_db.get_news(
+                    category, request["language"], request["country"]
+                )
+                for category in request["categories"]
+            },
+        }
+
+    async def update_news_bulk(self, request: dict) -> dict:
+        self.news_db.update_news_bulk(
+            request["language"], request["country"], request["news"]
+        )
+        return {"status": "success"}
+
+    async def filter_sent_articles(self, request: dict) -> dict:
+        sent = self.news_db.filter_sent_articles(
+            request["email"], request["article_ids"]
+        )
+        return {"status": "success", "data": sent}
+
+    async def mark_articles_sent(self, request: dict) -> dict:
+        self.news_db.mark_articles_sent(request["email"], request["article_ids"])
+        return {"status": "success"}
+
+    async def acquire_lock(self, request: dict) -> dict:
+        acquired = self.news_db.acquire_lock(
+            request["name"], request["owner"], int(request.get("ttl_seconds", 30))
+        )
+        return {"status": "success", "acquired": acquired}
+
+    async def release_lock(self, request: dict) -> dict:
+        # the fake Redis has no Lua, delete the lock if the owner still holds it
+        key = self.news_db._get_lock_key(request["name"])
+        released = self.news_db.client.get(key) == request["owner"]
+        if released:
+            self.news_db.client.delete(key)
+        return {"status": "success", "released": released}
+
+    async def fetch_and_summarize(
+        self, category: str, language: str, country: str
+    ) -> List[dict]:
+        articles = await self.event_registry.query_articles(category, language, country)
+        # the News Engine keeps the first 10 articles of each category
+        articles = articles[:10]
+        summaries = await self.gemini.generate_content(
+            [{"title": a["title"], "body": a["body"]} for a in articles]
+        )
+        return [
+            {**article, **summary, "category": category}
+            for article, summary in zip(articles, summaries)
+        ]
+
+    async def get_fresh_news(self, request: dict) -> dict:
+        # like the News Engine, every category is fetched and summarized at once
+        categories = request["categories"]
+        summarized = await asyncio.gather(
+            *(
+                self.fetch_and_summarize(c, request["language"], request["country"])
+                for c in categories
+            )
+        )
+        return {"status": "success", "data": dict(zip(categories, summarized))}
+
+    async def stream_fresh_news(self, request: dict) -> AsyncIterator[dict]:
+        """get-fresh-news as NDJSON records, one per category as it is done."""
+
+        async def category_record(category: str) -> dict:
+            articles = await self.fetch_and_summarize(
+                category, request["language"], request["country"]
+            )
+            return {"category": category, "articles": articles}
+
+        for record in asyncio.as_completed(
+            [category_record(c) for c in request["categories"]]
+        ):
+            yield await record
+        yield {"status": "success"}
+
+    async def send_email(self, request: dict) -> dict:
+        await self.sendgrid.send(request["email"], request["news"])
+        return {"status": "success"}
+
+
+def start_fake_sidecar(stand_ins: StandIns) -> asyncio.AbstractEventLoop:
+    handlers = stand_ins.handlers()
+
+    async def invoke(request):
+        key = (request.match_info["app_id"], request.match_info["method"])
+        stand_ins.calls[key] += 1
+        handler = handlers.get(key)
+        if handler is None:
+            return web.Response(status=404, text=f"No stand-in for {key}")
+        # read and answer like the services do, gzipped bodies included
+        body = decode(await request.read() or b"{}")
+        if key == ("news_engine", "get-fresh-news") and NDJSON in request.headers.get(
+            "Accept", ""
+        ):
+            response = web.StreamResponse(headers={"Content-Type": NDJSON})
+            await response.prepare(request)
+            async for record in stand_ins.stream_fresh_news(body):
+                await response.write(json.dumps(record).encode("utf-8") + b"\n")
+            await response.write_eof()
+            return response
+        body, headers = compress_response(
+            encode(await handler(body)),
+            {name.lower(): value for name, value in request.headers.items()},
+        )
+        return web.Response(
+            body=body, headers=dict(headers), content_type="application/json"
+        )
+
+    async def healthz(request):
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_route("*", "/v1.0/invoke/{app_id}/method/{method}", invoke)
+    app.router.add_get("/v1.0/healthz/outbound", healthz)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app, access_log=None)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", PORT).start())
+    threading.Thread(target=loop.run_forever, name="fake-sidecar", daemon=True).start()
+    return loop
+
+
+def make_users(num_users: int, num_segments: int, rng: random.Random) -> Dict:
+    segments = [
+        {
+            "language": rng.choice(LANGUAGES),
+            "country": rng.choice(COUNTRIES),
+            "categories": rng.sample(CATEGORIES, rng.randint(1, 3)),
+        }
+        for _ in range(num_segments)
+    ]
+    # a few popular segments and a long tail, like real preferences
+    weights = [1 / (rank + 1) for rank in range(num_segments)]
+    return {
+        f"user{i}@example.com": {
+            "password": "secret",
+            "preferences": rng.choices(segments, weights)[0],
+        }
+        for i in range(num_users)
+    }
+
+
+class NewsManagerUnderTest:
+    """NewsService wired like server.py, on its own event loop thread."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(
+            target=self.loop.run_forever, name="news-service-loop", daemon=True
+        ).start()
+        self.news_service = NewsService()
+        self.digest_batcher = (
+            DigestBatcher(
+                self.news_service.handle_get_news_batch,
+                window_seconds=Config.BATCH_WINDOW_SECONDS,
+                max_size=Config.BATCH_MAX_PENDING,
+            )
+            if Config.BATCH_MODE
+            else None
+        )
+        self.queue_consumer = (
+            QueueConsumer(
+                None if self.digest_batcher else self.news_service.handle_get_news,
+                workers=Config.CONSUMER_WORKERS,
+                queue_size=Config.CONSUMER_QUEUE_SIZE,
+                ack_mode=Config.CONSUMER_ACK_MODE,
+                enqueue_timeout_seconds=Config.CONSUMER_ENQUEUE_TIMEOUT_SECONDS,
+                stats_log_interval=0,
+                hand_off=self.digest_batcher.add if self.digest_batcher else None,
+                max_handed_off=Config.BATCH_MAX_PENDING,
+            )
+            if Config.CONSUMER_MODE
+            else None
+        )
+        self.run(get_sidecar_client().warm_up())
+        if self.queue_consumer:
+            self.run(self.queue_consumer.start())
+        # a message is acked when its handler returns, and the broker has at
+        # most prefetchCount unacked deliveries out
+        self.binding_threads = min(
+            max(
+                Config.BINDING_MAX_WORKERS,
+                Config.CONSUMER_WORKERS
+                + Config.CONSUMER_QUEUE_SIZE
+                + (Config.BATCH_MAX_PENDING if Config.BATCH_MODE else 0),
+            ),
+            Config.BINDING_PREFETCH_COUNT,
+        )
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def _handle(self, email: str, password: str, received_at: float) -> Dict:
+        if self.queue_consumer:
+            coroutine = self.queue_consumer.submit(email, password)
+        elif self.digest_batcher:
+            coroutine = self.digest_batcher.submit(email, password)
+        else:
+            coroutine = self.news_service.handle_get_news(email, password)
+        elapsed = time.monotonic() - received_at
+        with deadline_scope(Config.REQUEST_DEADLINE_SECONDS - elapsed):
+            return await coroutine
+
+    def newsqueue(self, message: bytes) -> str:
+        """Handle one binding message, returns the outcome."""
+        received_at = time.monotonic()
+        data_request = json.loads(message.decode("utf-8"))
+        try:
+            response = self.run(
+                self._handle(
+                    data_request["email"], data_request["password"], received_at
+                )
+            )
+        except TimeoutError:
+            return "rejected"
+        except Exception as e:
+            logging.error(f"Error processing get-news request: {e}")
+            return "error"
+        return response["status"]
+
+    def stop(self):
+        if self.queue_consumer:
+            self.run(self.queue_consumer.stop())
+        self.run(get_sidecar_client().close())
+
+
+def percentile(values: List[float], q: float) -> float:
+    return values[min(int(len(values) * q), len(values) - 1)] if values else 0.0
+
+
+def drive(system: NewsManagerUnderTest, users: Dict, rate: float, duration: float):
+    """Deliver messages at `rate` per second and wait for all of them."""
+    emails = list(users)
+    results = []
+    lock = threading.Lock()
+
+    def deliver(email: str, arrival: float):
+        message = json.dumps({"email": email, "password": "secret"}).encode("utf-8")
+        outcome = system.newsqueue(message)
+        with lock:
+            results.append((outcome, time.perf_counter() - arrival))
+
+    total = int(rate * duration)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=system.binding_threads) as pool:
+        for i in range(total):
+            arrival = start + i / rate
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # messages wait in the broker until a binding thread is free
+            pool.submit(deliver, emails[i % len(emails)], arrival)
+    return results, time.perf_counter() - start
+
+
+def report(results, elapsed: float, system: NewsManagerUnderTest, stand_ins):
+    outcomes = Counter(outcome for outcome, _ in results)
+    latencies = sorted(latency for _, latency in results)
+    print(f"messages:      {len(results)} in {elapsed:.1f}s {dict(outcomes)}")
+    print(f"throughput:    {outcomes['success'] / elapsed:.1f} digests/s")
+    print(
+        f"latency:       p50 {percentile(latencies, 0.5):.3f}s  "
+        f"p95 {percentile(latencies, 0.95):.3f}s  "
+        f"p99 {percentile(latencies, 0.99):.3f}s  "
+        f"max {percentile(latencies, 1):.3f}s"
+    )
+    print(f"cache:         {dict(system.news_service.cache_outcomes)}")
+    print(
+        f"upstream:      newsapi.ai queries {stand_ins.event_registry.queries}, "
+        f"gemini requests {stand_ins.gemini.requests} "
+        f"({stand_ins.gemini.articles} articles), "
+        f"sendgrid emails {stand_ins.sendgrid.emails}"
+    )
+    print("invocations:   calls, KiB sent / uncompressed (request + response)")
+    for (app_id, method), count in sorted(stand_ins.calls.items()):
+        sent, uncompressed = (
+            sum(
+                REGISTRY.get_sample_value(
+                    name, {"app_id": app_id, "method": method, "direction": direction}
+                )
+                or 0
+                for direction in ("request", "response")
+            )
+            / 1024
+            for name in (
+                "dapr_payload_bytes_total",
+                "dapr_payload_uncompressed_bytes_total",
+            )
+        )
+        print(f"  {app_id}/{method}: {count}, {sent:.0f} / {uncompressed:.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rate", type=float, default=20, help="messages per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--segments", type=int, default=20)
+    parser.add_argument("--users-latency", type=float, default=0.005)
+    parser.add_argument("--newsapi-latency", type=float, default=0.3)
+    parser.add_argument("--articles-per-query", type=int, default=20)
+    parser.add_argument("--gemini-latency", type=float, default=1.5)
+    parser.add_argument("--gemini-latency-per-article", type=float, default=0.02)
+    parser.add_argument("--sendgrid-latency", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level)
+
+    users = make_users(args.users, args.segments, random.Random(args.seed))
+    stand_ins = StandIns(args, users)
+    start_fake_sidecar(stand_ins)
+    system = NewsManagerUnderTest()
+    results, elapsed = drive(system, users, args.rate, args.duration)
+    system.stop()
+    report(results, elapsed, system, stand_ins)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Compare the cost of choosing digest articles with the heap-based ArticleRanker
+against the previous sort-on-every-pick selection, both with its original
+URL/image key ("legacy") and with the ranker's score as sort key
+("legacy+score"), which is what re-sorting would cost with the richer scoring.
+
+Run from the NewsManager folder:
+    python benchmarks/ranking_benchmark.py
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ranking import ArticleRanker, media_score, recency_scorer  # noqa: E402
+
+CATEGORIES = ["politics", "business", "technology", "health", "sports", "science"]
+NUM_ARTICLES_TO_SEND = 5
+REPEATS = 5
+
+
+def make_news(pool_size: int) -> dict:
+    now = datetime.now(timezone.utc)
+    news = {category: [] for category in CATEGORIES}
+    for i in range(pool_size):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        published = now - timedelta(minutes=random.randint(0, 48 * 60))
+        news[category].append(
+            {
+                "title": f"Article {i}",
+                "body": "body",
+                "url": f"https://example.com/{i}" if random.random() < 0.8 else "",
+                "image": (
+                    f"https://example.com/{i}.jpg" if random.random() < 0.5 else ""
+                ),
+                "dateTimePub": published.isoformat().replace("+00:00", "Z"),
+                "category": category,
+            }
+        )
+    return news
+
+
+def legacy_choose(news: dict, num_articles: int, key) -> list:
+    """The previous selection: re-sorts a category on every pick and pops from it."""
+    news_to_send = []
+    categories = list(news.keys())
+    i = 0
+    while len(news_to_send) < num_articles:
+        articles_list = news[categories[i % len(categories)]]
+        if articles_list:
+            articles_list.sort(key=key, reverse=True)
+            news_to_send.append(articles_list.pop(0))
+        i += 1
+    return news_to_send
+
+
+def measure(select, news: dict, num_articles: int, copy_input: bool) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        candidates = (
+            {category: list(articles) for category, articles in news.items()}
+            if copy_input
+            else news
+        )
+        start = time.perf_counter()
+        select(candidates, num_articles)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    random.seed(7)
+    ranker = ArticleRanker([(1.0, media_score), (1.0, recency_scorer(12))])
+
+    def legacy_media(news, num_articles):
+        return legacy_choose(news, num_articles, lambda a: media_score(a, 0))
+
+    def legacy_ranked(news, num_articles):
+        now = time.time()
+        return legacy_choose(news, num_articles, lambda a: ranker.score(a, now))
+
+    print(
+        f"{'pool size':>10} {'picks':>6} {'legacy (ms)':>12} "
+        f"{'legacy+score (ms)':>18} {'ranker (ms)':>12}"
+    )
+    for pool_size in (60, 1_000, 10_000, 100_000):
+        news = make_news(pool_size)
+        for num_articles in (NUM_ARTICLES_TO_SEND, 10 * NUM_ARTICLES_TO_SEND):
+            # the legacy selection mutates its input, give it a fresh copy each run
+            legacy = measure(legacy_media, news, num_articles, copy_input=True)
+            scored = measure(legacy_ranked, news, num_articles, copy_input=True)
+            ranked = measure(ranker.select, news, num_articles, copy_input=False)
+            print(
+                f"{pool_size:>10} {num_articles:>6} {legacy * 1000:>12.2f} "
+                f"{scored * 1000:>18.2f} {ranked * 1000:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
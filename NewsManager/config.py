@@ -3,12 +3,28 @@ import os
 
 class Config:
     CACHED_NEWS_MAX_AGE_MINUTES = 60
+    # Serve news up to this age immediately while refreshing it in the background
+    STALE_WHILE_REVALIDATE = (
+        os.getenv("STALE_WHILE_REVALIDATE", "true").lower() == "true"
+    )
+    STALE_NEWS_MAX_AGE_MINUTES = int(os.getenv("STALE_NEWS_MAX_AGE_MINUTES", "360"))
     NUM_ARTICLES_TO_SEND = 5
+    # Time budget of a get-news request from the moment its message is received,
+    # propagated to every downstream call
+    REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "120"))
+    # Prometheus metrics, served on their own port as the app port speaks gRPC
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9090"))
     DEBUG = os.getenv("DEBUG", True)
     APP_PORT = os.getenv("APP_PORT", "50053")
     EMAIL_API_ACCESSOR_SERVICE_APP_ID = os.getenv(
         "EMAIL_API_ACCESSOR_SERVICE_APP_ID", "email_api_accessor"
     )
+    # Receive fresh news category by category (NDJSON) and cache each as it
+    # arrives instead of waiting for the slowest category
+    NEWS_ENGINE_STREAMING = (
+        os.getenv("NEWS_ENGINE_STREAMING", "false").lower() == "true"
+    )
     NEWS_ENGINE_SERVICE_APP_ID = os.getenv("NEWS_ENGINE_SERVICE_APP_ID", "news_engine")
     NEWS_DB_ACCESSOR_SERVICE_APP_ID = os.getenv(
         "NEWS_DB_ACCESSOR_SERVICE_APP_ID", "news_db_accessor"
@@ -18,3 +34,60 @@ class Config:
     USERS_MANAGER_SERVICE_APP_ID = os.getenv(
         "USERS_MANAGER_SERVICE_APP_ID", "users_manager"
     )
+    # Batch digest mode: group pending requests by preference segment. With the
+    # consumer, up to BATCH_MAX_PENDING requests wait for their batch without
+    # holding a consumer worker, and as many binding threads are added for them
+    BATCH_MODE = os.getenv("BATCH_MODE", "false").lower() == "true"
+    BATCH_WINDOW_SECONDS = float(os.getenv("BATCH_WINDOW_SECONDS", "2"))
+    BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "500"))
+    BINDING_MAX_WORKERS = int(os.getenv("BINDING_MAX_WORKERS", "10"))
+    EMAIL_FANOUT_CONCURRENCY = int(os.getenv("EMAIL_FANOUT_CONCURRENCY", "20"))
+    # Bounded concurrent consumer for the newsqueue binding
+    CONSUMER_MODE = os.getenv("CONSUMER_MODE", "true").lower() == "true"
+    CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", "8"))
+    CONSUMER_QUEUE_SIZE = int(os.getenv("CONSUMER_QUEUE_SIZE", "16"))
+    # "completion": ack after the digest is processed, "enqueue": ack once queued
+    CONSUMER_ACK_MODE = os.getenv("CONSUMER_ACK_MODE", "completion")
+    # prefetchCount of dapr/components/newsqueue.yaml, keep the two equal
+    BINDING_PREFETCH_COUNT = int(os.getenv("BINDING_PREFETCH_COUNT", "24"))
+    # In completion ack mode a request waiting for its batch holds an unacked
+    # delivery, so the broker never has more than prefetchCount of them out and
+    # a batch cannot grow past it. Raise both to batch more.
+    BATCH_MAX_PENDING = (
+        min(BATCH_MAX_SIZE, BINDING_PREFETCH_COUNT)
+        if CONSUMER_ACK_MODE == "completion"
+        else BATCH_MAX_SIZE
+    )
+    CONSUMER_ENQUEUE_TIMEOUT_SECONDS = float(
+        os.getenv("CONSUMER_ENQUEUE_TIMEOUT_SECONDS", "30")
+    )
+    # Coalesce identical fresh-news fetches across NewsManager replicas
+    DISTRIBUTED_SINGLE_FLIGHT = (
+        os.getenv("DISTRIBUTED_SINGLE_FLIGHT", "false").lower() == "true"
+    )
+    SINGLE_FLIGHT_LOCK_TTL_SECONDS = int(
+        os.getenv("SINGLE_FLIGHT_LOCK_TTL_SECONDS", "60")
+    )
+    SINGLE_FLIGHT_WAIT_TIMEOUT_SECONDS = float(
+        os.getenv("SINGLE_FLIGHT_WAIT_TIMEOUT_SECONDS", "30")
+    )
+    # Digest ranking: score = media weight * (url + image) + recency weight * decay
+    MEDIA_SCORE_WEIGHT = float(os.getenv("MEDIA_SCORE_WEIGHT", "1"))
+    RECENCY_SCORE_WEIGHT = float(os.getenv("RECENCY_SCORE_WEIGHT", "1"))
+    RECENCY_HALF_LIFE_HOURS = float(os.getenv("RECENCY_HALF_LIFE_HOURS", "12"))
+    # Pre-warm the cache of active segments ahead of each delivery window
+    # (local "HH:MM" times). PREWARM_LEAD_MINUTES should stay below
+    # CACHED_NEWS_MAX_AGE_MINUTES so warmed news is still fresh at delivery.
+    PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "false").lower() == "true"
+    DELIVERY_WINDOWS = os.getenv("DELIVERY_WINDOWS", "07:00,18:00")
+    DELIVERY_WINDOW_MINUTES = int(os.getenv("DELIVERY_WINDOW_MINUTES", "60"))
+    PREWARM_LEAD_MINUTES = int(os.getenv("PREWARM_LEAD_MINUTES", "30"))
+    # Share of the upstream quotas pre-warming may use, leaving the rest to
+    # on-demand requests (Gemini allows 14 requests/minute, 1400/day)
+    PREWARM_NEWSAPI_PER_MINUTE = int(os.getenv("PREWARM_NEWSAPI_PER_MINUTE", "30"))
+    PREWARM_NEWSAPI_PER_RUN = int(os.getenv("PREWARM_NEWSAPI_PER_RUN", "200"))
+    PREWARM_LLM_PER_MINUTE = int(os.getenv("PREWARM_LLM_PER_MINUTE", "10"))
+    PREWARM_LLM_PER_RUN = int(os.getenv("PREWARM_LLM_PER_RUN", "200"))
+    USERS_DB_ACCESSOR_SERVICE_APP_ID = os.getenv(
+        "USERS_DB_ACCESSOR_SERVICE_APP_ID", "users_db_accessor"
+    )
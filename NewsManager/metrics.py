@@ -0,0 +1,70 @@
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from common.metrics import LATENCY_BUCKETS
+
+# Latency of each stage of a digest; the stages calling other services are
+# broken down further per method in dapr_invoke_seconds
+STAGE_SECONDS = Histogram(
+    "news_digest_stage_seconds",
+    "Duration of the stages of building and sending a digest",
+    ("stage",),
+    buckets=LATENCY_BUCKETS,
+)
+DIGEST_SECONDS = Histogram(
+    "news_digest_seconds",
+    "Time to serve a get-news request end to end",
+    buckets=LATENCY_BUCKETS,
+)
+DIGESTS = Counter(
+    "news_digests_total",
+    "Get-news requests served, by status; rate() of it is digests per second",
+    ("status",),
+)
+CACHE_OUTCOMES = Counter(
+    "news_cache_outcomes_total",
+    'How digests were served: from a fresh cache "hit", "stale" cache or "miss"',
+    ("outcome",),
+)
+FALLBACKS = Counter(
+    "news_fallbacks_total",
+    "Digests that fell back to old cached news instead of fresh news",
+    ("reason",),
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "news_consumer_queue_wait_seconds",
+    "Time get-news requests waited in the consumer queue for a worker",
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class ConsumerStatsCollector:
+    """Reads the live ConsumerStats of the queue consumer at scrape time."""
+
+    GAUGES = (
+        ("in_flight", "Get-news requests being processed"),
+        ("queued", "Get-news requests waiting for a worker"),
+    )
+    COUNTERS = (
+        ("processed", "Get-news requests the consumer processed"),
+        ("failed", "Get-news requests that failed in the consumer"),
+        ("rejected", "Get-news requests refused while the consumer was saturated"),
+    )
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def collect(self):
+        for field, help_text in self.GAUGES:
+            yield GaugeMetricFamily(
+                f"news_consumer_{field}", help_text, value=getattr(self.stats, field)
+            )
+        for field, help_text in self.COUNTERS:
+            yield CounterMetricFamily(
+                f"news_consumer_{field}", help_text, value=getattr(self.stats, field)
+            )
+
+
+def register_consumer_stats(stats):
+    """Expose the live ConsumerStats of the queue consumer."""
+    REGISTRY.register(ConsumerStatsCollector(stats))
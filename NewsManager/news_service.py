@@ -1,12 +1,21 @@
+import asyncio
 import logging
+import time
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 
 from services.users_manager_client import AsyncHTTPUsersManagerClient
 from services.news_db_accessor_client import AsyncHTTPNewsDBAccessorClient
 from services.news_engine_client import AsyncHTTPNewsEngineClient
 from services.email_api_accessor_client import AsyncHTTPEmailAPIClient
+from batch_digest import SegmentStats
+from segments import SegmentKey, segment_key, segment_name
+from ranking import ArticleRanker, media_score, recency_scorer
+from singleflight import DistributedSingleFlight, SingleFlight
 from config import Config
+from metrics import CACHE_OUTCOMES, DIGEST_SECONDS, DIGESTS, FALLBACKS, STAGE_SECONDS
+from common.deadline import deadline_scope
 
 
 class NewsService:
@@ -19,90 +28,489 @@ class NewsService:
             Config.NEWS_DB_ACCESSOR_SERVICE_APP_ID
         )
         self.news_engine_client = AsyncHTTPNewsEngineClient(
-            Config.NEWS_ENGINE_SERVICE_APP_ID
+            Config.NEWS_ENGINE_SERVICE_APP_ID, stream=Config.NEWS_ENGINE_STREAMING
         )
         self.email_client = AsyncHTTPEmailAPIClient(
             Config.EMAIL_API_ACCESSOR_SERVICE_APP_ID
         )
+        self._email_semaphore = asyncio.Semaphore(Config.EMAIL_FANOUT_CONCURRENCY)
+        self.fresh_news_flight = SingleFlight()
+        self._revalidating: Set[SegmentKey] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
+        # how digests were served: "hit", "stale" or "miss"
+        self.cache_outcomes: Counter = Counter()
+        self.ranker = ArticleRanker(
+            [
+                (Config.MEDIA_SCORE_WEIGHT, media_score),
+                (
+                    Config.RECENCY_SCORE_WEIGHT,
+                    recency_scorer(Config.RECENCY_HALF_LIFE_HOURS),
+                ),
+            ]
+        )
+        self.distributed_flight = (
+            DistributedSingleFlight(
+                self.news_db_client,
+                lock_ttl_seconds=Config.SINGLE_FLIGHT_LOCK_TTL_SECONDS,
+                wait_timeout_seconds=Config.SINGLE_FLIGHT_WAIT_TIMEOUT_SECONDS,
+            )
+            if Config.DISTRIBUTED_SINGLE_FLIGHT
+            else None
+        )
 
-    def handle_get_news(self, email, password):
+    async def handle_get_news(self, email, password):
+        start = time.perf_counter()
+        response = await self._serve_get_news(email, password)
+        DIGEST_SECONDS.observe(time.perf_counter() - start)
+        DIGESTS.labels(status=response["status"]).inc()
+        return response
+
+    async def _serve_get_news(self, email, password):
         try:
             # Step 1: Validate user and get preferences
-            user_preferences = self.users_manager_client.get_user_preferences(
-                email, password
-            )
+            with STAGE_SECONDS.labels(stage="preferences").time():
+                user_preferences = await self.users_manager_client.get_user_preferences(
+                    email, password
+                )
             if "error" in user_preferences:
                 return {"status": "error", "message": user_preferences["error"]}
 
-            # Step 2: Check cached news in News DB Accessor
-            cached_news = self.news_db_client.get_cached_news(user_preferences)
+            # Step 2: Build the digest for the user's preferences
+            digest = await self._build_digest(user_preferences, email)
+            if digest["status"] == "error":
+                return digest
+
+            # Step 3: Send the email while the cache is being refreshed
+            await asyncio.gather(
+                self._send_digest(email, digest),
+                self._update_news_cache(user_preferences, digest.get("fresh_news")),
+            )
+            return {"status": "success", "message": digest["message"]}
+
+        except Exception as e:
+            self.logger.error(f"Error in handle_get_news: {e}")
+            return {"status": "error", "message": "Internal service error"}
+
+    async def handle_get_news_batch(self, requests: List[Dict[str, str]]) -> Dict:
+        """
+        Handle many get-news requests at once.
+
+        Requests are grouped by preference segment (language, country, categories),
+        a single digest is built per segment and then sent to every member's email.
+        """
+        start = time.perf_counter()
+        results = {}
+        segments: Dict[SegmentKey, Tuple[dict, Dict[str, None]]] = {}
+        with STAGE_SECONDS.labels(stage="preferences").time():
+            preferences = await asyncio.gather(
+                *(
+                    self.users_manager_client.get_user_preferences(
+                        request.get("email"), request.get("password")
+                    )
+                    for request in requests
+                ),
+                return_exceptions=True,
+            )
+        for request, user_preferences in zip(requests, preferences):
+            email = request.get("email")
+            if isinstance(user_preferences, Exception):
+                self.logger.error(
+                    f"Error getting preferences for {email}: {user_preferences}"
+                )
+                user_preferences = {"error": "Internal service error"}
+            if "error" in user_preferences:
+                results[email] = {
+                    "status": "error",
+                    "message": user_preferences["error"],
+                }
+                continue
+            key = segment_key(user_preferences)
+            segments.setdefault(key, (user_preferences, {}))[1][email] = None
+
+        self.logger.info(
+            f"Batch of {len(requests)} requests grouped into {len(segments)} segments"
+        )
+        segments_stats = await asyncio.gather(
+            *(
+                self._deliver_segment(key, user_preferences, list(emails), results)
+                for key, (user_preferences, emails) in segments.items()
+            )
+        )
+        # every request of the batch waited for the whole batch
+        elapsed = time.perf_counter() - start
+        for result in results.values():
+            DIGEST_SECONDS.observe(elapsed)
+            DIGESTS.labels(status=result["status"]).inc()
+        return {
+            "status": "success",
+            "results": results,
+            "segments": [stats.to_dict() for stats in segments_stats],
+        }
+
+    async def _deliver_segment(
+        self,
+        key: SegmentKey,
+        user_preferences: dict,
+        emails: List[str],
+        results: Dict[str, dict],
+    ) -> SegmentStats:
+        """
+        Build one digest for the segment and fan it out to all of its members.
+        """
+        stats = SegmentStats(segment=segment_name(key), members=len(emails))
+        start = time.perf_counter()
+        try:
+            digest = await self._build_digest(user_preferences)
+        except Exception as e:
+            self.logger.error(f"Error building digest for {stats.segment}: {e}")
+            digest = {"status": "error", "message": "Internal service error"}
+        stats.digest_seconds = time.perf_counter() - start
+
+        if digest["status"] == "error":
+            for email in emails:
+                results[email] = digest
+            stats.failed = len(emails)
+        else:
+            sent, _ = await asyncio.gather(
+                asyncio.gather(*(self._send_digest(email, digest) for email in emails)),
+                self._update_news_cache(user_preferences, digest.get("fresh_news")),
+            )
+            for email, success in zip(emails, sent):
+                if success:
+                    results[email] = {
+                        "status": "success",
+                        "message": digest["message"],
+                    }
+                    stats.delivered += 1
+                else:
+                    results[email] = {
+                        "status": "error",
+                        "message": "Failed to send email",
+                    }
+                    stats.failed += 1
+
+        stats.total_seconds = time.perf_counter() - start
+        self.logger.info(f"Segment delivered: {stats.summary()}")
+        return stats
+
+    async def _send_digest(self, email: str, digest: dict) -> bool:
+        """
+        Choose the articles of the digest the user has not received yet, send
+        them and record them as sent.
+        """
+        candidates = digest["candidates"]
+        sent_ids = digest.get("sent_ids")
+        if sent_ids is None:
+            with STAGE_SECONDS.labels(stage="sent_lookup").time():
+                sent_ids = await self.news_db_client.get_sent_articles(
+                    email, self._candidate_ids(candidates)
+                )
+        with STAGE_SECONDS.labels(stage="ranking").time():
+            news_to_send = self._choose_articles_to_send(
+                candidates, num_articles=Config.NUM_ARTICLES_TO_SEND, sent_ids=sent_ids
+            )
+        self.logger.info(f"Sending news: {news_to_send}")
+        async with self._email_semaphore:
+            with STAGE_SECONDS.labels(stage="email").time():
+                success = await self.email_client.send_news(email, news_to_send)
+        if success:
+            with STAGE_SECONDS.labels(stage="mark_sent").time():
+                await self.news_db_client.mark_articles_sent(
+                    email, [self._article_id(article) for article in news_to_send]
+                )
+        return success
+
+    async def _build_digest(
+        self, user_preferences: dict, email: Optional[str] = None
+    ) -> dict:
+        """
+        Gather the candidate articles for the given preferences, from cache when
+        it holds enough articles the user has not received yet and from the
+        News Engine otherwise. Only the categories without fresh cached news
+        are fetched, the fresh ones are served from the cache next to them.
+
+        When fresh news was fetched it is returned under "fresh_news" so the
+        caller can update the cache concurrently with sending the email.
+        """
+        # Check cached news in News DB Accessor
+        with STAGE_SECONDS.labels(stage="cache_read").time():
+            cached_news = await self.news_db_client.get_cached_news(user_preferences)
+        filtered_cached_news = {}
+        if cached_news and any(cached_news.values()):
             self.logger.info(f"gotten cached news length: {len(cached_news.values())}")
-            if any(cached_news.values()):
-                filtered_cached_news = self._filter_old_articles(
-                    cached_news, max_age_minutes=Config.CACHED_NEWS_MAX_AGE_MINUTES
+            usable_cached_news = self._filter_old_articles(
+                cached_news, max_age_minutes=self._max_servable_age_minutes()
+            )
+            sent_ids = set()
+            if email:
+                with STAGE_SECONDS.labels(stage="sent_lookup").time():
+                    sent_ids = await self.news_db_client.get_sent_articles(
+                        email, self._candidate_ids(usable_cached_news)
+                    )
+
+            filtered_cached_news = self._filter_old_articles(
+                cached_news, max_age_minutes=Config.CACHED_NEWS_MAX_AGE_MINUTES
+            )
+            num_articles = Config.NUM_ARTICLES_TO_SEND
+            if self._count_unseen(filtered_cached_news, sent_ids) >= num_articles:
+                self._record_cache_outcome("hit")
+                return {
+                    "status": "success",
+                    "message": "Cached news sent",
+                    "candidates": filtered_cached_news,
+                    "sent_ids": sent_ids if email else None,
+                }
+
+            # Serve stale articles right away and refresh the cache behind them
+            if (
+                Config.STALE_WHILE_REVALIDATE
+                and self._count_unseen(usable_cached_news, sent_ids) >= num_articles
+            ):
+                self._revalidate_in_background(
+                    self._refresh_preferences(user_preferences, filtered_cached_news)
                 )
-                if len(filtered_cached_news.values()) > Config.NUM_ARTICLES_TO_SEND:
-                    news_to_send = self._choose_articles_to_send(
-                        filtered_cached_news, num_articles=Config.NUM_ARTICLES_TO_SEND
+                self._record_cache_outcome("stale")
+                return {
+                    "status": "success",
+                    "message": "Stale cached news sent",
+                    "candidates": usable_cached_news,
+                    "sent_ids": sent_ids if email else None,
+                }
+
+        # Fetch fresh news from News Engine
+        self._record_cache_outcome("miss")
+        if not self.news_engine_client.is_available():
+            self.logger.warning("News Engine is unhealthy, falling back to cache")
+            FALLBACKS.labels(reason="engine_unavailable").inc()
+            return self._handle_fallback(cached_news)
+        refresh_preferences = self._refresh_preferences(
+            user_preferences, filtered_cached_news
+        )
+        with STAGE_SECONDS.labels(stage="news_engine").time():
+            fresh_news, needs_cache_update = await self._fetch_fresh_news(
+                refresh_preferences
+            )
+        if not fresh_news:  # if failed to fetch news send old news
+            self.logger.info("Failed to fetch news")
+            FALLBACKS.labels(reason="fetch_failed").inc()
+            return self._handle_fallback(cached_news)
+
+        candidates = fresh_news
+        if refresh_preferences is not user_preferences:
+            candidates = {**filtered_cached_news, **fresh_news}
+        return {
+            "status": "success",
+            "message": "Fresh news sent",
+            "candidates": candidates,
+            "fresh_news": fresh_news if needs_cache_update else None,
+        }
+
+    def _record_cache_outcome(self, outcome: str):
+        self.cache_outcomes[outcome] += 1
+        CACHE_OUTCOMES.labels(outcome=outcome).inc()
+
+    def _refresh_preferences(
+        self, user_preferences: dict, fresh_cached_news: dict
+    ) -> dict:
+        """
+        Restrict the preferences to the categories without fresh cached news.
+        When every category is fresh (the user has seen those articles) or none
+        is, all categories are refreshed and `user_preferences` is returned.
+        """
+        categories = user_preferences["categories"]
+        stale_categories = self._stale_categories(categories, fresh_cached_news)
+        if not stale_categories or len(stale_categories) == len(categories):
+            return user_preferences
+        self.logger.info(f"Refreshing stale categories only: {stale_categories}")
+        return {**user_preferences, "categories": stale_categories}
+
+    @staticmethod
+    def _stale_categories(categories: List[str], fresh_cached_news: dict) -> List[str]:
+        return [
+            category for category in categories if not fresh_cached_news.get(category)
+        ]
+
+    async def stale_categories(
+        self, user_preferences: dict, fresh_for_minutes: float = 0
+    ) -> List[str]:
+        """
+        Categories of the segment that are missing from the cache or will no
+        longer be fresh in `fresh_for_minutes`.
+        """
+        cached_news = await self.news_db_client.get_cached_news(user_preferences)
+        fresh_cached_news = (
+            self._filter_old_articles(
+                cached_news,
+                max_age_minutes=Config.CACHED_NEWS_MAX_AGE_MINUTES - fresh_for_minutes,
+            )
+            if cached_news
+            else {}
+        )
+        return self._stale_categories(user_preferences["categories"], fresh_cached_news)
+
+    async def prewarm_segment(self, user_preferences: dict):
+        """
+        Fetch fresh news for a segment and write it to the cache ahead of demand.
+        """
+        fresh_news, needs_cache_update = await self._fetch_fresh_news(user_preferences)
+        if not fresh_news:
+            raise Exception("Failed to fetch news")
+        if needs_cache_update:
+            await self._update_news_cache(user_preferences, fresh_news)
+
+    def _max_servable_age_minutes(self) -> int:
+        if Config.STALE_WHILE_REVALIDATE:
+            return max(
+                Config.CACHED_NEWS_MAX_AGE_MINUTES, Config.STALE_NEWS_MAX_AGE_MINUTES
+            )
+        return Config.CACHED_NEWS_MAX_AGE_MINUTES
+
+    def _revalidate_in_background(self, user_preferences: dict):
+        """
+        Refresh the cached news of the user's segment without making the
+        current request wait for it. At most one refresh runs per segment.
+        """
+        key = segment_key(user_preferences)
+        if key in self._revalidating:
+            return
+        self._revalidating.add(key)
+        self.logger.info(f"Refreshing stale news in background: {segment_name(key)}")
+
+        async def revalidate():
+            try:
+                # not bound by the deadline of the request that triggered it
+                with deadline_scope(Config.REQUEST_DEADLINE_SECONDS, detach=True):
+                    fresh_news, needs_cache_update = await self._fetch_fresh_news(
+                        user_preferences
                     )
-                    self.logger.info(f"Sending cached news: {news_to_send}")
-                    self.email_client.send_news(email, news_to_send)
-                    return {"status": "success", "message": "Cached news sent"}
+                    if needs_cache_update:
+                        await self._update_news_cache(user_preferences, fresh_news)
+            except Exception as e:
+                self.logger.error(f"Error refreshing {segment_name(key)}: {e}")
+            finally:
+                self._revalidating.discard(key)
 
-            # Step 3: Fetch fresh news from News Engine
-            fresh_news = self.news_engine_client.get_fresh_news(user_preferences)
-            if not fresh_news:  # if failed to fetch news send old news
-                self.logger.info("Failed to fetch news")
-                return self._handle_fallback(cached_news, email)
+        task = asyncio.ensure_future(revalidate())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
-            # chose 5 articles to send
-            news_to_send = self._choose_articles_to_send(
-                fresh_news, num_articles=Config.NUM_ARTICLES_TO_SEND
+    async def _fetch_fresh_news(self, user_preferences: dict) -> Tuple[dict, bool]:
+        """
+        Fetch fresh news from the News Engine, coalescing concurrent requests for
+        the same preferences into one fetch.
+
+        Returns the news and whether the caller still has to write it to the cache.
+        """
+        key = segment_key(user_preferences)
+        if self.distributed_flight is None:
+            if not self.news_engine_client.stream:
+                return await self.fresh_news_flight.do(
+                    key,
+                    lambda: self.news_engine_client.get_fresh_news(user_preferences),
+                )
+            fresh_news, _ = await self.fresh_news_flight.do(
+                key, lambda: self._fetch_and_cache(user_preferences)
             )
-            self._update_news_cache(user_preferences, fresh_news)
+            return fresh_news, False
 
-            self.email_client.send_news(email, news_to_send)
-            return {"status": "success", "message": "Fresh news sent"}
+        started_at = datetime.now()
 
-        except Exception as e:
-            self.logger.error(f"Error in handle_get_news: {e}")
-            return {"status": "error", "message": "Internal service error"}
+        async def read_shared():
+            cached_news = await self.news_db_client.get_cached_news(user_preferences)
+            return self._articles_cached_since(cached_news, started_at)
+
+        async def fetch_across_replicas():
+            fresh_news, _ = await self.distributed_flight.do(
+                segment_name(key),
+                lambda: self._fetch_and_cache(user_preferences),
+                read_shared,
+            )
+            return fresh_news
+
+        fresh_news, _ = await self.fresh_news_flight.do(key, fetch_across_replicas)
+        return fresh_news, False
 
-    def _handle_fallback(self, cached_news: dict, email: str) -> dict:
+    async def _fetch_and_cache(self, user_preferences: dict) -> dict:
+        """
+        Fetch fresh news and write it to the cache. When the News Engine
+        streams, each category is written as soon as it arrives, while the
+        slower ones are still being summarized.
+        """
+        written = set()
+        writes = []
+
+        async def cache_category(category: str, articles: List[dict]):
+            written.add(category)
+            writes.append(
+                asyncio.ensure_future(
+                    self._update_news_cache(user_preferences, {category: articles})
+                )
+            )
+
+        fresh_news = await self.news_engine_client.get_fresh_news(
+            user_preferences, on_category=cache_category
+        )
+        # what did not arrive category by category, e.g. all of it when the
+        # News Engine answered with one document
+        rest = {
+            category: articles
+            for category, articles in (fresh_news or {}).items()
+            if category not in written
+        }
+        await asyncio.gather(*writes, self._update_news_cache(user_preferences, rest))
+        return fresh_news
+
+    def _handle_fallback(self, cached_news: dict) -> dict:
         if cached_news:
             self.logger.info("Sending cached news due to fresh news fetch failure")
             cached_news = self._filter_old_articles(
                 cached_news, max_age_minutes=60 * 24 * 365
             )
-            news_to_send = self._choose_articles_to_send(
-                cached_news, num_articles=Config.NUM_ARTICLES_TO_SEND
-            )
-            self.email_client.send_news(email, news_to_send)
-            return {"status": "success", "message": "Cached news sent"}
+            return {
+                "status": "success",
+                "message": "Cached news sent",
+                "candidates": cached_news,
+            }
         return {"status": "error", "message": "Failed to fetch news"}
 
     def _choose_articles_to_send(
-        self, news: Dict[str, List[dict]], num_articles: int = 5
+        self,
+        news: Dict[str, List[dict]],
+        num_articles: int = 5,
+        sent_ids: Set[str] = frozenset(),
     ) -> List[dict]:
         """
-        Choose articles to send from fresh_news, prioritizing articles with URLs and images.
-        """
-        news_to_send = []
-        categories = list(news.keys())
-        i = 0
-        while len(news_to_send) < num_articles:
-            articles_list = news[categories[i % len(categories)]]
-            if articles_list:
-                articles_list.sort(key=self._article_priority, reverse=True)
-                news_to_send.append(articles_list.pop(0))
-            i += 1
+        Choose articles to send, balancing categories and prioritizing recent
+        articles with URLs and images. Articles already sent to the user are
+        skipped unless there are not enough new ones. `news` is left untouched.
+        """
+        news_to_send = self.ranker.select(
+            news,
+            num_articles,
+            exclude=lambda article: self._article_id(article) in sent_ids,
+        )
+        if len(news_to_send) < num_articles and sent_ids:
+            chosen = {id(article) for article in news_to_send}
+            news_to_send += self.ranker.select(
+                news,
+                num_articles - len(news_to_send),
+                exclude=lambda article: id(article) in chosen,
+            )
         return news_to_send
 
-    def _article_priority(self, article: dict) -> int:
-        """
-        Return priority score based on the presence of URL and image.
-        """
-        return bool(article.get("url")) + bool(article.get("image"))
+    @staticmethod
+    def _article_id(article: dict) -> str:
+        return article.get("url") or article.get("title", "")
+
+    def _count_unseen(self, news: Dict[str, List[dict]], sent_ids: Set[str]) -> int:
+        return len(set(self._candidate_ids(news)) - sent_ids)
+
+    def _candidate_ids(self, news: Dict[str, List[dict]]) -> List[str]:
+        return [
+            self._article_id(article)
+            for articles in news.values()
+            for article in articles
+        ]
 
     def _filter_old_articles(
         self, cached_news: dict, max_age_minutes: int = 60
@@ -123,16 +531,37 @@ class NewsService:
         }
         return filtered_news
 
-    def _update_news_cache(self, user_preferences: dict, fresh_news: dict):
+    def _articles_cached_since(self, cached_news: dict, since: datetime) -> dict:
         """
-        Update the news cache in the News DB Accessor.
+        Return the cached articles written at or after `since`, grouped by
+        category, or an empty dict if there are none.
         """
-        for category, articles in fresh_news.items():
-            if articles:
-                self.logger.info(f"Updating news for category: {category}")
-                self.news_db_client.update_news(
-                    user_preferences["language"],
-                    user_preferences["country"],
-                    category,
-                    articles,
-                )
+        if not cached_news:
+            return {}
+        news = {
+            category: [
+                article["article"]
+                for article in articles
+                if datetime.fromisoformat(article["timestamp"].replace("Z", ""))
+                >= since
+            ]
+            for category, articles in cached_news.items()
+        }
+        return news if any(news.values()) else {}
+
+    async def _update_news_cache(self, user_preferences: dict, fresh_news: dict):
+        """
+        Update the news cache in the News DB Accessor, all categories in one write.
+        """
+        if not fresh_news or not any(fresh_news.values()):
+            return
+        with STAGE_SECONDS.labels(stage="cache_write").time():
+            await self.news_db_client.update_news_bulk(
+                user_preferences["language"],
+                user_preferences["country"],
+                {
+                    category: articles
+                    for category, articles in fresh_news.items()
+                    if articles
+                },
+            )
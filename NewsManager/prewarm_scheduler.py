@@ -0,0 +1,208 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Optional, Sequence
+
+
+class RequestBudget:
+    """
+    Quota share of an upstream API for pre-warming: at most `per_minute`
+    requests in any sliding minute and `per_run` requests per pre-warm run.
+    """
+
+    def __init__(self, name: str, per_minute: int, per_run: int):
+        self.name = name
+        self.per_minute = per_minute
+        self.per_run = per_run
+        self.used = 0
+        self._sent_at = deque()
+
+    def reset(self):
+        self.used = 0
+
+    def has_room(self, cost: int) -> bool:
+        return self.used + cost <= self.per_run
+
+    async def acquire(self, cost: int):
+        """Wait until `cost` more requests fit in the per-minute window."""
+        loop = asyncio.get_running_loop()
+        needed = min(cost, self.per_minute)
+        while True:
+            now = loop.time()
+            while self._sent_at and now - self._sent_at[0] >= 60:
+                self._sent_at.popleft()
+            if len(self._sent_at) + needed <= self.per_minute:
+                break
+            await asyncio.sleep(60 - (now - self._sent_at[0]))
+        self._sent_at.extend([loop.time()] * needed)
+        self.used += cost
+
+
+@dataclass
+class PrewarmReport:
+    window: str
+    segments: int = 0
+    warmed: int = 0
+    already_warm: int = 0
+    over_budget: int = 0
+    failed: int = 0
+    warmed_subscribers: int = 0
+    total_subscribers: int = 0
+    prewarm_seconds: float = 0.0
+    cache_hits: int = 0
+    stale_hits: int = 0
+    cache_misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        served = self.cache_hits + self.stale_hits + self.cache_misses
+        return (self.cache_hits + self.stale_hits) / served if served else 0.0
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), "hit_rate": self.hit_rate}
+
+
+class PrewarmScheduler:
+    """
+    Pre-fetches and pre-summarizes the news of active preference segments into
+    the News DB Accessor shortly before each delivery window.
+
+    Segments are warmed largest first, so when the newsapi.ai or Gemini budget
+    runs out it is the smallest segments that are left to on-demand fetching.
+    Warming costs one newsapi.ai query and one summarization per stale category.
+    After the window the cache hit rate of the digests built during it is
+    logged together with what the pre-warm run did.
+    """
+
+    def __init__(
+        self,
+        news_service,
+        users_db_client,
+        delivery_windows: Sequence[time],
+        lead_minutes: int,
+        window_minutes: int,
+        budgets: Sequence[RequestBudget],
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.news_service = news_service
+        self.users_db_client = users_db_client
+        self.delivery_windows = sorted(delivery_windows)
+        self.lead_minutes = lead_minutes
+        self.window_minutes = window_minutes
+        self.budgets = list(budgets)
+        self.reports: deque = deque(maxlen=30)
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def parse_windows(value: str) -> List[time]:
+        """Parse "HH:MM,HH:MM" into times of day."""
+        return [
+            datetime.strptime(window.strip(), "%H:%M").time()
+            for window in value.split(",")
+            if window.strip()
+        ]
+
+    def start(self):
+        """Start the scheduler on the running event loop."""
+        if not self.delivery_windows:
+            self.logger.warning("No delivery windows configured, pre-warming is off")
+            return
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def next_window(self, now: datetime) -> datetime:
+        """Start of the first delivery window after `now`."""
+        for days in (0, 1):
+            day = now.date() + timedelta(days=days)
+            for window in self.delivery_windows:
+                start = datetime.combine(day, window)
+                if start > now:
+                    return start
+
+    async def _run(self):
+        while True:
+            window_start = self.next_window(datetime.now())
+            await self._sleep_until(window_start - timedelta(minutes=self.lead_minutes))
+            try:
+                report = await self.prewarm(window_start)
+            except Exception as e:
+                self.logger.error(f"Error pre-warming window {window_start}: {e}")
+                report = PrewarmReport(
+                    window=window_start.isoformat(timespec="minutes")
+                )
+            await self._sleep_until(window_start)
+            before = dict(self.news_service.cache_outcomes)
+            await self._sleep_until(
+                window_start + timedelta(minutes=self.window_minutes)
+            )
+            self._record_outcomes(report, before)
+
+    async def prewarm(self, window_start: datetime) -> PrewarmReport:
+        """Warm the cache of the active segments ahead of `window_start`."""
+        report = PrewarmReport(window=window_start.isoformat(timespec="minutes"))
+        start = asyncio.get_running_loop().time()
+        for budget in self.budgets:
+            budget.reset()
+
+        segments = await self.users_db_client.get_active_segments()
+        segments.sort(key=lambda segment: segment["subscribers"], reverse=True)
+        report.segments = len(segments)
+        for segment in segments:
+            report.total_subscribers += segment["subscribers"]
+            # cached news must still be fresh when the window opens
+            minutes_to_window = (window_start - datetime.now()).total_seconds() / 60
+            try:
+                stale_categories = await self.news_service.stale_categories(
+                    segment, fresh_for_minutes=max(minutes_to_window, 0)
+                )
+                if not stale_categories:
+                    report.already_warm += 1
+                    continue
+
+                cost = len(stale_categories)
+                exhausted = [b.name for b in self.budgets if not b.has_room(cost)]
+                if exhausted:
+                    self.logger.info(
+                        f"Skipping segment {segment}, out of {exhausted} budget"
+                    )
+                    report.over_budget += 1
+                    continue
+                for budget in self.budgets:
+                    await budget.acquire(cost)
+                await self.news_service.prewarm_segment(
+                    {**segment, "categories": stale_categories}
+                )
+                report.warmed += 1
+                report.warmed_subscribers += segment["subscribers"]
+            except Exception as e:
+                self.logger.error(f"Error pre-warming segment {segment}: {e}")
+                report.failed += 1
+
+        report.prewarm_seconds = asyncio.get_running_loop().time() - start
+        self.logger.info(f"Pre-warm done: {report.to_dict()}")
+        return report
+
+    def _record_outcomes(self, report: PrewarmReport, before: Dict[str, int]):
+        after = self.news_service.cache_outcomes
+        report.cache_hits = after["hit"] - before.get("hit", 0)
+        report.stale_hits = after["stale"] - before.get("stale", 0)
+        report.cache_misses = after["miss"] - before.get("miss", 0)
+        self.reports.append(report)
+        self.logger.info(
+            f"Delivery window {report.window}: cache hit rate "
+            f"{report.hit_rate:.1%} ({report.cache_hits} hits, "
+            f"{report.stale_hits} stale, {report.cache_misses} misses), "
+            f"pre-warm {report.to_dict()}"
+        )
+
+    async def _sleep_until(self, moment: datetime):
+        delay = (moment - datetime.now()).total_seconds()
+        if delay > 0:
+            await asyncio.sleep(delay)
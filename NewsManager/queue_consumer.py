@@ -0,0 +1,196 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional
+
+from common.deadline import expired
+from metrics import QUEUE_WAIT_SECONDS
+
+
+@dataclass
+class ConsumerStats:
+    in_flight: int = 0
+    queued: int = 0
+    processed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    wait_seconds: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def record_wait(self, seconds: float):
+        self.wait_seconds.append(seconds)
+        QUEUE_WAIT_SECONDS.observe(seconds)
+
+    def snapshot(self) -> Dict:
+        waits = sorted(self.wait_seconds)
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_wait_avg_seconds": sum(waits) / len(waits) if waits else 0.0,
+            "queue_wait_p95_seconds": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            "queue_wait_max_seconds": waits[-1] if waits else 0.0,
+        }
+
+
+@dataclass
+class _Job:
+    email: str
+    password: str
+    enqueued_at: float
+    done: asyncio.Future
+    # context of the submitter, so the request deadline applies in the worker
+    context: contextvars.Context
+
+
+class QueueConsumer:
+    """
+    Bounded, concurrent consumer for newsqueue messages.
+
+    Messages are put on an in-process bounded queue and processed by a fixed
+    pool of worker tasks. When the queue is full, `submit` blocks, which keeps
+    the binding handler from returning and therefore stops the broker from
+    delivering more messages than the pool can absorb (backpressure).
+
+    With ack_mode "completion" a message is only acknowledged once its digest
+    was processed; with "enqueue" it is acknowledged as soon as it is queued.
+
+    A handler that only hands the request off and returns a future, like
+    DigestBatcher.add, is given as hand_off instead. A worker then moves on to
+    the next message right away, so a batch can collect more requests than
+    there are workers. At most max_handed_off such requests are outstanding,
+    beyond that the workers wait, which keeps the backpressure.
+    """
+
+    def __init__(
+        self,
+        handler: Optional[Callable[[str, str], Awaitable[Dict]]] = None,
+        workers: int = 8,
+        queue_size: int = 16,
+        ack_mode: str = "completion",
+        enqueue_timeout_seconds: Optional[float] = None,
+        stats_log_interval: int = 50,
+        hand_off: Optional[Callable[[str, str], asyncio.Future]] = None,
+        max_handed_off: int = 500,
+    ):
+        if (handler is None) == (hand_off is None):
+            raise ValueError("Exactly one of handler and hand_off is required")
+        self.logger = logging.getLogger(__name__)
+        self.handler = handler
+        self.hand_off = hand_off
+        self.max_handed_off = max_handed_off
+        self.workers = workers
+        self.queue_size = queue_size
+        self.ack_mode = ack_mode
+        self.enqueue_timeout_seconds = enqueue_timeout_seconds
+        self.stats_log_interval = stats_log_interval
+        self.stats = ConsumerStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._handed_off_slots: Optional[asyncio.Semaphore] = None
+        self._tasks = []
+
+    async def start(self):
+        """Start the worker pool on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._handed_off_slots = asyncio.Semaphore(self.max_handed_off)
+        self._tasks = [
+            asyncio.ensure_future(self._worker(i)) for i in range(self.workers)
+        ]
+        self.logger.info(
+            f"Started {self.workers} consumer workers (queue size {self.queue_size}, "
+            f"ack mode {self.ack_mode})"
+        )
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, email: str, password: str) -> Dict:
+        """
+        Queue a get-news request, waiting for room when the pool is saturated.
+
+        Raises asyncio.TimeoutError when no room frees up within
+        enqueue_timeout_seconds, so the message is not acknowledged.
+        """
+        job = _Job(
+            email=email,
+            password=password,
+            enqueued_at=time.perf_counter(),
+            done=asyncio.get_running_loop().create_future(),
+            context=contextvars.copy_context(),
+        )
+        self.stats.queued += 1
+        try:
+            await asyncio.wait_for(
+                self._queue.put(job), timeout=self.enqueue_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            self.stats.queued -= 1
+            self.stats.rejected += 1
+            self.logger.warning("Consumer queue is saturated, rejecting message")
+            raise
+
+        if self.ack_mode == "enqueue":
+            return {"status": "success", "message": "Request queued"}
+        return await job.done
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            self.stats.queued -= 1
+            self.stats.in_flight += 1
+            self.stats.record_wait(time.perf_counter() - job.enqueued_at)
+            try:
+                if job.context.run(expired):
+                    raise TimeoutError("Request deadline expired while queued")
+                if self.hand_off is not None:
+                    await self._hand_off(job)
+                    continue
+                response = await asyncio.get_running_loop().create_task(
+                    self.handler(job.email, job.password), context=job.context
+                )
+            except Exception as e:
+                self.logger.error(f"Worker {worker_id} failed processing message: {e}")
+                response = {"status": "error", "message": "Internal service error"}
+            finally:
+                self._queue.task_done()
+            self._finish(job, response)
+
+    async def _hand_off(self, job: _Job):
+        await self._handed_off_slots.acquire()
+        try:
+            future = job.context.run(self.hand_off, job.email, job.password)
+        except Exception:
+            self._handed_off_slots.release()
+            raise
+        future.add_done_callback(lambda future: self._handed_off_done(job, future))
+
+    def _handed_off_done(self, job: _Job, future: asyncio.Future):
+        self._handed_off_slots.release()
+        if future.cancelled() or future.exception() is not None:
+            self.logger.error(f"Handed off message failed: {future!r}")
+            response = {"status": "error", "message": "Internal service error"}
+        else:
+            response = future.result()
+        self._finish(job, response)
+
+    def _finish(self, job: _Job, response: Dict):
+        self.stats.in_flight -= 1
+        if response.get("status") == "error":
+            self.stats.failed += 1
+        else:
+            self.stats.processed += 1
+        if not job.done.done():
+            job.done.set_result(response)
+        self._log_stats()
+
+    def _log_stats(self):
+        handled = self.stats.processed + self.stats.failed
+        if self.stats_log_interval and handled % self.stats_log_interval == 0:
+            self.logger.info(f"Consumer stats: {self.stats.snapshot()}")
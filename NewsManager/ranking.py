@@ -0,0 +1,102 @@
+import heapq
+import math
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# a scorer gets the article and the current POSIX timestamp
+Scorer = Callable[[dict, float], float]
+
+
+def media_score(article: dict, now: float) -> float:
+    """
+    Score based on the presence of URL and image.
+    """
+    return bool(article.get("url")) + bool(article.get("image"))
+
+
+def recency_scorer(half_life_hours: float) -> Scorer:
+    """
+    Build a scorer that decays exponentially with the article's publish age,
+    1.0 for a brand new article and 0.5 after `half_life_hours`.
+    """
+    decay = math.log(2) / (half_life_hours * 3600)
+
+    def recency_score(article: dict, now: float) -> float:
+        published = _parse_timestamp(article.get("dateTimePub"))
+        if published is None:
+            return 0.0
+        return math.exp(-decay * max(now - published, 0.0))
+
+    return recency_score
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class ArticleRanker:
+    """
+    Selects the articles of a digest from candidates grouped by category.
+
+    Every article is scored once by a weighted sum of pluggable scorers. The
+    selection is a round robin over categories driven by a heap: the category
+    that contributed the fewest articles so far goes next, ties are broken by
+    the score of its best remaining article. Input lists are never modified and
+    the selection stops when the candidates run out.
+    """
+
+    def __init__(self, scorers: Sequence[Tuple[float, Scorer]]):
+        self.scorers = list(scorers)
+
+    def score(self, article: dict, now: float) -> float:
+        total = 0.0
+        for weight, scorer in self.scorers:
+            total += weight * scorer(article, now)
+        return total
+
+    def select(
+        self,
+        news: Dict[str, List[dict]],
+        num_articles: int,
+        exclude: Optional[Callable[[dict], bool]] = None,
+    ) -> List[dict]:
+        now = time.time()
+        score = self.score
+
+        # one max-heap of (-score, position) per category, built in O(n)
+        category_heaps = []
+        for order, articles in enumerate(news.values()):
+            heap = [
+                (-score(article, now), position)
+                for position, article in enumerate(articles or [])
+                if not (exclude and exclude(article))
+            ]
+            if heap:
+                heapq.heapify(heap)
+                category_heaps.append((order, articles, heap))
+
+        # (picks so far, -best remaining score, category order, index)
+        rounds = [
+            (0, heap[0][0], order, index)
+            for index, (order, _, heap) in enumerate(category_heaps)
+        ]
+        heapq.heapify(rounds)
+
+        selected = []
+        while rounds and len(selected) < num_articles:
+            picks, _, order, index = heapq.heappop(rounds)
+            _, articles, heap = category_heaps[index]
+            _, position = heapq.heappop(heap)
+            selected.append(articles[position])
+            if heap:
+                heapq.heappush(rounds, (picks + 1, heap[0][0], order, index))
+        return selected
@@ -0,0 +1,29 @@
+from typing import Dict, Tuple
+
+SegmentKey = Tuple[str, str, Tuple[str, ...]]
+
+
+def segment_key(preferences: Dict) -> SegmentKey:
+    """
+    Normalize user preferences into a hashable segment key.
+
+    Users who share the same language, country and set of categories get the
+    exact same digest, so they belong to the same segment.
+    """
+    language = (preferences.get("language") or "").strip().lower()
+    country = (preferences.get("country") or "").strip().lower()
+    categories = tuple(
+        sorted(
+            {
+                category.strip().lower()
+                for category in preferences.get("categories") or []
+                if category
+            }
+        )
+    )
+    return language, country, categories
+
+
+def segment_name(key: SegmentKey) -> str:
+    language, country, categories = key
+    return f"{language}:{country}:{','.join(categories)}"
@@ -1,25 +1,116 @@
+import asyncio
+import threading
+import time
+from concurrent import futures
+
 from dapr.ext.grpc import App
+from prometheus_client import start_http_server
 from news_service import NewsService
+from batch_digest import DigestBatcher
+from queue_consumer import QueueConsumer
+from prewarm_scheduler import PrewarmScheduler, RequestBudget
+from services.users_db_accessor_client import AsyncHTTPUsersDBAccessorClient
 from config import Config
+from metrics import register_consumer_stats
+from common.dapr_client import get_sidecar_client
+from common.deadline import deadline_scope
+from common.messages import DigestRequest
+from common.wire import decode
 import logging
-import json
-
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = App()
+# binding handlers block until their message is processed, so there must be
+# enough gRPC threads to keep the whole consumer pool and queue busy, and to
+# fill a batch with the requests handed off to it
+app = App(
+    thread_pool=futures.ThreadPoolExecutor(
+        max_workers=max(
+            Config.BINDING_MAX_WORKERS,
+            Config.CONSUMER_WORKERS
+            + Config.CONSUMER_QUEUE_SIZE
+            + (Config.BATCH_MAX_PENDING if Config.BATCH_MODE else 0),
+        )
+    )
+)
+# All digests run on one long-lived event loop, so a single process can keep
+# many of them in flight while the gRPC worker threads only wait for results.
+loop = asyncio.new_event_loop()
+threading.Thread(target=loop.run_forever, name="news-service-loop", daemon=True).start()
+# open the sidecar connection pool in the background, the sidecar itself only
+# starts once this app listens
+asyncio.run_coroutine_threadsafe(get_sidecar_client().warm_up(), loop)
+if Config.METRICS_ENABLED:
+    start_http_server(Config.METRICS_PORT)
 news_service = NewsService()
+digest_batcher = (
+    DigestBatcher(
+        news_service.handle_get_news_batch,
+        window_seconds=Config.BATCH_WINDOW_SECONDS,
+        max_size=Config.BATCH_MAX_PENDING,
+    )
+    if Config.BATCH_MODE
+    else None
+)
+queue_consumer = (
+    QueueConsumer(
+        None if digest_batcher else news_service.handle_get_news,
+        workers=Config.CONSUMER_WORKERS,
+        queue_size=Config.CONSUMER_QUEUE_SIZE,
+        ack_mode=Config.CONSUMER_ACK_MODE,
+        enqueue_timeout_seconds=Config.CONSUMER_ENQUEUE_TIMEOUT_SECONDS,
+        # requests wait for their batch without holding a worker
+        hand_off=digest_batcher.add if digest_batcher else None,
+        max_handed_off=Config.BATCH_MAX_PENDING,
+    )
+    if Config.CONSUMER_MODE
+    else None
+)
+if queue_consumer:
+    asyncio.run_coroutine_threadsafe(queue_consumer.start(), loop).result()
+    register_consumer_stats(queue_consumer.stats)
+prewarm_scheduler = (
+    PrewarmScheduler(
+        news_service,
+        AsyncHTTPUsersDBAccessorClient(Config.USERS_DB_ACCESSOR_SERVICE_APP_ID),
+        delivery_windows=PrewarmScheduler.parse_windows(Config.DELIVERY_WINDOWS),
+        lead_minutes=Config.PREWARM_LEAD_MINUTES,
+        window_minutes=Config.DELIVERY_WINDOW_MINUTES,
+        budgets=[
+            RequestBudget(
+                "newsapi.ai",
+                Config.PREWARM_NEWSAPI_PER_MINUTE,
+                Config.PREWARM_NEWSAPI_PER_RUN,
+            ),
+            RequestBudget(
+                "gemini", Config.PREWARM_LLM_PER_MINUTE, Config.PREWARM_LLM_PER_RUN
+            ),
+        ],
+    )
+    if Config.PREWARM_ENABLED
+    else None
+)
+if prewarm_scheduler:
+    loop.call_soon_threadsafe(prewarm_scheduler.start)
+
+
+async def run_with_deadline(coroutine, received_at: float):
+    """Run a request under the deadline that started when its message arrived."""
+    elapsed = time.monotonic() - received_at
+    with deadline_scope(Config.REQUEST_DEADLINE_SECONDS - elapsed):
+        return await coroutine
 
 
 @app.binding(name="newsqueue")
 def newsqueue(request):
+    received_at = time.monotonic()
     logger.info("Getting news...")
     try:
-        data_request = json.loads(request.data.decode("utf-8"))
+        data_request = DigestRequest.from_dict(decode(request.data))
 
-        email = data_request.get("email")
-        password = data_request.get("password")
+        email = data_request.email
+        password = data_request.password
         logger.info(f"Email: {email}")
 
         if not email or not password:
@@ -27,7 +118,17 @@ def newsqueue(request):
             return
 
         # Call the service layer to handle the operation flow
-        response = news_service.handle_get_news(email, password)
+        if queue_consumer:
+            # blocks while the pool is saturated, so the broker stops delivering
+            coroutine = queue_consumer.submit(email, password)
+        elif digest_batcher:
+            # wait for the batch so the message is only acked once it is served
+            coroutine = digest_batcher.submit(email, password)
+        else:
+            coroutine = news_service.handle_get_news(email, password)
+        response = asyncio.run_coroutine_threadsafe(
+            run_with_deadline(coroutine, received_at), loop
+        ).result()
         if response["status"] == "error":
             logger.error(f"Error getting news: {response['message']}")
             return
@@ -36,6 +137,10 @@ def newsqueue(request):
 
         return
 
+    except TimeoutError:
+        # raise so the message is not acknowledged and gets redelivered
+        logger.error("Consumer is saturated, message not accepted")
+        raise
     except Exception as e:
         logger.error(f"Error processing get-news request: {e}")
         return
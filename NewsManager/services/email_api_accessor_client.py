@@ -1,22 +1,22 @@
 import logging
-from dapr.clients import DaprClient
-import json
+from common.dapr_client import get_sidecar_client
+from common.wire import encode
 
 
 class AsyncHTTPEmailAPIClient:
     def __init__(self, app_id):
         self.logger = logging.getLogger(__name__)
-        self.client = DaprClient()
+        self.client = get_sidecar_client()
         self.app = app_id
 
-    def send_news(self, email, news):
+    async def send_news(self, email, news):
         try:
             self.logger.info(f"Sending news to {email}")
             data = {"email": email, "news": news}
-            response = self.client.invoke_method(
+            response = await self.client.invoke_method_async(
                 app_id="email_api_accessor",
                 method_name="send-email",
-                data=json.dumps(data).encode("utf-8"),
+                data=encode(data),
                 content_type="application/json",
             )
             if response.status_code == 200:
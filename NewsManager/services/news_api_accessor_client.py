@@ -2,32 +2,31 @@ import logging
 import asyncio
 from typing import List
 
-from dapr.clients import DaprClient
+from common.dapr_client import get_sidecar_client
+from common.messages import Preferences
+from common.wire import decode, encode
 from dapr.ext.grpc import InvokeMethodResponse, InvokeMethodRequest
-import json
 
 
 class AsyncGRPCNewsApiClient:
     def __init__(self, app_id):
         self.app_id = app_id
-        self.dapr_client = DaprClient()
+        self.dapr_client = get_sidecar_client()
         self.logger = logging.getLogger(__name__)
 
-    def get_news_by_categories(self, categories, language, country) -> List[dict]:
+    async def get_news_by_categories(self, categories, language, country) -> List[dict]:
         try:
             self.logger.info(
                 f"Getting news for categories: {categories}, language: {language}, country: {country}"
             )
-            response = self.dapr_client.invoke_method(
+            response = await self.dapr_client.invoke_method_async(
                 app_id=self.app_id,
                 method_name="get_news_by_categories",
                 content_type="application/grpc",
-                data=json.dumps(
-                    {"categories": categories, "language": language, "country": country}
-                ).encode("utf-8"),
+                data=encode(Preferences(language, country, categories)),
             )
             self.logger.info(f"Received news: {response.data}")
-            data = json.loads(response.data.decode("utf-8"))
+            data = decode(response.data)
             if data["status"] == "success":
                 news = data["data"]
                 return news
@@ -1,15 +1,15 @@
 import logging
-from dapr.clients import DaprClient
-import json
+from common.dapr_client import get_sidecar_client
+from common.wire import decode, encode
 
 
 class AsyncHTTPNewsDBAccessorClient:
     def __init__(self, app_id):
         self.logger = logging.getLogger(__name__)
-        self.client = DaprClient()
+        self.client = get_sidecar_client()
         self.app_id = app_id
 
-    def get_cached_news(self, preferences):
+    async def get_cached_news(self, preferences):
         try:
             data = {
                 "language": preferences.get("language"),
@@ -17,21 +17,21 @@ class AsyncHTTPNewsDBAccessorClient:
                 "categories": preferences.get("categories"),
             }
             self.logger.info("Checking cache for news...")
-            response = self.client.invoke_method(
+            response = await self.client.invoke_method_async(
                 app_id=self.app_id,
                 method_name="get_news",
-                data=json.dumps(data).encode("utf-8"),
+                data=encode(data),
                 content_type="application/json",
             )
             if response.status_code == 200:
-                news = json.loads(response.data.decode("utf-8"))
+                news = decode(response.data)
                 return news.get("data", [])
             return None
         except Exception as e:
             self.logger.error(f"Error checking cached news: {e}")
             return None
 
-    def update_news(self, language, country, category, news):
+    async def update_news(self, language, country, category, news):
         try:
             self.logger.info("Updating cache with fresh news...")
             data = {
@@ -40,10 +40,10 @@ class AsyncHTTPNewsDBAccessorClient:
                 "category": category,
                 "articles": news,
             }
-            response = self.client.invoke_method(
+            response = await self.client.invoke_method_async(
                 app_id=self.app_id,
                 method_name="update_news",
-                data=json.dumps(data).encode("utf-8"),
+                data=encode(data),
                 content_type="application/json",
             )
             if response.status_code == 200:
@@ -55,3 +55,106 @@ class AsyncHTTPNewsDBAccessorClient:
         except Exception as e:
             self.logger.error(f"Error updating cache: {e}")
             return False
+
+    async def update_news_bulk(self, language, country, news):
+        """
+        Write the articles of all categories of a language/country at once.
+        """
+        try:
+            self.logger.info(f"Updating cache with fresh news for {list(news)}...")
+            data = {"language": language, "country": country, "news": news}
+            response = await self.client.invoke_method_async(
+                app_id=self.app_id,
+                method_name="update_news_bulk",
+                data=encode(data),
+                content_type="application/json",
+            )
+            if response.status_code == 200:
+                self.logger.info("Cache updated successfully")
+                return True
+            else:
+                self.logger.error(f"Failed to update cache: {response.text()}")
+                return False
+        except Exception as e:
+            self.logger.error(f"Error updating cache: {e}")
+            return False
+
+    async def acquire_lock(self, name, owner, ttl_seconds):
+        """
+        Returns True when the lock was acquired, False when it is held by
+        someone else and None when the lock service could not be reached.
+        """
+        try:
+            data = {"name": name, "owner": owner, "ttl_seconds": ttl_seconds}
+            response = await self.client.invoke_method_async(
+                app_id=self.app_id,
+                method_name="acquire_lock",
+                data=encode(data),
+                content_type="application/json",
+            )
+            if response.status_code == 200:
+                data_response = decode(response.data)
+                if data_response.get("status") == "success":
+                    return data_response["acquired"]
+            self.logger.error(f"Failed to acquire lock {name}: {response.text()}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Error acquiring lock {name}: {e}")
+            return None
+
+    async def release_lock(self, name, owner):
+        try:
+            data = {"name": name, "owner": owner}
+            response = await self.client.invoke_method_async(
+                app_id=self.app_id,
+                method_name="release_lock",
+                data=encode(data),
+                content_type="application/json",
+            )
+            if response.status_code == 200:
+                data_response = decode(response.data)
+                return data_response.get("released", False)
+            return False
+        except Exception as e:
+            self.logger.error(f"Error releasing lock {name}: {e}")
+            return False
+
+    async def get_sent_articles(self, email, article_ids):
+        """
+        Return the subset of article_ids already sent to the user, or an empty
+        set when the index cannot be reached.
+        """
+        try:
+            data = {"email": email, "article_ids": article_ids}
+            response = await self.client.invoke_method_async(
+                app_id=self.app_id,
+                method_name="filter_sent_articles",
+                data=encode(data),
+                content_type="application/json",
+            )
+            if response.status_code == 200:
+                data_response = decode(response.data)
+                if data_response.get("status") == "success":
+                    return set(data_response["data"])
+            self.logger.error(f"Failed to check sent articles: {response.text()}")
+            return set()
+        except Exception as e:
+            self.logger.error(f"Error checking sent articles: {e}")
+            return set()
+
+    async def mark_articles_sent(self, email, article_ids):
+        try:
+            data = {"email": email, "article_ids": article_ids}
+            response = await self.client.invoke_method_async(
+                app_id=self.app_id,
+                method_name="mark_articles_sent",
+                data=encode(data),
+                content_type="application/json",
+            )
+            if response.status_code == 200:
+                return True
+            self.logger.error(f"Failed to mark articles as sent: {response.text()}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Error marking articles as sent: {e}")
+            return False
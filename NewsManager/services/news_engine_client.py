@@ -1,34 +1,87 @@
 import logging
-from dapr.clients import DaprClient
-import json
+from typing import Awaitable, Callable, List, Optional
+from common.dapr_client import get_sidecar_client
+from common.wire import decode, encode
+
+NDJSON = "application/x-ndjson"
 
 
 class AsyncHTTPNewsEngineClient:
-    def __init__(self, dapr_http_port):
+    def __init__(self, dapr_http_port, stream: bool = False):
         self.logger = logging.getLogger(__name__)
-        self.client = DaprClient()
+        self.client = get_sidecar_client()
         self.dapr_http_port = dapr_http_port
+        # ask for one NDJSON record per category as the News Engine summarizes it
+        self.stream = stream
+
+    def is_available(self) -> bool:
+        """False while the circuit breaker of the News Engine is open."""
+        return self.client.breaker("news_engine").state != "open"
+
+    async def get_fresh_news(
+        self,
+        preferences,
+        on_category: Optional[Callable[[str, List[dict]], Awaitable[None]]] = None,
+    ):
+        """
+        Fresh news of the preferences by category. When streaming, on_category
+        is awaited with the articles of each category as soon as they arrive,
+        and the categories received so far are returned if the stream breaks.
+        """
+        if not self.stream:
+            return await self._get_fresh_news(preferences)
+        news = {}
+        try:
+            self.logger.info("Streaming fresh news from News Engine...")
+            async with self.client.invoke_method_stream(
+                app_id="news_engine",
+                method_name="get-fresh-news",
+                data=encode(preferences),
+                content_type="application/json",
+                metadata=(("Accept", NDJSON),),
+            ) as response:
+                if not (response.content_type or "").startswith(NDJSON):
+                    return self._parse_news(await response.read())
+                async for line in response.lines():
+                    record = decode(line)
+                    if "category" in record:
+                        news[record["category"]] = record["articles"]
+                        if on_category is not None:
+                            await on_category(record["category"], record["articles"])
+                    elif record.get("status") != "success":
+                        self.logger.error(
+                            f"Error fetching news from News Engine: {record.get('message')}"
+                        )
+            self.logger.info(f"Streamed news of {len(news)} categories")
+            return news
+        except Exception as e:
+            self.logger.error(f"Error streaming news from News Engine: {e}")
+            return news
 
-    def get_fresh_news(self, preferences):
+    async def _get_fresh_news(self, preferences):
         try:
             self.logger.info("Fetching fresh news from News Engine...")
-            response = self.client.invoke_method(
+            response = await self.client.invoke_method_async(
                 app_id="news_engine",
                 method_name="get-fresh-news",
-                data=json.dumps(preferences).encode("utf-8"),
+                data=encode(preferences),
                 content_type="application/json",
             )
             if response.status_code == 200:
-                data_response = json.loads(response.data.decode("utf-8"))
-                news = data_response.get("data", [])
-                if data_response.get("status") == "success":
-                    self.logger.info("Successfully fetched news from News Engine")
-                    return news
-                else:
-                    self.logger.error(
-                        f"Error fetching news from News Engine: {data_response.get('message')}"
-                    )
+                return self._parse_news(response.data)
             return []
         except Exception as e:
             self.logger.error(f"Error fetching news from News Engine: {e}")
             return []
+
+    def _parse_news(self, data: bytes):
+        data_response = decode(data)
+        news = data_response.get("data", [])
+        if data_response.get("status") == "success":
+            self.logger.info("Successfully fetched news from News Engine")
+            return news
+        else:
+            self.logger.error(
+                f"Error fetching news from News Engine: {data_response.get('message')}"
+            )
+        return []
@@ -0,0 +1,33 @@
+import logging
+from typing import Dict, List
+
+from common.dapr_client import get_sidecar_client
+from common.wire import decode
+
+
+class AsyncHTTPUsersDBAccessorClient:
+    def __init__(self, app_id):
+        self.logger = logging.getLogger(__name__)
+        self.client = get_sidecar_client()
+        self.app_id = app_id
+
+    async def get_active_segments(self) -> List[Dict]:
+        """
+        Get the preference segments of active users, largest segment first.
+        """
+        try:
+            self.logger.info("Getting active preference segments")
+            response = await self.client.invoke_method_async(
+                app_id=self.app_id,
+                method_name="GetActiveSegments",
+                data=b"",
+                http_verb="GET",
+            )
+            if response.status_code == 200:
+                data = decode(response.data)
+                return data.get("segments", [])
+            self.logger.error(f"Failed to get active segments: {response.text()}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Error getting active segments: {e}")
+            return []
@@ -2,28 +2,28 @@ import logging
 import asyncio
 from typing import List, Dict
 
-from dapr.clients import DaprClient
-import json
+from common.dapr_client import get_sidecar_client
+from common.wire import decode, encode
 
 
 class AsyncHTTPUsersManagerClient:
     def __init__(self, app_id):
         self.logger = logging.getLogger(__name__)
-        self.client = DaprClient()
+        self.client = get_sidecar_client()
         self.app_id = app_id
 
-    def get_user_preferences(self, email: str, password: str) -> Dict[str, str]:
+    async def get_user_preferences(self, email: str, password: str) -> Dict[str, str]:
         try:
             self.logger.info(f"Getting preferences for user: {email}")
             data = {"email": email, "password": password}
-            response = self.client.invoke_method(
+            response = await self.client.invoke_method_async(
                 app_id=self.app_id,
                 method_name="GetUserPreferencesByEmailAddress",
-                data=json.dumps(data).encode("utf-8"),
+                data=encode(data),
                 content_type="application/grpc",
             )
             self.logger.info(f"Received preferences: {response.data}")
-            data = json.loads(response.data.decode("utf-8"))
+            data = decode(response.data)
             if "error" in data:
                 return {"error": data["error"]}
             elif "success" in data:
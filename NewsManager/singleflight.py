@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight call.
+
+    The first caller for a key runs the call, every caller arriving while it is
+    in flight waits for it and gets the same result.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Returns the call result and whether this caller was the one running it.
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.logger.info(f"Joining in-flight call for {key}")
+            # shield so a cancelled waiter does not cancel the shared call
+            return await asyncio.shield(task), False
+
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task), True
+
+
+class DistributedSingleFlight:
+    """
+    Single-flight across NewsManager replicas, backed by a Redis lock held in
+    the News DB Accessor.
+
+    The replica holding the lock runs the call, the others poll `read_shared`
+    until the leader's result is visible (e.g. written to the news cache), and
+    fall back to running the call themselves if it does not show up in time.
+    """
+
+    def __init__(
+        self,
+        news_db_client,
+        lock_ttl_seconds: int = 60,
+        wait_timeout_seconds: float = 30,
+        poll_interval_seconds: float = 0.5,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.news_db_client = news_db_client
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.wait_timeout_seconds = wait_timeout_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        read_shared: Callable[[], Awaitable[Optional[Any]]],
+    ) -> Tuple[Any, bool]:
+        """
+        Returns the result and whether this replica was the one running the call.
+        """
+        lock_name = f"singleflight:{key}"
+        owner = str(uuid.uuid4())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout_seconds
+
+        while True:
+            acquired = await self.news_db_client.acquire_lock(
+                lock_name, owner, self.lock_ttl_seconds
+            )
+            if acquired is None:
+                # lock service unavailable, do not make every replica wait
+                return await fn(), True
+            if acquired:
+                try:
+                    return await fn(), True
+                finally:
+                    await self.news_db_client.release_lock(lock_name, owner)
+
+            if loop.time() >= deadline:
+                self.logger.warning(f"Timed out waiting for {key}, running it here")
+                return await fn(), True
+
+            await asyncio.sleep(self.poll_interval_seconds)
+            shared = await read_shared()
+            if shared:
+                self.logger.info(f"Using result shared by another replica for {key}")
+                return shared, False
@@ -200,6 +200,28 @@ async def DeleteUserByEmail():
         return {"error": "Internal error"}, HTTPStatus.INTERNAL_SERVER_ERROR
 
 
+@app.route("/GetActiveSegments", methods=["GET"])
+async def GetActiveSegments():
+    try:
+        logger.info("Getting active preference segments")
+        segments = {}
+        for segment in await users_db_accessor.get_active_segments():
+            # the same categories may be stored in a different order
+            categories = sorted(segment["categories"])
+            key = (segment["language"], segment["country"], tuple(categories))
+            if key in segments:
+                segments[key]["subscribers"] += segment["subscribers"]
+            else:
+                segments[key] = {**segment, "categories": categories}
+        ranked = sorted(
+            segments.values(), key=lambda segment: segment["subscribers"], reverse=True
+        )
+        return {"segments": ranked}, HTTPStatus.OK
+    except Exception as e:
+        logger.error(f"Error getting active segments: {str(e)}")
+        return {"error": "Internal error"}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
 if __name__ == "__main__":
     logger.info("Starting server...")
     app.run(port=5002)
@@ -216,3 +216,26 @@ class UsersDBAccessor:
                 (False, email),
             )
             self._connection.commit()
+
+    async def get_active_segments(self):
+        """
+        Count active users per (language, country, categories) preference.
+        """
+        with self._connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT language, country, categories, COUNT(*)
+                FROM users
+                WHERE is_active
+                GROUP BY language, country, categories;
+                """
+            )
+            return [
+                {
+                    "language": language,
+                    "country": country,
+                    "categories": categories or [],
+                    "subscribers": subscribers,
+                }
+                for language, country, categories, subscribers in cursor.fetchall()
+            ]
@@ -1,25 +1,41 @@
 from typing import Dict
 import logging
-import requests
 import config
+from common.dapr_client import DaprInvocationError, get_sidecar_client
+from common.wire import encode
 from user import User
-import json
 
 logger = logging.getLogger(__name__)
 
 
 class UsersDBAccessorClient:
     def __init__(self):
-        self.address = f"http://localhost:{config.DAPR_HTTP_PORT}/v1.0/invoke/{config.DB_ACCESSOR_APP_ID}/method"
+        # pooled keep-alive connections to the sidecar, shared by the process
+        self.sidecar_client = get_sidecar_client()
+
+    def _invoke(self, method_name: str, http_verb: str, json_data=None, params=None):
+        response = self.sidecar_client.invoke_method(
+            app_id=config.DB_ACCESSOR_APP_ID,
+            method_name=method_name,
+            data=encode(json_data) if json_data is not None else b"",
+            content_type="application/json",
+            http_verb=http_verb,
+            http_querystring=tuple(params.items()) if params else None,
+            timeout=config.DB_ACCESSOR_TIMEOUT_SECONDS,
+        )
+        try:
+            return response.json()
+        except ValueError as e:
+            raise DaprInvocationError(
+                response.status_code, reason=f"Invalid JSON response: {e}"
+            ) from e
 
     def create_user(self, user: User) -> Dict:
         """Send a POST request to create a user."""
         try:
             logger.info(f"Creating user: {user}")
-            response = requests.post(f"{self.address}/CreateUser", json=user.to_dict())
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            return response.json()
-        except requests.RequestException as e:
+            return self._invoke("CreateUser", "POST", json_data=user.to_dict())
+        except DaprInvocationError as e:
             logger.error(f"Error creating user: {e}")
             return {"error": str(e)}
 
@@ -28,12 +44,10 @@ class UsersDBAccessorClient:
         try:
             logger.info(f"Getting preferences for user: {email}")
             params = {"email": email, "password": password}
-            response = requests.get(
-                f"{self.address}/GetUserPreferencesByEmailAddress", params=params
+            return self._invoke(
+                "GetUserPreferencesByEmailAddress", "GET", params=params
             )
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+        except DaprInvocationError as e:
             logger.error(f"Error getting user preferences: {e}")
             return {"error": str(e)}
 
@@ -41,10 +55,8 @@ class UsersDBAccessorClient:
         """Send a PUT request to update a user by ID."""
         try:
             logger.info(f"Updating user: {user}")
-            response = requests.put(f"{self.address}/UpdateUser", json=user.to_dict())
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._invoke("UpdateUser", "PUT", json_data=user.to_dict())
+        except DaprInvocationError as e:
             logger.error(f"Error updating user: {e}")
             return {"error": str(e)}
 
@@ -57,10 +69,8 @@ class UsersDBAccessorClient:
                 "email": email,
                 "password": password,
             }
-            response = requests.put(f"{self.address}/UpdateUserByEmail", json=data)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._invoke("UpdateUserByEmail", "PUT", json_data=data)
+        except DaprInvocationError as e:
             logger.error(f"Error updating user by email: {e}")
             return {"error": str(e)}
 
@@ -69,10 +79,8 @@ class UsersDBAccessorClient:
         try:
             logger.info(f"Deleting user by ID: {user_id}")
             params = {"user_id": user_id}
-            response = requests.delete(f"{self.address}/DeleteUser", params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._invoke("DeleteUser", "DELETE", params=params)
+        except DaprInvocationError as e:
             logger.error(f"Error deleting user: {e}")
             return {"error": str(e)}
 
@@ -81,12 +89,8 @@ class UsersDBAccessorClient:
         try:
             logger.info(f"Deleting user by email: {email}")
             params = {"email": email, "password": password}
-            response = requests.delete(
-                f"{self.address}/DeleteUserByEmail", params=params
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._invoke("DeleteUserByEmail", "DELETE", params=params)
+        except DaprInvocationError as e:
             logger.error(f"Error deleting user by email: {e}")
             return {"error": str(e)}
 
@@ -95,9 +99,7 @@ class UsersDBAccessorClient:
         try:
             logger.info(f"Getting user with ID: {user_id}")
             params = {"user_id": user_id}
-            response = requests.get(f"{self.address}/GetUser", params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._invoke("GetUser", "GET", params=params)
+        except DaprInvocationError as e:
             logger.error(f"Error getting user: {e}")
             return {"error": str(e)}
@@ -1,10 +1,13 @@
 from dapr.ext.grpc import App, InvokeMethodResponse
 
+import threading
+
 import config
+from common.dapr_client import get_sidecar_client
+from common.wire import decode, encode
 from engine import UserManagerEngine
 from dto import UserDTO
 import logging
-import json
 from http import HTTPStatus
 
 logging.basicConfig(level=logging.INFO)
@@ -19,7 +22,7 @@ def create_response(
 ) -> InvokeMethodResponse:
     """Create a standardized response"""
     return InvokeMethodResponse(
-        data=json.dumps(data).encode("utf-8"),
+        data=encode(data),
         content_type="application/json",
         headers=(("internal-status", str(status_code)),),
     )
@@ -36,7 +39,7 @@ def create_error_response(
 def create_user(request):
     try:
         logger.info("Creating a new user")
-        user_data = json.loads(request.data.decode("utf-8"))
+        user_data = decode(request.data)
         logger.info(f"User data: {user_data}")
 
         user_dto = UserDTO(**user_data)
@@ -55,7 +58,7 @@ def create_user(request):
 def get_user_preferences(request):
     try:
         logger.info("Getting user preferences")
-        request_data = json.loads(request.data.decode("utf-8"))
+        request_data = decode(request.data)
         email = request_data.get("email")
         password = request_data.get("password")
         response = engine.get_user_preferences(email, password)
@@ -74,7 +77,7 @@ def get_user_preferences(request):
 @app.method(name="UpdateUserByEmail")
 def update_user_by_email(request):
     try:
-        request_data = json.loads(request.data.decode("utf-8"))
+        request_data = decode(request.data)
         user_data = request_data.get("user")
         old_email = request_data.get("email")
         old_password = request_data.get("password")
@@ -107,7 +110,7 @@ def update_user_by_email(request):
 @app.method(name="DeleteUserByEmail")
 def delete_user_by_email(request):
     try:
-        request_data = json.loads(request.data.decode("utf-8"))
+        request_data = decode(request.data)
         email = request_data.get("email")
         password = request_data.get("password")
 
@@ -127,4 +130,6 @@ def delete_user_by_email(request):
 
 if __name__ == "__main__":
     logger.info("Starting Users Manager Service...")
+    # open the sidecar connection pool without delaying the app's startup
+    threading.Thread(target=get_sidecar_client().warm_up_sync, daemon=True).start()
     app.run(config.APP_PORT)
@@ -0,0 +1,132 @@
+"""
+Compare service invocation latency through the Dapr SDK's DaprClient, which
+opens a new HTTP session per call, against the pooled SidecarClient.
+
+A fake sidecar serving /v1.0/invoke/<app>/method/<method> runs in-process on a
+background thread, so the numbers isolate the client-side cost.
+
+Run from the repository root:
+    python common/benchmarks/invoke_benchmark.py
+"""
+
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# the SDK reads the sidecar port from the environment when it is imported
+PORT = free_port()
+os.environ["DAPR_HTTP_PORT"] = str(PORT)
+
+from aiohttp import web  # noqa: E402
+from dapr.clients import DaprClient  # noqa: E402
+
+from common.dapr_client import SidecarClient  # noqa: E402
+
+SEQUENTIAL_CALLS = 500
+CONCURRENT_CALLS = 2000
+CONCURRENCY = 50
+PAYLOAD = b'{"status": "success", "data": [' + b'{"title": "t"},' * 50 + b"{}]}"
+
+
+def start_fake_sidecar():
+    async def invoke(request):
+        await request.read()
+        return web.Response(body=PAYLOAD, content_type="application/json")
+
+    async def healthz(request):
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_route("*", "/v1.0/invoke/{app_id}/method/{method}", invoke)
+    app.router.add_get("/v1.0/healthz/outbound", healthz)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app, access_log=None)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", PORT).start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+
+def summary(latencies) -> str:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95)]
+    return (
+        f"mean {statistics.mean(latencies) * 1000:7.3f} ms  "
+        f"p50 {statistics.median(latencies) * 1000:7.3f} ms  "
+        f"p95 {p95 * 1000:7.3f} ms"
+    )
+
+
+async def sequential_async(client) -> list:
+    latencies = []
+    for _ in range(SEQUENTIAL_CALLS):
+        start = time.perf_counter()
+        await client.invoke_method_async("app", "method", data=b"{}")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def concurrent_async(client) -> float:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def call():
+        async with semaphore:
+            await client.invoke_method_async("app", "method", data=b"{}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(CONCURRENT_CALLS)))
+    return CONCURRENT_CALLS / (time.perf_counter() - start)
+
+
+def sequential_sync(client) -> list:
+    latencies = []
+    for _ in range(SEQUENTIAL_CALLS):
+        start = time.perf_counter()
+        client.invoke_method("app", "method", data=b"{}")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_async(name, client):
+    if isinstance(client, SidecarClient):
+        await client.warm_up()
+    print(f"{name:>14} async sequential: {summary(await sequential_async(client))}")
+    print(f"{name:>14} async concurrent: {await concurrent_async(client):8.0f} calls/s")
+    if isinstance(client, SidecarClient):
+        await client.close()
+
+
+def main():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    start_fake_sidecar()
+    sdk_client = DaprClient()
+    sidecar_client = SidecarClient(base_url=f"http://127.0.0.1:{PORT}")
+
+    asyncio.run(run_async("DaprClient", sdk_client))
+    asyncio.run(run_async("SidecarClient", sidecar_client))
+
+    print(
+        f"{'DaprClient':>14} sync sequential:  {summary(sequential_sync(sdk_client))}"
+    )
+    sidecar_client.warm_up_sync()
+    print(
+        f"{'SidecarClient':>14} sync sequential:  "
+        f"{summary(sequential_sync(sidecar_client))}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Memory and CPU cost of 10k articles with the shared, slotted NewsArticle
+against the NewsArticle with a __dict__ that NewsEngine and the LLM accessor
+each had before ("dict"), along the path an article takes through them:
+
+- NewsEngine builds it from the News API accessor's answer and encodes the
+  summarize request,
+- the LLM accessor decodes the request, takes what Gemini needs, puts the
+  summary into the article and encodes the answer.
+
+Run from the repository root:
+    python common/benchmarks/news_article_benchmark.py
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from common.news_article import NewsArticle, decode_by_category  # noqa: E402
+from common.wire import encode  # noqa: E402
+
+ARTICLES = 10000
+CATEGORIES = ["politics", "business", "technology", "health", "sports"]
+ROUNDS = 5
+
+
+class DictNewsArticle:
+    """NewsArticle as it was, attributes in a __dict__."""
+
+    def __init__(self, title, body, image, url, dateTimePub, category):
+        self.title = title
+        self.body = body
+        self.image = image
+        self.url = url
+        self.dateTimePub = dateTimePub
+        self.category = category
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "body": self.body,
+            "image": self.image,
+            "url": self.url,
+            "dateTimePub": self.dateTimePub,
+            "category": self.category,
+        }
+
+    def to_dict_for_llm(self):
+        return {"title": self.title, "body": self.body}
+
+    @staticmethod
+    def from_dict(data):
+        return DictNewsArticle(
+            data["title"],
+            data["body"],
+            data["image"],
+            data["url"],
+            data["dateTimePub"],
+            data["category"],
+        )
+
+
+def raw_news() -> list:
+    """What the News API accessor answers, with some of newsapi.ai's fields."""
+    per_category = ARTICLES // len(CATEGORIES)
+    return [
+        {
+            "category": category,
+            "articles": [
+                {
+                    "uri": f"{category}-{i}",
+                    "title": f"{category} story {i}",
+                    "body": f"Body of {category} story {i}. " * 40,
+                    "image": f"https://img.example/{category}/{i}.jpg",
+                    "url": f"https://news.example/{category}/{i}",
+                    "dateTimePub": "2024-01-01T00:00:00Z",
+                    "lang": "eng",
+                    "sim": 0.0,
+                }
+                for i in range(per_category)
+            ],
+        }
+        for category in CATEGORIES
+    ]
+
+
+def summaries(articles: list) -> list:
+    return [
+        {"title": "Summary title", "body": f"Summary of {article['title']}"}
+        for article in articles
+    ]
+
+
+def dict_path(raw: list):
+    # NewsEngine: answer -> dict -> article -> dict -> JSON
+    by_category = {}
+    for category_data in raw:
+        category = category_data["category"]
+        by_category[category] = [
+            DictNewsArticle.from_dict(
+                {
+                    "title": article.get("title", "No Title"),
+                    "body": article.get("body", ""),
+                    "image": article.get("image", ""),
+                    "url": article.get("url", ""),
+                    "dateTimePub": article.get("dateTimePub", ""),
+                    "category": category,
+                }
+            )
+            for article in category_data["articles"]
+        ]
+    request = json.dumps(
+        {
+            category: [article.to_dict() for article in articles]
+            for category, articles in by_category.items()
+        }
+    ).encode("utf-8")
+
+    # LLM accessor: JSON -> dict -> article -> dict, summary -> article -> dict
+    request_data = json.loads(request.decode("utf-8"))
+    answer = {}
+    for category, articles in request_data.items():
+        for_llm = [DictNewsArticle.from_dict(a).to_dict_for_llm() for a in articles]
+        answer[category] = [
+            DictNewsArticle(
+                title=summary["title"],
+                body=summary["body"],
+                image=original["image"],
+                url=original["url"],
+                dateTimePub=original["dateTimePub"],
+                category=original["category"],
+            ).to_dict()
+            for original, summary in zip(articles, summaries(for_llm))
+        ]
+    return json.dumps({"status": "success", "data": answer}).encode("utf-8")
+
+
+def slots_path(raw: list):
+    # NewsEngine: answer -> article -> JSON
+    by_category = {}
+    for category_data in raw:
+        category = category_data["category"]
+        by_category[category] = [
+            NewsArticle(
+                title=article.get("title", "No Title"),
+                body=article.get("body", ""),
+                image=article.get("image", ""),
+                url=article.get("url", ""),
+                dateTimePub=article.get("dateTimePub", ""),
+                category=category,
+            )
+            for article in category_data["articles"]
+        ]
+    request = encode(by_category)
+
+    # LLM accessor: JSON -> article, summary -> article -> JSON
+    request_data = decode_by_category(request)
+    answer = {}
+    for category, articles in request_data.items():
+        for_llm = [article.to_dict_for_llm() for article in articles]
+        answer[category] = [
+            original.with_summary(summary["title"], summary["body"])
+            for original, summary in zip(articles, summaries(for_llm))
+        ]
+    return encode({"status": "success", "data": answer})
+
+
+def memory(article_class, raw: list) -> int:
+    """Bytes taken by the article objects themselves, strings are shared."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    articles = [
+        article_class(
+            a["title"], a["body"], a["image"], a["url"], a["dateTimePub"], c["category"]
+        )
+        for c in raw
+        for a in c["articles"]
+    ]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del articles
+    return used
+
+
+def cpu(path, raw: list) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.process_time()
+        path(raw)
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    raw = raw_news()
+    assert json.loads(dict_path(raw)) == json.loads(slots_path(raw))
+    print(f"{ARTICLES} articles in {len(CATEGORIES)} categories")
+    for name, article_class, path in (
+        ("dict", DictNewsArticle, dict_path),
+        ("slots", NewsArticle, slots_path),
+    ):
+        used = memory(article_class, raw)
+        print(
+            f"{name:>5}: {used / 1024:8.1f} KiB of objects "
+            f"({used / ARTICLES:5.1f} B/article)  "
+            f"path {cpu(path, raw) * 1000:7.1f} ms CPU"
+        )
+
+
+if __name__ == "__main__":
+    main()
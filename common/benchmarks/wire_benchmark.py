@@ -0,0 +1,140 @@
+"""
+Bytes and CPU per hop of a digest with the shared codec (common.wire, with the
+message classes validating what they decode) against the stdlib json the
+services used before ("json": json.dumps(...).encode("utf-8") on plain dicts,
+json.loads(data.decode("utf-8")) on the other side, nothing checked).
+
+Each hop encodes the message its sender builds and decodes it the way its
+receiver does, for English and for Hebrew articles. The articles sent to the
+LLM accessor already went out without \\u escapes, so their Hebrew "json" size
+is what they took before that rather than lately.
+
+Run from the repository root:
+    python common/benchmarks/wire_benchmark.py
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from common.messages import Preferences  # noqa: E402
+from common.news_article import NewsArticle, decode_by_category  # noqa: E402
+from common.wire import decode, encode  # noqa: E402
+
+CATEGORIES = ["politics", "business", "technology", "health", "sports"]
+ARTICLES_PER_CATEGORY = 10
+ROUNDS = 200
+TEXT = {
+    "english": "The minister said the plan would be presented to the cabinet. ",
+    "hebrew": "השר אמר כי התוכנית תוצג לממשלה בשבוע הבא. ",
+}
+
+
+def article(category: str, i: int, text: str, summary: bool = False) -> dict:
+    return {
+        "title": f"{category} {i}: {text[:40]}",
+        "body": text * (3 if summary else 40),
+        "image": f"https://img.example/{category}/{i}.jpg",
+        "url": f"https://news.example/{category}/{i}",
+        "dateTimePub": "2024-01-01T00:00:00Z",
+        "category": category,
+    }
+
+
+def hops(text: str):
+    """(name, message as the sender has it, how the new receiver decodes it)"""
+    preferences = {"language": "english", "country": "us", "categories": CATEGORIES}
+    raw_news = [
+        {
+            "category": category,
+            "articles": [
+                {**article(category, i, text), "uri": f"{i}", "lang": "eng", "sim": 0}
+                for i in range(ARTICLES_PER_CATEGORY)
+            ],
+        }
+        for category in CATEGORIES
+    ]
+    articles = {
+        category: [
+            NewsArticle.from_dict(article(category, i, text))
+            for i in range(ARTICLES_PER_CATEGORY)
+        ]
+        for category in CATEGORIES
+    }
+    summaries = {
+        category: [
+            article(category, i, text, summary=True)
+            for i in range(ARTICLES_PER_CATEGORY)
+        ]
+        for category in CATEGORIES
+    }
+    return [
+        (
+            "preferences -> NewsEngine",
+            Preferences.from_dict(preferences),
+            lambda data: Preferences.from_dict(decode(data)),
+        ),
+        ("raw news -> NewsEngine", {"status": "success", "data": raw_news}, decode),
+        ("articles -> LLM accessor", articles, decode_by_category),
+        ("summaries -> NewsEngine", {"status": "success", "data": summaries}, decode),
+        ("fresh news -> NewsManager", {"status": "success", "data": summaries}, decode),
+        (
+            "cache write -> NewsDB",
+            {"language": "english", "country": "us", "news": summaries},
+            decode,
+        ),
+        (
+            "digest -> EmailAPI",
+            {"email": "user@example.com", "news": summaries["politics"][:5]},
+            decode,
+        ),
+    ]
+
+
+def as_plain_dicts(message):
+    """The message as the services built it before, articles as dicts."""
+    if isinstance(message, (NewsArticle, Preferences)):
+        return message.to_dict()
+    if isinstance(message, dict):
+        return {key: as_plain_dicts(value) for key, value in message.items()}
+    if isinstance(message, list):
+        return [as_plain_dicts(value) for value in message]
+    return message
+
+
+def cpu(function) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = time.process_time()
+        for _ in range(ROUNDS):
+            function()
+        best = min(best, (time.process_time() - start) / ROUNDS)
+    return best
+
+
+def main():
+    print(
+        f"{len(CATEGORIES)} categories of {ARTICLES_PER_CATEGORY} articles, "
+        "best CPU per hop (encode + decode)"
+    )
+    for language, text in TEXT.items():
+        print(f"\n{language}")
+        for name, message, receive in hops(text):
+            plain = as_plain_dicts(message)
+            old_data = json.dumps(plain).encode("utf-8")
+            new_data = encode(message)
+            assert as_plain_dicts(receive(new_data)) == json.loads(old_data)
+            old = cpu(lambda: json.loads(json.dumps(plain).encode("utf-8").decode()))
+            new = cpu(lambda: receive(encode(message)))
+            print(
+                f"  {name:<26} json {len(old_data):7d} B {old * 1e6:8.1f} us"
+                f"   wire {len(new_data):7d} B {new * 1e6:8.1f} us"
+                f"   ({old / new:4.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import logging
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-dependency circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail fast. Once `reset_timeout_seconds` have passed a single trial call is
+    let through: success closes the circuit, failure keeps it open for another
+    timeout. Safe to share between threads and event loops.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout_seconds: float = 30
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._failures < self.failure_threshold:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at >= self.reset_timeout_seconds:
+                # let one trial call through and re-arm the timer for the others
+                self._opened_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._failures >= self.failure_threshold:
+                self.logger.info(f"Circuit for {self.name} closed")
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                if self._failures == self.failure_threshold:
+                    self.logger.warning(f"Circuit for {self.name} opened")
+                self._opened_at = time.monotonic()
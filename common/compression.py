@@ -0,0 +1,75 @@
+import gzip
+import zlib
+from typing import Mapping, Optional, Tuple
+
+from prometheus_client import Counter
+
+from common.config import SidecarConfig
+
+GZIP = "gzip"
+# no JSON starts with these bytes, so a body tells itself whether it is gzipped
+_GZIP_MAGIC = b"\x1f\x8b"
+
+PAYLOAD_BYTES = Counter(
+    "dapr_payload_bytes_total",
+    "Bytes of service invocation bodies as sent to or received from the sidecar",
+    ("app_id", "method", "direction"),
+)
+PAYLOAD_UNCOMPRESSED_BYTES = Counter(
+    "dapr_payload_uncompressed_bytes_total",
+    "Bytes of service invocation bodies before compression",
+    ("app_id", "method", "direction"),
+)
+
+
+def compress(data: bytes) -> Tuple[bytes, Optional[str]]:
+    """
+    data gzipped and its content encoding when compression is on and data is
+    large enough to gain from it, else data as is and None.
+    """
+    if (
+        not SidecarConfig.PAYLOAD_COMPRESSION
+        or len(data) < SidecarConfig.PAYLOAD_COMPRESSION_MIN_BYTES
+    ):
+        return data, None
+    compressed = gzip.compress(
+        data, compresslevel=SidecarConfig.PAYLOAD_COMPRESSION_LEVEL, mtime=0
+    )
+    return compressed, GZIP
+
+
+def decompress(data: bytes) -> bytes:
+    """data unzipped if it is gzipped, else as is."""
+    if data[:2] != _GZIP_MAGIC:
+        return data
+    try:
+        return gzip.decompress(data)
+    except (OSError, EOFError, zlib.error) as e:
+        raise ValueError(f"Invalid gzip body: {e}") from e
+
+
+def accepts_gzip(headers: Mapping) -> bool:
+    """Whether the headers (or gRPC metadata) of a request accept gzip bodies."""
+    value = headers.get("accept-encoding") or headers.get("Accept-Encoding")
+    if isinstance(value, (list, tuple)):
+        value = ",".join(value)
+    return bool(value) and GZIP in value
+
+
+def compress_response(
+    data: bytes, request_headers: Mapping
+) -> Tuple[bytes, Tuple[Tuple[str, str], ...]]:
+    """Body and extra headers of the answer to a request with request_headers."""
+    if not accepts_gzip(request_headers):
+        return data, ()
+    data, encoding = compress(data)
+    return data, (("content-encoding", encoding),) if encoding else ()
+
+
+def count_payload(
+    app_id: str, method: str, direction: str, sent: int, uncompressed: int
+):
+    PAYLOAD_BYTES.labels(app_id=app_id, method=method, direction=direction).inc(sent)
+    PAYLOAD_UNCOMPRESSED_BYTES.labels(
+        app_id=app_id, method=method, direction=direction
+    ).inc(uncompressed)
@@ -0,0 +1,28 @@
+import os
+
+
+class SidecarConfig:
+    DAPR_HTTP_ENDPOINT = os.getenv("DAPR_HTTP_ENDPOINT")
+    DAPR_RUNTIME_HOST = os.getenv("DAPR_RUNTIME_HOST", "127.0.0.1")
+    DAPR_HTTP_PORT = os.getenv("DAPR_HTTP_PORT", "3500")
+    DAPR_API_TOKEN = os.getenv("DAPR_API_TOKEN")
+    # Default deadline of a service invocation, overridable per call
+    DAPR_INVOKE_TIMEOUT_SECONDS = float(os.getenv("DAPR_INVOKE_TIMEOUT_SECONDS", "60"))
+    # Keep-alive connection pool to the sidecar, shared by the whole process
+    DAPR_HTTP_POOL_SIZE = int(os.getenv("DAPR_HTTP_POOL_SIZE", "100"))
+    DAPR_HTTP_KEEPALIVE_SECONDS = float(os.getenv("DAPR_HTTP_KEEPALIVE_SECONDS", "60"))
+    DAPR_WARM_UP_TIMEOUT_SECONDS = float(
+        os.getenv("DAPR_WARM_UP_TIMEOUT_SECONDS", "30")
+    )
+    # Per-dependency circuit breaker: open after this many consecutive failures,
+    # try again after the reset timeout
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+    # gzip service invocation bodies of at least PAYLOAD_COMPRESSION_MIN_BYTES,
+    # requests always and responses when the caller accepts it. Every service
+    # of a deployment reads compressed bodies, turn it on once all are updated.
+    PAYLOAD_COMPRESSION = os.getenv("PAYLOAD_COMPRESSION", "false").lower() == "true"
+    PAYLOAD_COMPRESSION_MIN_BYTES = int(
+        os.getenv("PAYLOAD_COMPRESSION_MIN_BYTES", "4096")
+    )
+    PAYLOAD_COMPRESSION_LEVEL = int(os.getenv("PAYLOAD_COMPRESSION_LEVEL", "1"))
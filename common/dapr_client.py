@@ -0,0 +1,491 @@
+import asyncio
+import contextlib
+import logging
+import threading
+import time
+import weakref
+from urllib.parse import urlencode
+from typing import AsyncIterator, Dict, Mapping, Optional, Tuple, Union
+
+import aiohttp
+from prometheus_client import Histogram
+
+from common.circuit_breaker import CircuitBreaker, CircuitOpenError
+from common.compression import GZIP, compress, count_payload, decompress
+from common.config import SidecarConfig
+from common.deadline import DeadlineExceeded, deadline_metadata, remaining
+from common.metrics import LATENCY_BUCKETS
+from common.wire import decode
+
+Metadata = Tuple[Tuple[str, str], ...]
+
+INVOKE_SECONDS = Histogram(
+    "dapr_invoke_seconds",
+    "Duration of service invocations through the sidecar, failed ones included",
+    ("app_id", "method"),
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class DaprInvocationError(Exception):
+    """
+    Raised when an invocation answers with a non-2xx status, or for sync calls
+    when the sidecar cannot be reached (status_code is None then).
+    """
+
+    def __init__(self, status_code: Optional[int], data: bytes = b"", reason=""):
+        self.status_code = status_code
+        self.data = data
+        super().__init__(
+            f"Invocation failed with status {status_code}: "
+            f"{data.decode('utf-8', errors='replace') or reason}"
+        )
+
+
+class InvokeResponse:
+    """
+    Response of a service invocation, exposing the parts of the Dapr SDK's
+    InvokeMethodResponse the services use.
+    """
+
+    def __init__(self, status_code: int, data: bytes, headers: Mapping[str, str]):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return self.headers.get("Content-Type")
+
+    def text(self) -> str:
+        return self.data.decode("utf-8")
+
+    def json(self):
+        return decode(self.data)
+
+
+class StreamingInvokeResponse:
+    """
+    Response of a service invocation whose body is read as it arrives rather
+    than buffered whole.
+    """
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: Mapping[str, str],
+        content: aiohttp.StreamReader,
+    ):
+        self.status_code = status_code
+        self.headers = headers
+        self._content = content
+        # bytes of the body read so far
+        self.bytes_read = 0
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return self.headers.get("Content-Type")
+
+    async def read(self) -> bytes:
+        data = await self._content.read()
+        self.bytes_read += len(data)
+        return data
+
+    async def lines(self) -> AsyncIterator[bytes]:
+        """The non-empty lines of the body, e.g. NDJSON records, as they arrive."""
+        pending = b""
+        async for chunk in self._content.iter_any():
+            self.bytes_read += len(chunk)
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if pending.strip():
+            yield pending
+
+
+class SidecarClient:
+    """
+    Process-wide client for invoking services through the local Dapr sidecar.
+
+    The Dapr SDK opens a new HTTP session, and therefore a new connection, for
+    every invocation. This client keeps a pool of keep-alive connections to the
+    sidecar instead: one aiohttp session per event loop for async callers and
+    one urllib3 pool shared by sync callers. Calls mirror the SDK's
+    `invoke_method_async` / `invoke_method` (same arguments, GET by default,
+    non-2xx raises) and take a per-call `timeout` deadline in seconds.
+
+    The deadline of the current request (see common.deadline) caps every call's
+    timeout and is forwarded to the callee. Each app id has a circuit breaker:
+    while it is open calls raise CircuitOpenError without reaching the sidecar.
+    Timeouts count against it only when the callee's own timeout expired, not
+    one the caller's deadline cut short.
+    Call durations are recorded per app id and method in dapr_invoke_seconds.
+
+    With PAYLOAD_COMPRESSION on, request bodies of PAYLOAD_COMPRESSION_MIN_BYTES
+    or more are gzipped and gzipped responses are accepted. The bytes of every
+    body, as sent and before compression, are counted per app id, method and
+    direction in dapr_payload_bytes_total and
+    dapr_payload_uncompressed_bytes_total.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        pool_size: int = SidecarConfig.DAPR_HTTP_POOL_SIZE,
+        keepalive_seconds: float = SidecarConfig.DAPR_HTTP_KEEPALIVE_SECONDS,
+        default_timeout: float = SidecarConfig.DAPR_INVOKE_TIMEOUT_SECONDS,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.base_url = base_url or (
+            SidecarConfig.DAPR_HTTP_ENDPOINT
+            or f"http://{SidecarConfig.DAPR_RUNTIME_HOST}:{SidecarConfig.DAPR_HTTP_PORT}"
+        )
+        self.pool_size = pool_size
+        self.keepalive_seconds = keepalive_seconds
+        self.default_timeout = default_timeout
+        # bodies are (de)compressed here rather than by the HTTP client, so what
+        # went over the wire can be counted
+        self._headers = {
+            "Content-Type": "application/json",
+            "Accept-Encoding": (
+                GZIP if SidecarConfig.PAYLOAD_COMPRESSION else "identity"
+            ),
+        }
+        if SidecarConfig.DAPR_API_TOKEN:
+            self._headers["dapr-api-token"] = SidecarConfig.DAPR_API_TOKEN
+        self._sessions: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._pool = None
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def _invoke_url(self, app_id: str, method_name: str) -> str:
+        return f"{self.base_url}/v1.0/invoke/{app_id}/method/{method_name}"
+
+    def breaker(self, app_id: str) -> CircuitBreaker:
+        """The circuit breaker guarding calls to `app_id`."""
+        breaker = self._breakers.get(app_id)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    app_id,
+                    CircuitBreaker(
+                        app_id,
+                        failure_threshold=SidecarConfig.CIRCUIT_FAILURE_THRESHOLD,
+                        reset_timeout_seconds=SidecarConfig.CIRCUIT_RESET_SECONDS,
+                    ),
+                )
+        return breaker
+
+    def _before_call(self, app_id: str, timeout: Optional[float]) -> Tuple[float, bool]:
+        """
+        Fail fast when the circuit is open or no time is left, else the timeout
+        and whether the caller's deadline cut it short.
+        """
+        timeout = timeout or self.default_timeout
+        capped = False
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                raise DeadlineExceeded(f"No time left to call {app_id}")
+            capped = left < timeout
+            timeout = min(timeout, left)
+        if not self.breaker(app_id).allow_request():
+            raise CircuitOpenError(f"Circuit for {app_id} is open")
+        return timeout, capped
+
+    def _after_call(
+        self,
+        app_id: str,
+        method_name: str,
+        status_code: Optional[int],
+        start: float,
+        deadline_timeout: bool = False,
+    ):
+        INVOKE_SECONDS.labels(app_id=app_id, method=method_name).observe(
+            time.perf_counter() - start
+        )
+        if deadline_timeout:
+            # the caller ran out of time before the dependency's own timeout,
+            # which says nothing about its health
+            return
+        # 4xx answers come from a healthy dependency
+        if status_code is None or status_code >= 500:
+            self.breaker(app_id).record_failure()
+        else:
+            self.breaker(app_id).record_success()
+
+    def _request_headers(
+        self,
+        content_type: Optional[str],
+        metadata: Optional[Metadata],
+        content_encoding: Optional[str] = None,
+    ) -> Dict[str, str]:
+        headers = dict(self._headers)
+        if metadata:
+            headers.update(metadata)
+        headers.update(deadline_metadata())
+        if content_type:
+            headers["Content-Type"] = content_type
+        if content_encoding:
+            headers["Content-Encoding"] = content_encoding
+        return headers
+
+    def _encode_request(
+        self, app_id: str, method_name: str, data: Union[bytes, str]
+    ) -> Tuple[bytes, Optional[str]]:
+        """The request body to send, compressed if large, and its encoding."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        body, encoding = compress(data)
+        count_payload(app_id, method_name, "request", len(body), len(data))
+        return body, encoding
+
+    def _decode_response(self, app_id: str, method_name: str, body: bytes) -> bytes:
+        data = decompress(body)
+        count_payload(app_id, method_name, "response", len(body), len(data))
+        return data
+
+    def _session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            self._close_sessions_of_closed_loops()
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_size, keepalive_timeout=self.keepalive_seconds
+                ),
+                auto_decompress=False,
+            )
+            self._sessions[loop] = session
+        return session
+
+    def _close_sessions_of_closed_loops(self):
+        # a session keeps its loop alive, forget the ones whose loop has closed
+        for loop in list(self._sessions.keys()):
+            if loop.is_closed():
+                del self._sessions[loop]
+
+    async def invoke_method_async(
+        self,
+        app_id: str,
+        method_name: str,
+        data: Union[bytes, str] = b"",
+        content_type: Optional[str] = None,
+        metadata: Optional[Metadata] = None,
+        http_verb: Optional[str] = None,
+        http_querystring: Optional[Metadata] = None,
+        timeout: Optional[float] = None,
+    ) -> InvokeResponse:
+        timeout, capped = self._before_call(app_id, timeout)
+        data, encoding = self._encode_request(app_id, method_name, data)
+        start = time.perf_counter()
+        try:
+            async with self._session().request(
+                http_verb or "GET",
+                self._invoke_url(app_id, method_name),
+                data=data,
+                headers=self._request_headers(content_type, metadata, encoding),
+                params=http_querystring,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                body = await response.read()
+        except asyncio.TimeoutError:
+            self._after_call(app_id, method_name, None, start, deadline_timeout=capped)
+            raise
+        except aiohttp.ClientError:
+            self._after_call(app_id, method_name, None, start)
+            raise
+        self._after_call(app_id, method_name, response.status, start)
+        body = self._decode_response(app_id, method_name, body)
+        if not 200 <= response.status < 300:
+            raise DaprInvocationError(response.status, body)
+        return InvokeResponse(response.status, body, response.headers)
+
+    @contextlib.asynccontextmanager
+    async def invoke_method_stream(
+        self,
+        app_id: str,
+        method_name: str,
+        data: Union[bytes, str] = b"",
+        content_type: Optional[str] = None,
+        metadata: Optional[Metadata] = None,
+        http_verb: Optional[str] = None,
+        http_querystring: Optional[Metadata] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[StreamingInvokeResponse]:
+        """
+        Like invoke_method_async, for answers to consume while they arrive:
+
+            async with client.invoke_method_stream(...) as response:
+                async for line in response.lines():
+                    ...
+
+        The timeout covers reading the whole body. The bytes read from it are
+        counted when the block exits.
+        """
+        timeout, capped = self._before_call(app_id, timeout)
+        data, encoding = self._encode_request(app_id, method_name, data)
+        headers = self._request_headers(content_type, metadata, encoding)
+        # each record is passed on as it arrives, gzip would hold them back
+        headers["Accept-Encoding"] = "identity"
+        start = time.perf_counter()
+        status_code = None
+        deadline_timeout = False
+        streamed = None
+        try:
+            async with self._session().request(
+                http_verb or "GET",
+                self._invoke_url(app_id, method_name),
+                data=data,
+                headers=headers,
+                params=http_querystring,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                status_code = response.status
+                if not 200 <= response.status < 300:
+                    raise DaprInvocationError(
+                        response.status,
+                        self._decode_response(
+                            app_id, method_name, await response.read()
+                        ),
+                    )
+                streamed = StreamingInvokeResponse(
+                    response.status, response.headers, response.content
+                )
+                yield streamed
+        except asyncio.TimeoutError:
+            status_code = None
+            deadline_timeout = capped
+            raise
+        except aiohttp.ClientError:
+            status_code = None
+            raise
+        finally:
+            self._after_call(app_id, method_name, status_code, start, deadline_timeout)
+            if streamed is not None:
+                # sent uncompressed, see Accept-Encoding above
+                count_payload(
+                    app_id,
+                    method_name,
+                    "response",
+                    streamed.bytes_read,
+                    streamed.bytes_read,
+                )
+
+    def _sync_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    # imported lazily, async-only services do not install urllib3
+                    import urllib3
+
+                    self._pool = urllib3.PoolManager(
+                        maxsize=self.pool_size, block=False, retries=False
+                    )
+        return self._pool
+
+    def invoke_method(
+        self,
+        app_id: str,
+        method_name: str,
+        data: Union[bytes, str] = b"",
+        content_type: Optional[str] = None,
+        metadata: Optional[Metadata] = None,
+        http_verb: Optional[str] = None,
+        http_querystring: Optional[Metadata] = None,
+        timeout: Optional[float] = None,
+    ) -> InvokeResponse:
+        timeout, capped = self._before_call(app_id, timeout)
+        data, encoding = self._encode_request(app_id, method_name, data)
+        start = time.perf_counter()
+        url = self._invoke_url(app_id, method_name)
+        if http_querystring:
+            url = f"{url}?{urlencode(http_querystring)}"
+        try:
+            response = self._sync_pool().request(
+                http_verb or "GET",
+                url,
+                body=data,
+                headers=self._request_headers(content_type, metadata, encoding),
+                timeout=timeout,
+                decode_content=False,
+            )
+        except Exception as e:
+            from urllib3.exceptions import TimeoutError as Urllib3TimeoutError
+
+            self._after_call(
+                app_id,
+                method_name,
+                None,
+                start,
+                deadline_timeout=capped and isinstance(e, Urllib3TimeoutError),
+            )
+            raise DaprInvocationError(None, reason=str(e)) from e
+        self._after_call(app_id, method_name, response.status, start)
+        body = self._decode_response(app_id, method_name, response.data)
+        if not 200 <= response.status < 300:
+            raise DaprInvocationError(response.status, body)
+        return InvokeResponse(response.status, body, response.headers)
+
+    async def warm_up(
+        self, timeout: float = SidecarConfig.DAPR_WARM_UP_TIMEOUT_SECONDS
+    ) -> bool:
+        """
+        Wait for the sidecar to be ready for outbound calls and open the first
+        pooled connection, so the first real request does not pay for either.
+        """
+        deadline = time.monotonic() + timeout
+        url = f"{self.base_url}/v1.0/healthz/outbound"
+        while True:
+            try:
+                async with self._session().get(
+                    url, timeout=aiohttp.ClientTimeout(total=2)
+                ) as response:
+                    if response.status < 300:
+                        self.logger.info("Dapr sidecar is ready")
+                        return True
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            if time.monotonic() >= deadline:
+                self.logger.warning(f"Dapr sidecar not ready after {timeout}s")
+                return False
+            await asyncio.sleep(0.5)
+
+    def warm_up_sync(
+        self, timeout: float = SidecarConfig.DAPR_WARM_UP_TIMEOUT_SECONDS
+    ) -> bool:
+        """Sync version of `warm_up` for the pool of sync callers."""
+        deadline = time.monotonic() + timeout
+        url = f"{self.base_url}/v1.0/healthz/outbound"
+        while True:
+            try:
+                if self._sync_pool().request("GET", url, timeout=2).status < 300:
+                    self.logger.info("Dapr sidecar is ready")
+                    return True
+            except Exception:
+                pass
+            if time.monotonic() >= deadline:
+                self.logger.warning(f"Dapr sidecar not ready after {timeout}s")
+                return False
+            time.sleep(0.5)
+
+    async def close(self):
+        """Close the session of the running event loop."""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+_sidecar_client: Optional[SidecarClient] = None
+_sidecar_client_lock = threading.Lock()
+
+
+def get_sidecar_client() -> SidecarClient:
+    """Return the process-wide SidecarClient, creating it on first use."""
+    global _sidecar_client
+    if _sidecar_client is None:
+        with _sidecar_client_lock:
+            if _sidecar_client is None:
+                _sidecar_client = SidecarClient()
+    return _sidecar_client
@@ -0,0 +1,68 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Mapping, Optional, Tuple
+
+# remaining time budget of the request in milliseconds, set on every hop
+DEADLINE_HEADER = "x-deadline-ms"
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the current request has no time left for another call."""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, None when there is none."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline():
+    if expired():
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float], detach: bool = False):
+    """
+    Run the block under a deadline `seconds` from now. An enclosing deadline
+    that ends sooner still applies, unless `detach` is set (for work that
+    outlives the request, like background refreshes). None sets no new limit.
+    """
+    current = None if detach else _deadline.get()
+    deadline = None if seconds is None else time.monotonic() + seconds
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def deadline_metadata() -> Tuple[Tuple[str, str], ...]:
+    """Headers carrying the current deadline to the next hop."""
+    left = remaining()
+    if left is None:
+        return ()
+    return ((DEADLINE_HEADER, str(max(int(left * 1000), 0))),)
+
+
+def deadline_from_headers(headers: Mapping) -> Optional[float]:
+    """Seconds left according to the headers (or gRPC metadata) of a request."""
+    value = headers.get(DEADLINE_HEADER)
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    try:
+        return int(value) / 1000 if value is not None else None
+    except ValueError:
+        return None
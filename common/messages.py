@@ -0,0 +1,49 @@
+from typing import List
+
+from common.wire import MessageError, field
+
+
+class Preferences:
+    """What news a request is for, as NewsManager sends it downstream."""
+
+    __slots__ = ("language", "country", "categories")
+
+    def __init__(self, language: str, country: str, categories: List[str]):
+        self.language = language
+        self.country = country
+        self.categories = categories
+
+    def to_dict(self):
+        return {
+            "language": self.language,
+            "country": self.country,
+            "categories": self.categories,
+        }
+
+    @staticmethod
+    def from_dict(data) -> "Preferences":
+        categories = field(data, "categories", list)
+        if not all(isinstance(category, str) for category in categories):
+            raise MessageError("Field categories should be a list of str")
+        return Preferences(
+            field(data, "language", str), field(data, "country", str), categories
+        )
+
+
+class DigestRequest:
+    """A user asking for their news digest, as queued by the BFF."""
+
+    __slots__ = ("email", "password")
+
+    def __init__(self, email: str, password: str):
+        self.email = email
+        self.password = password
+
+    def to_dict(self):
+        return {"email": self.email, "password": self.password}
+
+    @staticmethod
+    def from_dict(data) -> "DigestRequest":
+        return DigestRequest(
+            field(data, "email", str, ""), field(data, "password", str, "")
+        )
@@ -0,0 +1,3 @@
+# Latency histogram buckets from 5 ms up to the two minutes a digest may take
+# end to end, prometheus_client's default ones stop at 10 s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
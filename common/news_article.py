@@ -0,0 +1,68 @@
+from typing import Dict, List
+
+from common.wire import MessageError, decode, field
+
+
+class NewsArticle:
+    """
+    A news article as the services pass it to each other. The attributes are
+    the fields of the wire format, kept in slots rather than a __dict__.
+    """
+
+    __slots__ = ("title", "body", "image", "url", "dateTimePub", "category")
+
+    def __init__(self, title, body, image, url, dateTimePub, category):
+        self.title = title
+        self.body = body
+        self.image = image
+        self.url = url
+        self.dateTimePub = dateTimePub
+        self.category = category
+
+    def __str__(self):
+        return f"Title: {self.title}\nBody: {self.body}\nImage: {self.image}\nURL: {self.url}\nDate: {self.dateTimePub}\nCategory: {self.category}"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "body": self.body,
+            "image": self.image,
+            "url": self.url,
+            "dateTimePub": self.dateTimePub,
+            "category": self.category,
+        }
+
+    def to_dict_for_llm(self):
+        return {"title": self.title, "body": self.body}
+
+    def with_summary(self, title, body) -> "NewsArticle":
+        """The article with its title and body replaced by their summary."""
+        return NewsArticle(
+            title, body, self.image, self.url, self.dateTimePub, self.category
+        )
+
+    @staticmethod
+    def from_dict(data):
+        # newsapi.ai leaves out the image of some articles
+        return NewsArticle(
+            field(data, "title", str),
+            field(data, "body", str),
+            field(data, "image", (str, type(None))),
+            field(data, "url", str),
+            field(data, "dateTimePub", str),
+            field(data, "category", str),
+        )
+
+
+def decode_by_category(data: bytes) -> Dict[str, List[NewsArticle]]:
+    """Parse JSON mapping each category to a list of articles."""
+    by_category = decode(data)
+    if not isinstance(by_category, dict):
+        raise MessageError("Expected an object of categories")
+    return {
+        category: [NewsArticle.from_dict(article) for article in articles]
+        for category, articles in by_category.items()
+    }
@@ -0,0 +1,65 @@
+from typing import Any, Tuple, Union
+
+import orjson
+
+from common.compression import decompress
+
+
+class MessageError(ValueError):
+    """A message that is not JSON or does not have the fields it should."""
+
+
+def _encode_object(obj):
+    # the message classes, like NewsArticle, say how they are encoded
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_dict()
+
+
+def encode(data: Any) -> bytes:
+    """
+    UTF-8 JSON of data, which may hold messages like NewsArticle anywhere; they
+    are encoded as they are met, without copying data into plain dicts first.
+    Non-ASCII text is written as is rather than as \\u escapes.
+    """
+    return orjson.dumps(data, default=_encode_object)
+
+
+def decode(data: Union[bytes, str]) -> Any:
+    """
+    The value of UTF-8 JSON, gzipped or not, MessageError if data is not JSON.
+    """
+    try:
+        if isinstance(data, bytes):
+            data = decompress(data)
+        return orjson.loads(data)
+    except ValueError as e:
+        raise MessageError(f"Invalid JSON: {e}") from e
+
+
+def field(
+    message: Any,
+    name: str,
+    expected_type: Union[type, Tuple[type, ...]],
+    default: Any = ...,
+) -> Any:
+    """
+    The field name of a decoded message, checked to be of expected_type (a type
+    or a tuple of them, as for isinstance). A missing field takes default, and
+    is an error when there is none.
+    """
+    if not isinstance(message, dict):
+        raise MessageError(f"Expected an object, got {type(message).__name__}")
+    value = message.get(name, default)
+    if value is ...:
+        raise MessageError(f"Missing required field: {name}")
+    if not isinstance(value, expected_type):
+        expected = (
+            expected_type if isinstance(expected_type, tuple) else (expected_type,)
+        )
+        raise MessageError(
+            f"Field {name} should be {' or '.join(t.__name__ for t in expected)}, "
+            f"got {type(value).__name__}"
+        )
+    return value